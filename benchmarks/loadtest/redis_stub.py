@@ -0,0 +1,149 @@
+"""Servidor local compatible con el protocolo de Redis (RESP2) para probar
+`SHARED_STATE_URL=redis://...` sin instalar Redis.
+
+Implementa sólo los comandos que usa `shared_state.RedisState` (`GET`,
+`SET` con `EX`/`PX`/`NX`, `INCR`/`INCRBY`, `DEL`, `PING`) más los que
+envía el cliente al conectar. Los datos viven en memoria del proceso.
+
+Uso:
+    python benchmarks/loadtest/redis_stub.py --port 9379
+    SHARED_STATE_URL=redis://127.0.0.1:9379/0 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class Store:
+    def __init__(self):
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key: bytes, value: bytes, ttl: Optional[float], nx: bool) -> bool:
+        if nx and self.get(key) is not None:
+            return False
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        return True
+
+    def incr(self, key: bytes, amount: int = 1) -> int:
+        current = self.get(key)
+        value = int(current or b"0") + amount
+        expires_at = self._data[key][1] if current is not None else None
+        self._data[key] = (str(value).encode(), expires_at)
+        return value
+
+    def delete(self, keys: List[bytes]) -> int:
+        return sum(1 for key in keys if self.get(key) is not None and self._data.pop(key))
+
+
+def encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return f"-ERR {reply}\r\n".encode()
+    if isinstance(reply, bool):
+        return b"+OK\r\n" if reply else b"$-1\r\n"
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode()
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+def execute(store: Store, args: List[bytes]):
+    store.commands += 1
+    command = args[0].upper()
+    if command == b"PING":
+        return "PONG"
+    if command in (b"SELECT", b"CLIENT"):
+        return "OK"
+    if command == b"GET":
+        return store.get(args[1])
+    if command == b"SET":
+        ttl, nx = None, False
+        options = [a.upper() for a in args[3:]]
+        for index, option in enumerate(options):
+            if option == b"EX":
+                ttl = float(options[index + 1])
+            elif option == b"PX":
+                ttl = float(options[index + 1]) / 1000
+            elif option == b"NX":
+                nx = True
+        return store.set(args[1], args[2], ttl, nx)
+    if command in (b"INCR", b"INCRBY"):
+        try:
+            return store.incr(args[1], int(args[2]) if len(args) > 2 else 1)
+        except ValueError:
+            return ValueError("value is not an integer or out of range")
+    if command == b"DEL":
+        return store.delete(args[1:])
+    if command == b"DBSIZE":
+        return len(store._data)
+    if command == b"FLUSHDB":
+        store._data.clear()
+        return "OK"
+    return ValueError(f"unknown command '{args[0].decode(errors='replace')}'")
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Comando inline (p. ej. desde telnet o redis-cli --no-raw)
+        return line.strip().split()
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+def create_handler(store: Store):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                writer.write(encode(execute(store, args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(host: str, port: int) -> None:
+    server = await asyncio.start_server(create_handler(Store()), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9379)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Servidor local que reemplaza las APIs externas durante las pruebas de carga.
+
+Expone:
+
+- `POST /v1/chat/completions`: compatible con la API de OpenAI (lo usan el
+  SDK de `microservicio-ia` y `ChatOpenAI` en `microservicio-alertas`).
+- `GET /v1/models/{model}`: lo que consultan sus health checks.
+- `GET /products/{id}`: sustituto de `MOCK_PRICE_URL`.
+
+La latencia y la tasa de errores de cada API se configuran con
+distribuciones (`fixed:MS`, `uniform:MIN:MAX`, `normal:MEDIA:DESV`,
+`lognormal:MEDIANA:SIGMA`), con semilla fija para que las corridas sean
+comparables.
+
+Uso:
+    python benchmarks/loadtest/stubs.py --port 9100 \\
+        --llm-latency lognormal:800:0.4 --llm-error-rate 0.01 \\
+        --price-latency uniform:20:80
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class LatencyDistribution:
+    def __init__(self, spec: str, rng: random.Random):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.rng = rng
+        if kind not in {"fixed", "uniform", "normal", "lognormal"}:
+            raise ValueError(f"Distribución desconocida: {spec}")
+
+    def sample_seconds(self) -> float:
+        if self.kind == "fixed":
+            millis = self.params[0]
+        elif self.kind == "uniform":
+            millis = self.rng.uniform(*self.params)
+        elif self.kind == "normal":
+            millis = self.rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            millis = median * self.rng.lognormvariate(0, sigma)
+        return max(0.0, millis) / 1000
+
+
+def _completion_text(prompt: str) -> str:
+    # Respuestas deterministas por prompt; la categoría respeta el formato
+    # jerárquico que espera microservicio-ia.
+    digest = hashlib.sha256(prompt.encode()).hexdigest()
+    if "categoría" in prompt.lower() and "jerárquic" in prompt.lower():
+        return "Electrónica > Audio > Audífonos"
+    return (
+        "Producto de alta calidad pensado para el uso diario, con materiales "
+        "duraderos y un diseño cuidado. Descúbrelo hoy mismo. "
+        f"[ref {digest[:8]}]"
+    )
+
+
+def create_app(args) -> FastAPI:
+    rng = random.Random(args.seed)
+    llm_latency = LatencyDistribution(args.llm_latency, rng)
+    price_latency = LatencyDistribution(args.price_latency, rng)
+    app = FastAPI(title="Stubs de APIs externas")
+    counters = {"llm_requests": 0, "llm_errors": 0, "price_requests": 0, "price_errors": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["llm_requests"] += 1
+        await asyncio.sleep(llm_latency.sample_seconds())
+
+        if rng.random() < args.llm_error_rate:
+            counters["llm_errors"] += 1
+            return JSONResponse(
+                status_code=503,
+                content={"error": {"message": "stub overloaded", "type": "server_error"}},
+            )
+
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        text = _completion_text(prompt)
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(text) // 4)
+        return {
+            "id": f"chatcmpl-stub-{counters['llm_requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/v1/models/{model}")
+    async def retrieve_model(model: str):
+        # Lo consultan los health checks del LLM de ambos microservicios
+        return {"id": model, "object": "model", "created": 0, "owned_by": "stub"}
+
+    @app.get("/products/{product_id}")
+    async def supplier_price(product_id: int):
+        counters["price_requests"] += 1
+        await asyncio.sleep(price_latency.sample_seconds())
+        if rng.random() < args.price_error_rate:
+            counters["price_errors"] += 1
+            return JSONResponse(status_code=502, content={"message": "stub error"})
+        return {"id": product_id, "title": "Stub product", "price": 42.5}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", **counters}
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency", default="lognormal:800:0.4")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--price-latency", default="uniform:20:80")
+    parser.add_argument("--price-error-rate", type=float, default=0.0)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
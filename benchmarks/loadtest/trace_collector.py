@@ -0,0 +1,115 @@
+"""Colector local de trazas, sustituto de un OTLP collector.
+
+Acepta `POST /v1/traces` en formato OTLP/HTTP JSON (lo que envían los
+servicios con `TRACE_EXPORTER=otlp`), guarda cada span como una línea JSON y
+permite consultar:
+
+- `GET /traces/{trace_id}`: spans de un request en todos los servicios.
+- `GET /summary`: p50/p95/p99 por servicio y etapa.
+
+Uso:
+    python benchmarks/loadtest/trace_collector.py --port 4318 --output traces.jsonl
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+def _attribute_value(value: dict):
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def flatten(payload: dict) -> list:
+    spans = []
+    for resource_spans in payload.get("resourceSpans", []):
+        resource = {
+            attr["key"]: _attribute_value(attr["value"])
+            for attr in resource_spans.get("resource", {}).get("attributes", [])
+        }
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start = int(span["startTimeUnixNano"])
+                end = int(span["endTimeUnixNano"])
+                spans.append({
+                    "service": resource.get("service.name"),
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId") or None,
+                    "name": span["name"],
+                    "start_time": start / 1e9,
+                    "duration_ms": (end - start) / 1e6,
+                    "attributes": {
+                        attr["key"]: _attribute_value(attr["value"])
+                        for attr in span.get("attributes", [])
+                    },
+                })
+    return spans
+
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return round(ordered[index], 2)
+
+
+def create_app(output: Path) -> FastAPI:
+    app = FastAPI(title="Colector local de trazas")
+    by_trace = defaultdict(list)
+    durations = defaultdict(list)
+
+    @app.post("/v1/traces")
+    async def receive(request: Request):
+        spans = flatten(await request.json())
+        with output.open("a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(span) + "\n" for span in spans))
+        for span in spans:
+            by_trace[span["trace_id"]].append(span)
+            durations[(span["service"], span["name"])].append(span["duration_ms"])
+        return {"partialSuccess": {}}
+
+    @app.get("/traces/{trace_id}")
+    async def get_trace(trace_id: str):
+        return sorted(by_trace.get(trace_id, []), key=lambda span: span["start_time"])
+
+    @app.get("/summary")
+    async def summary():
+        return [
+            {
+                "service": service,
+                "name": name,
+                "count": len(values),
+                "p50_ms": _percentile(values, 0.50),
+                "p95_ms": _percentile(values, 0.95),
+                "p99_ms": _percentile(values, 0.99),
+            }
+            for (service, name), values in sorted(durations.items(), key=lambda item: str(item[0]))
+        ]
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "traces": len(by_trace)}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="traces.jsonl")
+    args = parser.parse_args()
+    uvicorn.run(create_app(Path(args.output)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark del costo de logging por request.
+
+Compara, cada una en un proceso limpio con stdout a /dev/null:
+
+- `legacy`: configuración anterior (structlog sin caché de loggers,
+  `PrintLogger` que escribe en stdout dentro del request),
+- `queue`: `logging_setup.configure_logging` (JSON renderizado en el
+  request y encolado; un hilo aparte escribe en stdout). Con
+  `--queue-size` > 0 la cola es acotada y se reportan las líneas
+  descartadas,
+- `sampled`: lo mismo con muestreo de los eventos de éxito de alto volumen.
+
+Cada "request" emite la mezcla de eventos de una creación de producto más
+una venta (incluida una descripción larga). Se reporta µs por evento y por
+request medidos en el hilo que loguea, y el tiempo total incluyendo vaciar
+la cola.
+
+Uso:
+    python benchmarks/logging_benchmark.py
+    python benchmarks/logging_benchmark.py --requests 50000 --output logging.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+APP_DIR = ROOT / "services" / "backend-principal" / "app"
+
+VARIANTS = ["legacy", "queue", "sampled"]
+SAMPLE_RATES = "product_sold=0.1,create_product_request=0.1,calling_ia_service=0.1"
+DESCRIPTION = ("Descubre la comodidad y el estilo que mereces con este producto "
+               "diseñado para acompañarte todos los días. ") * 12
+
+
+def configure(variant: str, max_field_chars: int, queue_size: int):
+    import structlog
+
+    if variant == "legacy":
+        structlog.configure(
+            processors=[
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.JSONRenderer(),
+            ]
+        )
+        return None
+    sys.path.insert(0, str(APP_DIR))
+    import logging_setup
+
+    rates = SAMPLE_RATES if variant == "sampled" else ""
+    logging_setup.configure_logging("INFO", rates, max_field_chars, queue_size)
+    return logging_setup
+
+
+def emit_request(logger, index: int) -> int:
+    logger.info("create_product_request", name=f"Producto {index}", keywords=["a", "b"])
+    logger.info("calling_ia_service", endpoint="/generate-description")
+    logger.info("product_created", product_id=index, description=DESCRIPTION)
+    logger.info("product_sold", product_id=index, quantity=1, remaining_stock=42)
+    logger.debug("cache_lookup", key=f"product:{index}")
+    return 5
+
+
+def child(variant: str, requests: int, max_field_chars: int, queue_size: int) -> None:
+    setup = configure(variant, max_field_chars, queue_size)
+    import structlog
+
+    logger = structlog.get_logger()
+    for index in range(min(200, requests)):
+        emit_request(logger, index)
+
+    events = 0
+    start = time.perf_counter()
+    for index in range(requests):
+        events += emit_request(logger, index)
+    emitted = time.perf_counter() - start
+    if setup is not None:
+        # Vaciar la cola: el costo de escribir queda fuera del request pero
+        # se cuenta en el total
+        setup.flush_logs()
+    else:
+        sys.stdout.flush()
+    total = time.perf_counter() - start
+    dropped = setup.logging_stats()["dropped"] if setup is not None else 0
+
+    print(json.dumps({
+        "variant": variant,
+        "requests": requests,
+        "events": events,
+        "us_per_event": round(emitted / events * 1e6, 2),
+        "us_per_request": round(emitted / requests * 1e6, 2),
+        "total_with_flush_s": round(total, 3),
+        "dropped": dropped,
+    }), file=sys.stderr)
+
+
+def run_variant(variant: str, requests: int, max_field_chars: int, queue_size: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", variant,
+         "--requests", str(requests), "--max-field-chars", str(max_field_chars),
+         "--queue-size", str(queue_size)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONHASHSEED": "0"},
+    )
+    return json.loads(result.stderr.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--max-field-chars", type=int, default=512)
+    # 0 = sin límite, para medir el costo sin descartes
+    parser.add_argument("--queue-size", type=int, default=0)
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.requests, args.max_field_chars, args.queue_size)
+        return
+
+    results = []
+    for variant in args.variants.split(","):
+        result = run_variant(variant, args.requests, args.max_field_chars, args.queue_size)
+        results.append(result)
+        print(f"{variant}: {result['us_per_request']} µs/request "
+              f"(total con flush {result['total_with_flush_s']}s, "
+              f"descartadas {result['dropped']})", file=sys.stderr)
+
+    output = json.dumps({"sample_rates": SAMPLE_RATES, "results": results}, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
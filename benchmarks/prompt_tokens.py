@@ -0,0 +1,163 @@
+"""Reporte offline de tokens por template de prompt de `microservicio-ia`.
+
+Para cada template de `prompts.TEMPLATES` mide, sin llamar al proveedor:
+
+- `static_tokens`: el prefijo de instrucciones, idéntico en cada request,
+- `variable_tokens`: los campos del producto (p50 y máximo sobre productos
+  sintéticos),
+- `static_share`: fracción del prompt que el proveedor puede servir desde su
+  caché de prefijos,
+- `cacheable`: si el prefijo alcanza el mínimo para la caché automática
+  (`--cache-min-tokens`, 1024 en OpenAI),
+- `max_output_tokens`: el presupuesto de salida visible configurado y
+  `sent_output_tokens`, el límite enviado a `--model` (más el margen de
+  razonamiento si el modelo razona),
+- `expected_output_tokens`: el tamaño de una salida completa (descripción de
+  100 palabras, la ruta de categoría más larga de los ejemplos),
+- con `--metrics` (archivo o URL de `GET /metrics` de microservicio-ia), el
+  promedio observado de tokens de salida y las respuestas truncadas.
+
+`budget_ok` es falso, y se avisa por stderr, si el presupuesto no cubre la
+salida esperada con un 20% de margen, si el promedio observado alcanza el
+límite enviado o si hubo respuestas truncadas.
+
+Cuenta con `tiktoken` si está instalado; si no, estima 4 caracteres por token.
+
+Uso:
+    python benchmarks/prompt_tokens.py
+    python benchmarks/prompt_tokens.py --encoding o200k_base --output prompts.json
+    python benchmarks/prompt_tokens.py --metrics http://localhost:8001/metrics
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+IA_APP_DIR = ROOT / "services" / "microservicio-ia" / "app"
+
+FAMILIES = ["Audífonos", "Camiseta", "Sartén", "Balón", "Lámpara", "Mochila",
+            "Teclado", "Reloj", "Cafetera", "Zapatillas"]
+ADJECTIVES = ["inalámbrico", "algodón", "antiadherente", "profesional", "led",
+              "impermeable", "mecánico", "deportivo", "compacto", "ergonómico"]
+WORDS = ("calidad diseño duradero cómodo práctico moderno ideal resistente "
+         "ligero elegante versátil confiable eficiente premium funcional").split()
+
+
+def token_counter(encoding: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return "approx", lambda text: max(1, len(text) // 4)
+    enc = tiktoken.get_encoding(encoding)
+    return encoding, lambda text: len(enc.encode(text))
+
+
+def load_metrics(source: str) -> dict:
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=10) as response:
+            return json.load(response)
+    return json.loads(Path(source).read_text())
+
+
+def expected_outputs(rng: random.Random, count) -> dict:
+    from fake_llm import CATEGORIES
+
+    description = " ".join(rng.choice(WORDS) for _ in range(100)).capitalize() + "."
+    return {
+        "description": count(description),
+        "category": max(count(category) for category in CATEGORIES),
+    }
+
+
+def observed_output(metrics: dict, name: str) -> tuple:
+    usage = metrics.get("token_usage", {}).get(name)
+    if not usage or not usage["requests"]:
+        return None, 0
+    return round(usage["completion_tokens"] / usage["requests"], 1), usage["truncated"]
+
+
+def sample_fields(rng: random.Random) -> dict:
+    name = f"{rng.choice(FAMILIES)} {rng.choice(ADJECTIVES)}"
+    keywords = rng.sample(ADJECTIVES, rng.randint(1, 5))
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(50, 100)))
+    return {
+        "description": {"product_name": name, "keywords": keywords},
+        "category": {"product_name": name, "description": description.capitalize() + "."},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--encoding", default="o200k_base",
+                        help="Encoding de tiktoken (si está instalado)")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024)
+    parser.add_argument("--model", default=os.getenv("OPENAI_MODEL", "gpt-5-mini-2025-08-07"),
+                        help="Modelo para el límite enviado (margen de razonamiento)")
+    parser.add_argument("--metrics", help="Archivo o URL de GET /metrics de microservicio-ia")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(IA_APP_DIR))
+    from prompts import TEMPLATES
+
+    tokenizer, count = token_counter(args.encoding)
+    rng = random.Random(args.seed)
+    samples = [sample_fields(rng) for _ in range(args.samples)]
+    expected = expected_outputs(rng, count)
+    metrics = load_metrics(args.metrics) if args.metrics else {}
+
+    results = []
+    for name, template in TEMPLATES.items():
+        static = count(template.instructions)
+        variable = [count(template.render(**fields[name])) for fields in samples]
+        p50 = statistics.median(variable)
+        sent = template.token_limit(args.model)
+        observed, truncated = observed_output(metrics, name)
+        budget_ok = (
+            template.max_output_tokens >= expected[name] * 1.2
+            and (observed is None or observed < sent)
+            and not truncated
+        )
+        if not budget_ok:
+            print(f"AVISO {name}: presupuesto {template.max_output_tokens} "
+                  f"(enviado {sent}) vs. salida esperada {expected[name]}, "
+                  f"observada {observed}, truncadas {truncated}", file=sys.stderr)
+        results.append({
+            "template": name,
+            "static_tokens": static,
+            "variable_tokens_p50": p50,
+            "variable_tokens_max": max(variable),
+            "static_share": round(static / (static + p50), 3),
+            "cacheable": static >= args.cache_min_tokens,
+            "max_output_tokens": template.max_output_tokens,
+            "sent_output_tokens": sent,
+            "expected_output_tokens": expected[name],
+            "observed_output_tokens_avg": observed,
+            "truncated": truncated,
+            "budget_ok": budget_ok,
+        })
+        print(f"{name}: static={static} variable_p50={p50} "
+              f"output_budget={template.max_output_tokens}", file=sys.stderr)
+
+    output = json.dumps({
+        "tokenizer": tokenizer,
+        "model": args.model,
+        "cache_min_tokens": args.cache_min_tokens,
+        "samples": args.samples,
+        "templates": results,
+    }, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Benchmark de búsqueda de productos según el tamaño del catálogo.
+
+Para cada tamaño de `--sizes` completa el catálogo con productos sintéticos
+(el índice de texto se mantiene en cada INSERT) y mide, con las mismas
+consultas:
+
+- `search`: `ProductService.search_products`, lo que atiende
+  `GET /products/search` (FTS5 en SQLite, tsvector + GIN en Postgres),
+- `scan`: cargar todo el catálogo y filtrar en Python, lo que hacía el
+  frontend con `GET /products`.
+
+También reporta el costo de inserción con el índice activo (filas/s).
+
+Uso:
+    python benchmarks/search_benchmark.py --sizes 1000,10000,50000
+    python benchmarks/search_benchmark.py --database-url postgresql://... --output search.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND_DIR = ROOT / "services" / "backend-principal"
+
+FAMILIES = ["Audífonos", "Camiseta", "Sartén", "Balón", "Lámpara", "Mochila",
+            "Teclado", "Reloj", "Cafetera", "Zapatillas"]
+ADJECTIVES = ["inalámbrico", "algodón", "antiadherente", "profesional", "led",
+              "impermeable", "mecánico", "deportivo", "compacto", "ergonómico"]
+WORDS = ("calidad diseño duradero cómodo práctico moderno ideal resistente "
+         "ligero elegante versátil confiable eficiente premium funcional").split()
+QUERIES = ["audifonos inalambrico", "sartén", "reloj deportivo", "mochila impermeable",
+           "ergonómico", "cafetera premium", "teclado mecanico", "inexistente xyz"]
+
+
+def synthetic_product(rng: random.Random, index: int) -> dict:
+    family = rng.choice(FAMILIES)
+    adjective = rng.choice(ADJECTIVES)
+    return {
+        "id": uuid.uuid4(),
+        "name": f"{family} {adjective} {index}",
+        "keywords": [adjective, rng.choice(ADJECTIVES), f"serie {index % 97}"],
+        "stock": rng.randint(0, 500),
+        "description": " ".join(rng.choice(WORDS) for _ in range(40)),
+        "category": f"Catálogo > {family}",
+    }
+
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+    }
+
+
+def scan(db, Product, query: str) -> list:
+    terms = query.lower().split()
+    matches = []
+    for product in db.query(Product).all():
+        haystack = " ".join([product.name, " ".join(product.keywords),
+                             product.description or ""]).lower()
+        if all(term in haystack for term in terms):
+            matches.append(product)
+    return matches[:20]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000",
+                        help="Tamaños de catálogo separados por coma (crecientes)")
+    parser.add_argument("--database-url", help="Por defecto SQLite temporal")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por consulta")
+    parser.add_argument("--scan-max", type=int, default=50000,
+                        help="No medir el escaneo completo por encima de este tamaño")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el reporte JSON en este archivo")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="gestor-ia-search-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/search.db"
+    os.environ.setdefault("LOG_LEVEL", "warning")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import Product
+    from app.services.product_service import ProductService
+    from app.services.search import search_backend, setup_search
+
+    Base.metadata.create_all(bind=engine)
+    setup_search()
+
+    rng = random.Random(args.seed)
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    results = []
+    current = 0
+
+    for size in sizes:
+        rows = [synthetic_product(rng, index) for index in range(current, size)]
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            for offset in range(0, len(rows), 1000):
+                conn.execute(Product.__table__.insert(), rows[offset:offset + 1000])
+        insert_seconds = time.perf_counter() - started
+        current = size
+
+        db = SessionLocal()
+        service = ProductService(db)
+        timings = {"search": [], "scan": []}
+        hits = {}
+        for query in QUERIES:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                found = service.search_products(query, 20, 0)
+                timings["search"].append((time.perf_counter() - start) * 1000)
+            hits[query] = len(found)
+            if size <= args.scan_max:
+                start = time.perf_counter()
+                scan(db, Product, query)
+                timings["scan"].append((time.perf_counter() - start) * 1000)
+                db.expunge_all()
+        db.close()
+
+        result = {
+            "catalog_size": size,
+            "inserted": len(rows),
+            "insert_rows_per_s": round(len(rows) / insert_seconds, 1) if rows else None,
+            "search": percentiles(timings["search"]),
+            "hits": hits,
+        }
+        if timings["scan"]:
+            result["scan"] = percentiles(timings["scan"])
+        results.append(result)
+        print(f"{size}: search p50={result['search']['p50_ms']} ms"
+              + (f", scan p50={result['scan']['p50_ms']} ms" if "scan" in result else ""),
+              file=sys.stderr)
+
+    output = json.dumps({
+        "backend": search_backend().name,
+        "database": os.environ["DATABASE_URL"].split(":")[0],
+        "results": results,
+    }, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Benchmark de arranque de los servicios Python.
+
+Para cada servicio mide, en un proceso limpio:
+
+- tiempo total de importar la aplicación FastAPI,
+- desglose de `python -X importtime` agrupado por paquete raíz,
+- memoria residente (RSS máxima) tras la importación,
+- opcionalmente (`--serve`), el tiempo hasta que `/health` responde y el
+  RSS del proceso uvicorn ya servido.
+
+Uso:
+    python benchmarks/startup_benchmark.py --runs 5 --top 15 --serve
+    python benchmarks/startup_benchmark.py --service microservicio-ia --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVICES_DIR = ROOT / "services"
+
+# nombre -> (directorio de trabajo, módulo de la app)
+SERVICES = {
+    "backend-principal": (SERVICES_DIR / "backend-principal", "app.main"),
+    "microservicio-ia": (SERVICES_DIR / "microservicio-ia" / "app", "main"),
+    "microservicio-alertas": (SERVICES_DIR / "microservicio-alertas", "app.main"),
+}
+
+CHILD_CODE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+"""
+
+
+def service_env(extra=None):
+    env = dict(os.environ)
+    # Sin base de datos ni API keys reales: sólo interesa el coste de arranque
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    env.setdefault("LOG_LEVEL", "warning")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    if extra:
+        env.update(extra)
+    return env
+
+
+def _parse_line(line: str):
+    # Formato: "import time:       123 |        456 |   package.module"
+    body = line[len("import time:"):]
+    self_us, cumulative_us, name = body.split("|", 2)
+    return int(self_us), int(cumulative_us), name.strip()
+
+
+def importtime_breakdown(stderr: str) -> dict:
+    per_package = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, _, name = _parse_line(line)
+        except ValueError:
+            continue
+        per_package[name.split(".")[0]] += self_us
+    return per_package
+
+
+def measure_import(name: str) -> dict:
+    cwd, module = SERVICES[name]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE.format(module=module)],
+        cwd=cwd,
+        env=service_env(),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{name}: la importación falló\n{result.stderr[-2000:]}")
+
+    metrics = json.loads(result.stdout.strip().splitlines()[-1])
+    metrics["packages_us"] = importtime_breakdown(result.stderr)
+    return metrics
+
+
+def _rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_serve(name: str, port: int, timeout: float = 60.0) -> dict:
+    cwd, module = SERVICES[name]
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=cwd,
+        env=service_env({"PORT": str(port)}),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                    break
+            except Exception:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{name}: uvicorn terminó antes de estar listo")
+                time.sleep(0.05)
+        else:
+            raise RuntimeError(f"{name}: /health no respondió en {timeout}s")
+
+        return {
+            "ready_seconds": time.perf_counter() - start,
+            "rss_kb": _rss_kb(process.pid),
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def summarize(name: str, runs: int, top: int, serve: bool, port: int) -> dict:
+    imports = [measure_import(name) for _ in range(runs)]
+
+    packages = defaultdict(list)
+    for run in imports:
+        for package, micros in run["packages_us"].items():
+            packages[package].append(micros)
+    breakdown = sorted(
+        ((package, statistics.median(values)) for package, values in packages.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+
+    report = {
+        "service": name,
+        "runs": runs,
+        "import_seconds_median": statistics.median(r["import_seconds"] for r in imports),
+        "import_seconds_min": min(r["import_seconds"] for r in imports),
+        "max_rss_kb_median": statistics.median(r["max_rss_kb"] for r in imports),
+        "top_packages_ms": {package: round(micros / 1000, 2) for package, micros in breakdown},
+    }
+
+    if serve:
+        served = [measure_serve(name, port) for _ in range(runs)]
+        report["ready_seconds_median"] = statistics.median(s["ready_seconds"] for s in served)
+        report["served_rss_kb_median"] = statistics.median(s["rss_kb"] for s in served)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=sorted(SERVICES), action="append",
+                        help="Servicio a medir (repetible). Por defecto, todos.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Paquetes a mostrar en el desglose")
+    parser.add_argument("--serve", action="store_true",
+                        help="Arrancar uvicorn y medir el tiempo hasta /health")
+    parser.add_argument("--base-port", type=int, default=18000)
+    parser.add_argument("--output", help="Guardar el reporte JSON en este archivo")
+    args = parser.parse_args()
+
+    reports = []
+    for offset, name in enumerate(args.service or sorted(SERVICES)):
+        reports.append(summarize(name, args.runs, args.top, args.serve, args.base_port + offset))
+
+    output = json.dumps({"python": sys.version.split()[0], "services": reports}, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
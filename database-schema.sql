@@ -3,6 +3,23 @@
 
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Árbol de categorías con ruta materializada (path_key: electronica/audio).
+-- product_count cuenta los productos del subárbol y se actualiza al crear
+-- cada producto, así GET /products/facets no recorre products.
+CREATE TABLE categories (
+    id SERIAL PRIMARY KEY,
+    parent_id INTEGER REFERENCES categories(id),
+    name VARCHAR(100) NOT NULL,
+    key VARCHAR(100) NOT NULL,
+    path VARCHAR(300) NOT NULL,
+    path_key VARCHAR(300) NOT NULL UNIQUE,
+    depth INTEGER NOT NULL,
+    product_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_categories_parent_id ON categories(parent_id);
+CREATE INDEX idx_categories_depth ON categories(depth);
+
 CREATE TABLE products (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     name VARCHAR(200) NOT NULL,
@@ -10,16 +27,92 @@ CREATE TABLE products (
     stock INTEGER NOT NULL DEFAULT 0 CHECK (stock >= 0),
     description TEXT,
     category VARCHAR(300),
+    category_id INTEGER REFERENCES categories(id),
+    stock_shards INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Stock fragmentado: para productos con stock_shards > 1 el stock total es
+-- la suma de estos contadores y products.stock queda en 0
+CREATE TABLE product_stock_shards (
+    product_id UUID NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    slot INTEGER NOT NULL,
+    stock INTEGER NOT NULL DEFAULT 0 CHECK (stock >= 0),
+    PRIMARY KEY (product_id, slot)
+);
+
+-- Ventas: registro append-only escrito en la misma transacción que descuenta
+-- el stock, y rollups por hora/día mantenidos incrementalmente desde él
+CREATE TABLE sales_events (
+    id BIGSERIAL PRIMARY KEY,
+    product_id UUID NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    quantity INTEGER NOT NULL DEFAULT 1,
+    sold_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX idx_sales_events_product_sold_at ON sales_events(product_id, sold_at);
+
+CREATE TABLE sales_rollups (
+    product_id UUID NOT NULL,
+    period VARCHAR(4) NOT NULL,          -- 'hour' | 'day'
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    units INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_id, period, bucket)
+);
+CREATE INDEX idx_sales_rollups_period_bucket ON sales_rollups(period, bucket);
+
+-- Velocidad: promedio móvil de unidades por día (SALES_VELOCITY_WINDOW_DAYS)
+CREATE TABLE product_sales_stats (
+    product_id UUID PRIMARY KEY,
+    units_24h INTEGER NOT NULL DEFAULT 0,
+    units_window INTEGER NOT NULL DEFAULT 0,
+    velocity DOUBLE PRECISION NOT NULL DEFAULT 0,
+    last_sale_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Último sales_events.id agregado a los rollups (una sola fila)
+CREATE TABLE sales_rollup_state (
+    id INTEGER PRIMARY KEY,
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    -- [id, epoch] de los huecos bajo last_event_id aún sin confirmar
+    pending_ids JSON,
+    recomputed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Respuestas guardadas por Idempotency-Key (POST /products y /sell);
+-- locked_until y expires_at en segundos epoch
+CREATE TABLE idempotency_keys (
+    key VARCHAR(200) NOT NULL,
+    scope VARCHAR(300) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    response_status INTEGER,
+    response_body JSON,
+    locked_until DOUBLE PRECISION NOT NULL,
+    expires_at DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (key, scope)
+);
+CREATE INDEX idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+
 -- Índices
 CREATE INDEX idx_products_stock ON products(stock);
 CREATE INDEX idx_products_category ON products(category);
+CREATE INDEX idx_products_category_id ON products(category_id);
 CREATE INDEX idx_products_created_at ON products(created_at DESC);
 CREATE INDEX idx_products_keywords ON products USING GIN (keywords);
 
+-- Búsqueda de texto (GET /products/search); columna generada, Postgres la
+-- mantiene en cada INSERT/UPDATE
+ALTER TABLE products ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(keywords::jsonb::text, '')), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(description, '')), 'C')
+    ) STORED;
+CREATE INDEX idx_products_search ON products USING GIN (search_vector);
+
 -- Actualizar updated_at automáticamente
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -7,11 +7,43 @@ function App() {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(false);
   const [formData, setFormData] = useState({ name: '', keywords: '', stock: 10 });
+  // Idempotency-Key del envío en curso: se reusa al reintentar tras un error
+  // de red y se descarta al crear el producto o al editar el formulario
+  const [submitKey, setSubmitKey] = useState(null);
+
+  const updateForm = (field, value) => {
+    setFormData({ ...formData, [field]: value });
+    setSubmitKey(null);
+  };
 
   useEffect(() => {
-    fetchProducts();
+    // Cambios en vivo: altas y stock llegan como deltas; `resync` (o una
+    // reconexión) vuelve a pedir la lista completa
+    const stream = new EventSource(`${API_URL}/products/stream`);
+    stream.onopen = () => fetchProducts();
+    stream.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      if (event.type === 'created') {
+        upsertProduct(event.product);
+      } else if (event.type === 'stock') {
+        setProducts((current) =>
+          current.map((p) => (p.id === event.id ? { ...p, stock: event.stock } : p))
+        );
+      } else if (event.type === 'resync') {
+        fetchProducts();
+      }
+    };
+    return () => stream.close();
   }, []);
 
+  const upsertProduct = (product) => {
+    setProducts((current) =>
+      current.some((p) => p.id === product.id)
+        ? current.map((p) => (p.id === product.id ? { ...p, ...product } : p))
+        : [...current, product]
+    );
+  };
+
   const fetchProducts = async () => {
     try {
       const res = await fetch(`${API_URL}/products`);
@@ -25,16 +57,23 @@ function App() {
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
+    const idempotencyKey = submitKey ?? crypto.randomUUID();
+    setSubmitKey(idempotencyKey);
     try {
       const keywords = formData.keywords.split(',').map(k => k.trim());
       const res = await fetch(`${API_URL}/products`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          // Misma clave en cada reintento del envío: no se duplica
+          'Idempotency-Key': idempotencyKey,
+        },
         body: JSON.stringify({ ...formData, keywords, stock: parseInt(formData.stock) })
       });
       if (res.ok) {
         setFormData({ name: '', keywords: '', stock: 10 });
-        fetchProducts();
+        setSubmitKey(null);
+        upsertProduct(await res.json());
       }
     } catch (error) {
       console.error('Error:', error);
@@ -44,8 +83,13 @@ function App() {
 
   const handleSell = async (id) => {
     try {
-      await fetch(`${API_URL}/products/${id}/sell`, { method: 'POST' });
-      fetchProducts();
+      const res = await fetch(`${API_URL}/products/${id}/sell`, { method: 'POST' });
+      if (res.ok) {
+        const { stock } = await res.json();
+        setProducts((current) =>
+          current.map((p) => (p.id === id ? { ...p, stock } : p))
+        );
+      }
     } catch (error) {
       console.error('Error:', error);
     }
@@ -62,21 +106,21 @@ function App() {
             type="text"
             placeholder="Nombre del producto"
             value={formData.name}
-            onChange={(e) => setFormData({ ...formData, name: e.target.value })}
+            onChange={(e) => updateForm('name', e.target.value)}
             required
           />
           <input
             type="text"
             placeholder="Palabras clave (separadas por comas)"
             value={formData.keywords}
-            onChange={(e) => setFormData({ ...formData, keywords: e.target.value })}
+            onChange={(e) => updateForm('keywords', e.target.value)}
             required
           />
           <input
             type="number"
             placeholder="Stock inicial"
             value={formData.stock}
-            onChange={(e) => setFormData({ ...formData, stock: e.target.value })}
+            onChange={(e) => updateForm('stock', e.target.value)}
             required
             min="0"
           />
@@ -0,0 +1,57 @@
+"""Verifica que los módulos copiados en cada servicio sigan idénticos.
+
+Cada servicio se construye con su propio contexto de Docker, así que
+`tracing.py`, `shared_state.py` y `logging_setup.py` viven copiados en
+`services/*/app/`. Las copias sólo pueden diferir en el import de `config`
+(relativo o absoluto según el servicio) y en el nombre del servicio; todo lo
+demás debe coincidir. Un cambio en un módulo se aplica a las tres copias.
+
+Uso:
+    python scripts/check_shared_modules.py
+"""
+
+import difflib
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVICES = ["backend-principal", "microservicio-ia", "microservicio-alertas"]
+MODULES = ["tracing.py", "shared_state.py", "logging_setup.py"]
+
+CONFIG_IMPORT_RE = re.compile(r"^from \.?config import (\([^)]*\)|[^\n]*)\n", re.MULTILINE)
+
+
+def normalize(source: str, service: str) -> str:
+    # isort ubica el import de config en otro grupo según el servicio
+    source = CONFIG_IMPORT_RE.sub("", source)
+    source = source.replace(f'"{service}"', '"<servicio>"')
+    return re.sub(r"\n{3,}", "\n\n", source)
+
+
+def main() -> int:
+    failed = False
+    for module in MODULES:
+        reference = SERVICES[0]
+        source = (ROOT / "services" / reference / "app" / module).read_text()
+        expected = normalize(source, reference)
+        for service in SERVICES[1:]:
+            path = ROOT / "services" / service / "app" / module
+            actual = normalize(path.read_text(), service)
+            if actual == expected:
+                continue
+            failed = True
+            print(f"{path.relative_to(ROOT)} difiere de la copia de {reference}:")
+            sys.stdout.writelines(difflib.unified_diff(
+                expected.splitlines(keepends=True),
+                actual.splitlines(keepends=True),
+                fromfile=f"{reference}/app/{module}",
+                tofile=f"{service}/app/{module}",
+            ))
+    if not failed:
+        print(f"{len(MODULES)} módulos idénticos en {len(SERVICES)} servicios")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
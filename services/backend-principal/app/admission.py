@@ -0,0 +1,190 @@
+import asyncio
+import json
+import math
+import re
+import time
+from collections import deque
+from typing import Optional
+
+from .config import (ADMISSION_ENABLED, AI_ROUTE_CONCURRENCY,
+                     AI_ROUTE_MAX_WAIT_MS, AI_ROUTE_QUEUE_SIZE,
+                     DB_ROUTE_CONCURRENCY, DB_ROUTE_MAX_WAIT_MS,
+                     DB_ROUTE_QUEUE_SIZE, logger)
+
+# (método, ruta) -> bulkhead. Lo que no aparece (health, metrics, stream,
+# export/import) no pasa por control de admisión.
+ROUTE_BULKHEADS = [
+    ("POST", re.compile(r"^/products/?$"), "ai"),
+    ("POST", re.compile(r"^/products/[^/]+/(sell|stock-shards)$"), "db"),
+    ("GET", re.compile(r"^/products(/search|/facets)?/?$"), "db"),
+]
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """Límite de requests simultáneos con una cola FIFO acotada.
+
+    Con la cola llena el request se rechaza en el acto (429); si espera en
+    la cola más de `max_wait_ms` se descarta (503). Así un grupo de rutas
+    saturado no consume los recursos del resto."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait_ms: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait_ms / 1000
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._service_time = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.shed = 0
+        self.queue_wait_total = 0.0
+        self.max_queue_wait = 0.0
+
+    def retry_after(self) -> int:
+        # Tiempo estimado hasta que se vacíe lo que hay delante
+        backlog = (len(self._waiters) + 1) / max(self.limit, 1)
+        return min(30, max(1, math.ceil(self._service_time * backlog)))
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Rejected(429, "Demasiados requests en cola, reintentar más tarde",
+                           self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # El lugar llegó justo al vencer: se devuelve o se usa
+                if isinstance(e, asyncio.CancelledError):
+                    self.release()
+                    raise
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.shed += 1
+                raise Rejected(503, "Servicio saturado, reintentar más tarde",
+                               self.retry_after())
+        waited = time.perf_counter() - start
+        self.queue_wait_total += waited
+        self.max_queue_wait = max(self.max_queue_wait, waited)
+        self.admitted += 1
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        if service_time is not None:
+            self._service_time = (
+                service_time if not self._service_time
+                else 0.8 * self._service_time + 0.2 * service_time
+            )
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # El lugar pasa directo al siguiente en la cola
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued_now": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "avg_queue_wait_ms": round(
+                self.queue_wait_total / self.queued * 1000 if self.queued else 0.0, 1
+            ),
+            "max_queue_wait_ms": round(self.max_queue_wait * 1000, 1),
+        }
+
+
+bulkheads = {
+    "ai": Bulkhead("ai", AI_ROUTE_CONCURRENCY, AI_ROUTE_QUEUE_SIZE, AI_ROUTE_MAX_WAIT_MS),
+    "db": Bulkhead("db", DB_ROUTE_CONCURRENCY, DB_ROUTE_QUEUE_SIZE, DB_ROUTE_MAX_WAIT_MS),
+}
+
+
+def bulkhead_for(method: str, path: str) -> Optional[Bulkhead]:
+    for route_method, pattern, name in ROUTE_BULKHEADS:
+        if method == route_method and pattern.match(path):
+            return bulkheads[name]
+    return None
+
+
+def admission_stats() -> dict:
+    return {
+        "enabled": ADMISSION_ENABLED,
+        **{name: bulkhead.stats() for name, bulkhead in bulkheads.items()},
+    }
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI: admite cada request en su bulkhead antes de resolver
+    dependencias, así un request en cola todavía no tiene sesión de base de
+    datos. Los rechazos responden 429/503 con `Retry-After`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        bulkhead = None
+        if ADMISSION_ENABLED and scope["type"] == "http":
+            bulkhead = bulkhead_for(scope["method"], scope["path"])
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await bulkhead.acquire()
+        except Rejected as e:
+            logger.warning(
+                "request_rejected",
+                bulkhead=bulkhead.name,
+                path=scope["path"],
+                status_code=e.status_code,
+            )
+            await self._reject(send, e)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release(time.perf_counter() - start)
+
+    async def _reject(self, send, rejected: Rejected) -> None:
+        body = json.dumps({"detail": rejected.detail}, ensure_ascii=False).encode()
+        await send({
+            "type": "http.response.start",
+            "status": rejected.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejected.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -2,12 +2,21 @@ import os
 
 import structlog
 
-structlog.configure(
-    processors=[
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.JSONRenderer(),
-    ]
+from .logging_setup import configure_logging
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
+# Fracción de eventos de éxito de alto volumen que se escriben
+# ("evento=fracción,..."); advertencias y errores se escriben siempre
+LOG_SAMPLE_RATES = os.getenv(
+    "LOG_SAMPLE_RATES",
+    "product_sold=0.1,create_product_request=0.1",
 )
+# Largo máximo de cada campo de texto en los logs
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", 512))
+# Líneas de log en cola como máximo; con la cola llena se descartan
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+configure_logging(LOG_LEVEL, LOG_SAMPLE_RATES, LOG_MAX_FIELD_CHARS, LOG_QUEUE_SIZE)
 
 logger = structlog.get_logger()
 
@@ -20,8 +29,70 @@ ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(
 )
 PORT = int(os.getenv("PORT", 8000))
 LOW_STOCK_THRESHOLD = int(os.getenv("LOW_STOCK_THRESHOLD", 10))
+# Productos creados con stock >= STOCK_SHARD_MIN_STOCK reparten su stock en
+# STOCK_SHARDS contadores (1 = desactivado)
+STOCK_SHARDS = int(os.getenv("STOCK_SHARDS", 1))
+STOCK_SHARD_MIN_STOCK = int(os.getenv("STOCK_SHARD_MIN_STOCK", 100))
+# Group commit de ventas: junta las ventas de una ventana corta en una sola
+# transacción (por worker: cada worker agrupa sólo sus ventas)
+SELL_BATCHING_ENABLED = os.getenv("SELL_BATCHING_ENABLED", "false").lower() == "true"
+SELL_BATCH_WINDOW_MS = float(os.getenv("SELL_BATCH_WINDOW_MS", 5))
+SELL_BATCH_MAX_SIZE = int(os.getenv("SELL_BATCH_MAX_SIZE", 100))
+# Reusar descripción y categoría de un producto casi idéntico (Jaccard sobre
+# n-gramas del nombre y keywords) en lugar de llamar a microservicio-ia
+SIMILARITY_ENABLED = os.getenv("SIMILARITY_ENABLED", "false").lower() == "true"
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", 0.8))
+# Export / import masivo del catálogo
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 1000))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+IMPORT_ENRICH_CONCURRENCY = int(os.getenv("IMPORT_ENRICH_CONCURRENCY", 4))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 100))
+# Feed de cambios (GET /products/stream)
+CHANGE_FEED_CHANNEL = os.getenv("CHANGE_FEED_CHANNEL", "product_changes")
+CHANGE_FEED_QUEUE_SIZE = int(os.getenv("CHANGE_FEED_QUEUE_SIZE", 256))
+CHANGE_FEED_HISTORY = int(os.getenv("CHANGE_FEED_HISTORY", 1000))
+CHANGE_FEED_HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", 15))
+# Idempotency-Key en POST /products y /sell: cuánto se guarda la respuesta y
+# cuánto bloquea un request en curso (debe cubrir las llamadas a la IA)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 180))
+# Control de admisión: requests simultáneos, cola y espera máxima en cola
+# por grupo de rutas (ai: POST /products; db: listados, búsqueda y ventas).
+# Son por worker: el total del servicio es el valor por WEB_CONCURRENCY.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+AI_ROUTE_CONCURRENCY = int(os.getenv("AI_ROUTE_CONCURRENCY", 8))
+AI_ROUTE_QUEUE_SIZE = int(os.getenv("AI_ROUTE_QUEUE_SIZE", 32))
+AI_ROUTE_MAX_WAIT_MS = int(os.getenv("AI_ROUTE_MAX_WAIT_MS", 5000))
+DB_ROUTE_CONCURRENCY = int(os.getenv("DB_ROUTE_CONCURRENCY", 8))
+DB_ROUTE_QUEUE_SIZE = int(os.getenv("DB_ROUTE_QUEUE_SIZE", 200))
+DB_ROUTE_MAX_WAIT_MS = int(os.getenv("DB_ROUTE_MAX_WAIT_MS", 1000))
+# Velocidad de venta: cada SALES_ROLLUP_INTERVAL s se agregan las ventas
+# nuevas a los rollups por hora/día; cada SALES_RECOMPUTE_INTERVAL s se
+# recalcula la velocidad de todo el catálogo. REORDER_COVER_DAYS > 0 alerta
+# también cuando el stock alcanza para menos de esos días.
+SALES_ROLLUP_INTERVAL = float(os.getenv("SALES_ROLLUP_INTERVAL", 5))
+SALES_RECOMPUTE_INTERVAL = float(os.getenv("SALES_RECOMPUTE_INTERVAL", 3600))
+SALES_VELOCITY_WINDOW_DAYS = int(os.getenv("SALES_VELOCITY_WINDOW_DAYS", 7))
+REORDER_COVER_DAYS = float(os.getenv("REORDER_COVER_DAYS", 0))
+# Barrido de stock bajo: cada STOCK_SWEEP_INTERVAL s busca los productos bajo
+# LOW_STOCK_THRESHOLD y manda un digest con los nuevos a microservicio-alertas
+# (en lotes de hasta STOCK_SWEEP_DIGEST_MAX_ITEMS). Activo, reemplaza la
+# alerta por cada venta: desactivado por defecto.
+STOCK_SWEEP_ENABLED = os.getenv("STOCK_SWEEP_ENABLED", "false").lower() == "true"
+STOCK_SWEEP_INTERVAL = float(os.getenv("STOCK_SWEEP_INTERVAL", 30))
+STOCK_SWEEP_DIGEST_MAX_ITEMS = int(os.getenv("STOCK_SWEEP_DIGEST_MAX_ITEMS", 100))
+# Estado compartido entre workers (health, versión del índice de similitud):
+# sqlite:///ruta (workers de la misma máquina; por defecto en /dev/shm) o
+# redis://host:puerto/db
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+# Revisión de dependencias en segundo plano (GET /health, /health/ready)
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 10))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", 5))
 ALERTS_SERVICE_URL = os.getenv(
     "ALERTS_SERVICE_URL",
     "http://microservicio-alertas:8002",
 )
 ALERTS_WEBHOOK_TIMEOUT = int(os.getenv("ALERTS_WEBHOOK_TIMEOUT", 10))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "data/traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318")
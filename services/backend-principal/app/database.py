@@ -1,13 +1,47 @@
-from sqlalchemy import create_engine
+import fcntl
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from .config import DATABASE_URL
+from .tracing import record_span
+
+connect_args = {}
+if DATABASE_URL.startswith("sqlite"):
+    # Las sesiones se usan desde el event loop y desde el threadpool de FastAPI
+    connect_args["check_same_thread"] = False
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    connect_args=connect_args,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Clave del advisory lock de Postgres que serializa la preparación del esquema
+SCHEMA_LOCK_KEY = 7310
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # En el contexto de la ejecución: si la query falla, after_cursor_execute
+    # no se llama y el inicio se descarta junto con el contexto.
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query_span(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    record_span("db", start, time.perf_counter(), statement=statement.split(None, 1)[0])
+
 
 def get_db():
     db = SessionLocal()
@@ -15,3 +49,46 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def schema_lock():
+    """Con varios workers, sólo uno crea tablas e índices a la vez: dos
+    `create_all` concurrentes fallan con "table already exists". Postgres usa
+    un advisory lock; SQLite, un lock de archivo junto a la base."""
+    if engine.dialect.name == "sqlite":
+        database = engine.url.database
+        if not database or database == ":memory:":
+            yield
+            return
+        with open(f"{database}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+        return
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+
+def add_missing_columns(table: str, columns: Dict[str, str]) -> None:
+    """Agrega a `table` las columnas de `columns` (`{nombre: definición}`) que
+    todavía no tenga, y después los índices del modelo que falten:
+    `create_all` no modifica tablas existentes. Se llama dentro de
+    `schema_lock()`."""
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            for column, ddl in columns.items():
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl}"))
+        else:
+            existing = {column["name"] for column in inspect(conn).get_columns(table)}
+            for column, ddl in columns.items():
+                if column not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    for index in Base.metadata.tables[table].indexes:
+        index.create(bind=engine, checkfirst=True)
@@ -1,3 +1,5 @@
+import uuid
+
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
@@ -6,7 +8,14 @@ from .models import Product
 
 
 def get_product_or_404(product_id: str, db: Session = Depends(get_db)) -> Product:
-    product = db.query(Product).filter(Product.id == product_id).first()
+    try:
+        product_uuid = uuid.UUID(product_id)
+    except ValueError:
+        product_uuid = None
+
+    product = None
+    if product_uuid:
+        product = db.query(Product).filter(Product.id == product_uuid).first()
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,11 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .config import ALLOWED_ORIGINS, PORT, logger
-from .database import Base, engine
-from .routes import health, products
-
-Base.metadata.create_all(bind=engine)
+from .admission import AdmissionMiddleware
+from .config import ALLOWED_ORIGINS, PORT, STOCK_SWEEP_ENABLED, logger
+from .database import (Base, SessionLocal, add_missing_columns, engine,
+                       schema_lock)
+from .logging_setup import flush_logs
+from .models import PRODUCT_ADDED_COLUMNS
+from .routes import health, metrics, products
+from .services.categories import CategoryService
+from .services.change_feed import change_feed
+from .services.health import health_monitor
+from .services.sales import sales_rollups
+from .services.search import setup_search
+from .services.sell_batcher import sell_batcher
+from .services.stock_sweep import stock_sweep
+from .tracing import TracingMiddleware
 
 app = FastAPI(
     title="Backend Principal",
@@ -13,26 +23,62 @@ app = FastAPI(
     description="API principal para gestión de productos con IA",
 )
 
+# Interno a CORS y tracing: los rechazos llevan sus headers
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Server-Timing",
+        "traceparent",
+        "Retry-After",
+        "Idempotent-Replayed",
+    ],
 )
+app.add_middleware(TracingMiddleware)
 
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(products.router)
 
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("service_starting", service="backend-principal", port=PORT)
+    # Crear tablas al arrancar y no al importar: importar la app no abre
+    # conexiones a la base de datos.
+    with schema_lock():
+        Base.metadata.create_all(bind=engine)
+        add_missing_columns("products", PRODUCT_ADDED_COLUMNS)
+        setup_search()
+
+        # Productos anteriores al árbol de categorías
+        db = SessionLocal()
+        try:
+            CategoryService(db).backfill()
+        finally:
+            db.close()
+
+    change_feed.start()
+    health_monitor.start()
+    sales_rollups.start()
+    if STOCK_SWEEP_ENABLED:
+        stock_sweep.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("service_shutdown", service="backend-principal")
+    # Confirmar las ventas que quedaron en la ventana antes de salir
+    await sell_batcher.stop()
+    change_feed.stop()
+    await health_monitor.stop()
+    await sales_rollups.stop()
+    await stock_sweep.stop()
+    flush_logs()
 
 
 if __name__ == "__main__":
@@ -1,12 +1,19 @@
 import uuid
 
-from sqlalchemy import (JSON, TIMESTAMP, CheckConstraint, Column, Integer,
-                        String, Text)
+from sqlalchemy import (JSON, TIMESTAMP, BigInteger, CheckConstraint, Column,
+                        Float, ForeignKey, Index, Integer, String, Text)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 
 from .database import Base
 
+# Columnas de `products` agregadas después de la primera versión del esquema;
+# al arrancar se agregan a las bases existentes (`add_missing_columns`)
+PRODUCT_ADDED_COLUMNS = {
+    "stock_shards": "INTEGER NOT NULL DEFAULT 0",
+    "category_id": "INTEGER REFERENCES categories(id)",
+}
+
 
 class Product(Base):
     __tablename__ = "products"
@@ -15,8 +22,11 @@ class Product(Base):
     name = Column(String(200), nullable=False)
     keywords = Column(JSON, nullable=False, default=[])
     stock = Column(Integer, nullable=False, default=0)
+    # > 1 cuando el stock vive repartido en ProductStockShard y `stock` es 0
+    stock_shards = Column(Integer, nullable=False, default=0, server_default="0")
     description = Column(Text)
     category = Column(String(300))
+    category_id = Column(Integer, ForeignKey("categories.id"))
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(
         TIMESTAMP(timezone=True),
@@ -26,4 +36,134 @@ class Product(Base):
 
     __table_args__ = (
         CheckConstraint("stock >= 0", name="check_stock_non_negative"),
+        # Barrido de stock bajo (rango stock < umbral)
+        Index("idx_products_stock", "stock"),
+        # Mismo nombre que en database-schema.sql
+        Index("idx_products_category_id", "category_id"),
+    )
+
+
+class Category(Base):
+    """Nodo del árbol de categorías con ruta materializada.
+
+    `path_key` es la ruta normalizada (`electronica/audio/audifonos`): los
+    descendientes de un nodo son los que empiezan con `path_key + "/"`.
+    `product_count` cuenta los productos del subárbol y se actualiza al crear
+    cada producto."""
+
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    parent_id = Column(Integer, ForeignKey("categories.id"), index=True)
+    name = Column(String(100), nullable=False)
+    key = Column(String(100), nullable=False)
+    path = Column(String(300), nullable=False)
+    path_key = Column(String(300), nullable=False, unique=True)
+    depth = Column(Integer, nullable=False)
+    product_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("idx_categories_depth", "depth"),
+    )
+
+
+class ProductStockShard(Base):
+    __tablename__ = "product_stock_shards"
+
+    product_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("products.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    slot = Column(Integer, primary_key=True)
+    stock = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint("stock >= 0", name="check_shard_stock_non_negative"),
+    )
+
+
+class SaleEvent(Base):
+    """Registro append-only de ventas; lo escribe cada camino de venta en la
+    misma transacción que descuenta el stock."""
+
+    __tablename__ = "sales_events"
+
+    # BIGSERIAL en Postgres; en SQLite sólo INTEGER PRIMARY KEY es autoincremental
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True,
+                autoincrement=True)
+    product_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("products.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    quantity = Column(Integer, nullable=False, default=1)
+    sold_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("idx_sales_events_product_sold_at", "product_id", "sold_at"),
+    )
+
+
+class SalesRollup(Base):
+    """Unidades vendidas por producto en cada hora (`period="hour"`) o día
+    (`period="day"`), mantenidas incrementalmente desde `sales_events`."""
+
+    __tablename__ = "sales_rollups"
+
+    product_id = Column(UUID(as_uuid=True), primary_key=True)
+    period = Column(String(4), primary_key=True)
+    bucket = Column(TIMESTAMP(timezone=True), primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_sales_rollups_period_bucket", "period", "bucket"),
     )
+
+
+class ProductSalesStats(Base):
+    """Velocidad de venta por producto: promedio móvil de unidades por día
+    sobre los últimos `SALES_VELOCITY_WINDOW_DAYS` días."""
+
+    __tablename__ = "product_sales_stats"
+
+    product_id = Column(UUID(as_uuid=True), primary_key=True)
+    units_24h = Column(Integer, nullable=False, default=0)
+    units_window = Column(Integer, nullable=False, default=0)
+    velocity = Column(Float, nullable=False, default=0.0)
+    last_sale_at = Column(TIMESTAMP(timezone=True))
+    updated_at = Column(TIMESTAMP(timezone=True))
+
+
+class SalesRollupState(Base):
+    """Último `sales_events.id` incorporado a los rollups (una sola fila).
+
+    `pending_ids` son los ids menores que `last_event_id` que no estaban
+    visibles en la pasada que lo avanzó (transacciones todavía sin
+    confirmar), como `[id, epoch en que se detectó]`."""
+
+    __tablename__ = "sales_rollup_state"
+
+    id = Column(Integer, primary_key=True)
+    last_event_id = Column(BigInteger, nullable=False, default=0)
+    pending_ids = Column(JSON)
+    recomputed_at = Column(TIMESTAMP(timezone=True))
+
+
+class IdempotencyKey(Base):
+    """Respuesta guardada para un `Idempotency-Key`. Mientras el primer
+    request está en curso `status` es `in_progress` y bloquea repeticiones
+    hasta `locked_until`; al terminar guarda la respuesta hasta `expires_at`
+    (segundos epoch)."""
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(200), primary_key=True)
+    scope = Column(String(300), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False)
+    response_status = Column(Integer)
+    response_body = Column(JSON)
+    locked_until = Column(Float, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
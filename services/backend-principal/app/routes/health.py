@@ -1,8 +1,10 @@
 from datetime import datetime
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
 from ..schemas import HealthResponse
+from ..services.health import health_monitor
 
 router = APIRouter(tags=["Health"])
 
@@ -10,9 +12,28 @@ router = APIRouter(tags=["Health"])
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     return HealthResponse(
-        status="healthy",
+        status=health_monitor.status,
         service="backend-principal",
         version="1.0.0",
         timestamp=datetime.utcnow().isoformat() + "Z",
-        dependencies={"database": "ok", "ia_service": "ok"},
+        dependencies=health_monitor.snapshot(),
+    )
+
+
+@router.get("/health/live")
+async def liveness():
+    """El proceso responde; no revisa dependencias."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Listo para recibir tráfico: dependencias críticas OK según la última
+    revisión en segundo plano."""
+    return JSONResponse(
+        status_code=200 if health_monitor.ready else 503,
+        content={
+            "status": "ready" if health_monitor.ready else "not_ready",
+            "dependencies": health_monitor.snapshot(),
+        },
     )
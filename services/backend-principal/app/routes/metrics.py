@@ -0,0 +1,37 @@
+import os
+
+from fastapi import APIRouter
+
+from ..admission import admission_stats
+from ..config import SIMILARITY_ENABLED, STOCK_SWEEP_ENABLED
+from ..logging_setup import logging_stats
+from ..services.change_feed import change_feed
+from ..services.sales import sales_rollups
+from ..services.similarity import similarity_index
+from ..services.stock_sweep import stock_sweep
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics")
+async def get_metrics():
+    return {
+        "service": "backend-principal",
+        # Los contadores son de este worker
+        "worker_pid": os.getpid(),
+        "enrichment_reuse": {
+            "enabled": SIMILARITY_ENABLED,
+            **similarity_index.stats(),
+        },
+        "admission": admission_stats(),
+        "sales_rollups": sales_rollups.stats(),
+        "stock_sweep": {
+            "enabled": STOCK_SWEEP_ENABLED,
+            **stock_sweep.stats(),
+        },
+        "change_feed": {
+            "subscribers": change_feed.subscribers,
+            "transport": "notify" if change_feed.use_notify else "local",
+        },
+        "logging": logging_stats(),
+    }
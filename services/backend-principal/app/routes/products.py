@@ -1,13 +1,25 @@
-from typing import List
+import asyncio
+import json
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (APIRouter, Depends, Header, HTTPException, Query, Request,
+                     status)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from ..config import logger
+from ..config import CHANGE_FEED_HEARTBEAT, SALES_VELOCITY_WINDOW_DAYS, logger
 from ..database import get_db
 from ..dependencies import get_product_or_404
-from ..schemas import ProductCreate, ProductResponse, SellResponse
+from ..schemas import (FacetsResponse, ImportResult, ProductCreate,
+                       ProductResponse, ProductSearchResult, SalesDay,
+                       SalesStatsResponse, SellResponse, StockShardRequest)
+from ..services.bulk import MEDIA_TYPES, ProductImporter, export_products
+from ..services.categories import CategoryService
+from ..services.change_feed import change_feed
+from ..services.idempotency import run_idempotent
 from ..services.product_service import ProductService
+from ..services.sales import SalesService, as_utc, days_of_cover
+from ..services.stock_shards import StockShardService
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -20,37 +32,208 @@ router = APIRouter(prefix="/products", tags=["Products"])
 async def create_product(
     product: ProductCreate,
     db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=200),
 ):
-    try:
-        service = ProductService(db)
-        return await service.create_product(product)
-    except Exception as e:
-        logger.error("create_product_error", error=str(e))
-        db.rollback()
+    async def create():
+        try:
+            service = ProductService(db)
+            return await service.create_product(product)
+        except Exception as e:
+            logger.error("create_product_error", error=str(e))
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e),
+            )
+
+    return await run_idempotent(
+        idempotency_key,
+        "POST /products",
+        product.model_dump(),
+        create,
+        ProductResponse,
+        status.HTTP_201_CREATED,
+    )
+
+
+def get_category_or_404(
+    category_id: Optional[int],
+    category: Optional[str],
+    db: Session,
+):
+    if category_id is None and not category:
+        return None
+    found = CategoryService(db).find(category_id=category_id, path=category)
+    if found is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e),
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Categoría no encontrada",
         )
+    return found
 
 
 @router.get("", response_model=List[ProductResponse])
-async def list_products(db: Session = Depends(get_db)):
+async def list_products(
+    category_id: Optional[int] = None,
+    category: Optional[str] = Query(None, description='Ruta, p. ej. "Hogar > Cocina"'),
+    db: Session = Depends(get_db),
+):
+    service = ProductService(db)
+    return service.list_products(get_category_or_404(category_id, category, db))
+
+
+@router.get("/search", response_model=List[ProductSearchResult])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """Búsqueda de texto en nombre, keywords y descripción, ordenada por
+    relevancia."""
     service = ProductService(db)
-    return service.list_products()
+    return [
+        ProductSearchResult(
+            **ProductResponse.model_validate(product).model_dump(),
+            rank=rank,
+        )
+        for product, rank in service.search_products(q, limit, offset)
+    ]
+
+
+@router.get("/stream")
+async def stream_changes(request: Request):
+    """Server-Sent Events con los cambios de productos: `created` (producto
+    ya enriquecido), `stock` (`{id, stock}`) y `resync` (volver a pedir
+    `GET /products`)."""
+    subscriber = change_feed.subscribe(request.headers.get("last-event-id"))
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event_id, event = await asyncio.wait_for(
+                        subscriber.get(),
+                        timeout=CHANGE_FEED_HEARTBEAT,
+                    )
+                except asyncio.TimeoutError:
+                    # Comentario SSE para que proxies no cierren la conexión
+                    yield ": ping\n\n"
+                    continue
+                data = json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+                yield f"id: {event_id}\ndata: {data}\n\n"
+        finally:
+            change_feed.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export")
+async def export_catalog(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Catálogo completo en NDJSON o CSV, enviado a medida que se lee."""
+    return StreamingResponse(
+        export_products(format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_catalog(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    enrich: bool = False,
+):
+    """Carga un archivo NDJSON o CSV (cuerpo crudo, p. ej. `curl --data-binary`)
+    en lotes mientras se recibe. Con `enrich=true` completa con IA las filas
+    sin descripción o categoría."""
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+
+    importer = ProductImporter(enrich=enrich)
+    return await importer.run(request.stream(), format)
+
+
+@router.get("/facets", response_model=FacetsResponse)
+async def category_facets(
+    category_id: Optional[int] = None,
+    category: Optional[str] = Query(None, description='Ruta, p. ej. "Hogar > Cocina"'),
+    db: Session = Depends(get_db),
+):
+    """Subcategorías del nivel pedido (raíces si no se indica) con su
+    conteo de productos, leído de los agregados del árbol."""
+    parent = get_category_or_404(category_id, category, db)
+    facets = CategoryService(db).children(parent)
+    total = parent.product_count if parent else sum(f.product_count for f in facets)
+    return FacetsResponse(parent=parent, total_products=total, facets=facets)
 
 
 @router.post("/{product_id}/sell", response_model=SellResponse)
 async def sell_product(
     product_id: str,
     db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=200),
 ):
-    product = get_product_or_404(product_id, db)
+    async def sell():
+        product = get_product_or_404(product_id, db)
 
-    service = ProductService(db)
-    product = await service.sell_product(product)
+        service = ProductService(db)
+        product = await service.sell_product(product)
 
-    return SellResponse(
-        id=product.id,
-        name=product.name,
+        return SellResponse(
+            id=product.id,
+            name=product.name,
+            stock=product.stock,
+        )
+
+    return await run_idempotent(
+        idempotency_key,
+        f"POST /products/{product_id}/sell",
+        None,
+        sell,
+        SellResponse,
+    )
+
+
+@router.get("/{product_id}/sales", response_model=SalesStatsResponse)
+async def product_sales(
+    product_id: str,
+    db: Session = Depends(get_db),
+):
+    """Velocidad de venta (promedio móvil de unidades por día), días de
+    cobertura del stock actual y ventas por día dentro de la ventana."""
+    product = get_product_or_404(product_id, db)
+    StockShardService(db).apply_totals([product])
+
+    sales = SalesService(db)
+    stats = sales.stats(product.id)
+    velocity = stats.velocity if stats else 0.0
+    return SalesStatsResponse(
+        product_id=product.id,
         stock=product.stock,
+        velocity_per_day=round(velocity, 3),
+        units_24h=stats.units_24h if stats else 0,
+        units_window=stats.units_window if stats else 0,
+        window_days=SALES_VELOCITY_WINDOW_DAYS,
+        days_of_cover=days_of_cover(product.stock, velocity),
+        last_sale_at=as_utc(stats.last_sale_at) if stats and stats.last_sale_at else None,
+        daily=[SalesDay(day=day, units=units) for day, units in sales.daily(product.id)],
     )
+
+
+@router.post("/{product_id}/stock-shards", response_model=ProductResponse)
+async def shard_product_stock(
+    product_id: str,
+    request: StockShardRequest,
+    db: Session = Depends(get_db),
+):
+    product = get_product_or_404(product_id, db)
+
+    service = ProductService(db)
+    return service.shard_stock(product, request.slots)
@@ -1,3 +1,4 @@
+import json
 import uuid
 from datetime import datetime
 from typing import List, Optional
@@ -22,6 +23,7 @@ class ProductResponse(BaseModel):
     stock: int
     description: Optional[str]
     category: Optional[str]
+    category_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
@@ -29,12 +31,100 @@ class ProductResponse(BaseModel):
         from_attributes = True
 
 
+class ProductSearchResult(ProductResponse):
+    rank: float
+
+
 class SellResponse(BaseModel):
     id: uuid.UUID
     name: str
     stock: int
 
 
+class SalesDay(BaseModel):
+    day: datetime
+    units: int
+
+
+class SalesStatsResponse(BaseModel):
+    product_id: uuid.UUID
+    stock: int
+    velocity_per_day: float
+    units_24h: int
+    units_window: int
+    window_days: int
+    days_of_cover: Optional[float]
+    last_sale_at: Optional[datetime]
+    daily: List[SalesDay]
+
+
+class CategoryFacet(BaseModel):
+    id: int
+    name: str
+    path: str
+    depth: int
+    product_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class FacetsResponse(BaseModel):
+    parent: Optional[CategoryFacet]
+    total_products: int
+    facets: List[CategoryFacet]
+
+
+class ProductImportRow(BaseModel):
+    id: Optional[uuid.UUID] = None
+    name: str = Field(..., min_length=1, max_length=200)
+    keywords: List[str] = Field(default_factory=list, max_items=50)
+    stock: int = Field(0, ge=0)
+    description: Optional[str] = None
+    category: Optional[str] = Field(None, max_length=300)
+
+    @validator("keywords", pre=True)
+    def parse_keywords(cls, v):
+        # En CSV llegan como arreglo JSON (lo que genera el export) o
+        # separadas por ";"
+        if isinstance(v, str):
+            v = v.strip()
+            if v.startswith("["):
+                v = json.loads(v)
+            else:
+                v = v.split(";")
+        return [str(k).strip() for k in v or [] if str(k).strip()]
+
+    @validator("id", "description", "category", pre=True)
+    def empty_to_none(cls, v):
+        # Celdas vacías del CSV (p. ej. filas nuevas agregadas a un export)
+        if isinstance(v, str) and not v.strip():
+            return None
+        return v
+
+    @validator("stock", pre=True)
+    def empty_stock(cls, v):
+        if v is None or (isinstance(v, str) and not v.strip()):
+            return 0
+        return v
+
+
+class ImportIssue(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    imported: int
+    skipped: int
+    enriched: int
+    errors: List[ImportIssue]
+
+
+class StockShardRequest(BaseModel):
+    slots: int = Field(..., ge=1, le=256)
+
+
 class HealthResponse(BaseModel):
     status: str
     service: str
@@ -0,0 +1,398 @@
+import asyncio
+import codecs
+import csv
+import io
+import json
+import queue
+import threading
+import uuid
+from collections import Counter
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import case, func, insert, select, update
+
+from ..config import (EXPORT_CHUNK_ROWS, IMPORT_BATCH_SIZE,
+                      IMPORT_ENRICH_CONCURRENCY, IMPORT_MAX_ERRORS, logger)
+from ..database import SessionLocal, engine
+from ..models import Category, Product, ProductStockShard
+from ..schemas import ProductImportRow
+from .categories import CategoryService
+from .change_feed import change_feed
+from .ia_client import generate_category, generate_description
+from .similarity import similarity_index
+
+EXPORT_COLUMNS = [
+    "id", "name", "keywords", "stock", "description", "category",
+    "category_id", "created_at", "updated_at",
+]
+IMPORT_COLUMNS = ["id", "name", "keywords", "stock", "description", "category", "category_id"]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_statement():
+    # Stock total: products.stock más los contadores de productos fragmentados
+    shard_totals = (
+        select(
+            ProductStockShard.product_id,
+            func.sum(ProductStockShard.stock).label("stock"),
+        )
+        .group_by(ProductStockShard.product_id)
+        .subquery()
+    )
+    return (
+        select(
+            Product.id,
+            Product.name,
+            Product.keywords,
+            (Product.stock + func.coalesce(shard_totals.c.stock, 0)).label("stock"),
+            Product.description,
+            Product.category,
+            Product.category_id,
+            Product.created_at,
+            Product.updated_at,
+        )
+        .outerjoin(shard_totals, shard_totals.c.product_id == Product.id)
+    )
+
+
+def export_products(fmt: str) -> Iterator[bytes]:
+    """Genera el catálogo en NDJSON o CSV por partes, sin cargarlo en
+    memoria: `COPY ... TO STDOUT` en Postgres, cursor del lado del servidor
+    en los demás motores."""
+    if engine.dialect.name == "postgresql":
+        return _copy_export(fmt)
+    return _cursor_export(fmt)
+
+
+class _QueueWriter:
+    """Archivo de sólo escritura que pasa lo que recibe a una cola acotada.
+    `COPY` se detiene (lanza) si el cliente se desconectó."""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode()
+        while True:
+            if self.cancelled.is_set():
+                raise IOError("Exportación cancelada")
+            try:
+                self.chunks.put(data, timeout=1)
+                return len(data)
+            except queue.Full:
+                continue
+
+
+def _copy_export(fmt: str) -> Iterator[bytes]:
+    query = str(export_statement().compile(
+        dialect=engine.dialect,
+        compile_kwargs={"literal_binds": True},
+    ))
+    if fmt == "csv":
+        sql = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)"
+    else:
+        # Una línea JSON por fila. Con FORMAT csv y QUOTE/DELIMITER que no
+        # aparecen en JSON, COPY emite el texto sin escaparlo.
+        sql = (
+            f"COPY (SELECT row_to_json(t) FROM ({query}) t) TO STDOUT "
+            "WITH (FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02')"
+        )
+
+    chunks: queue.Queue = queue.Queue(maxsize=64)
+    cancelled = threading.Event()
+
+    def produce():
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.copy_expert(sql, _QueueWriter(chunks, cancelled))
+            cursor.close()
+            raw.rollback()
+        except Exception as e:
+            if not cancelled.is_set():
+                logger.error("export_error", error=str(e))
+                chunks.put(e)
+        finally:
+            raw.close()
+            chunks.put(None)
+
+    threading.Thread(target=produce, name="copy-export", daemon=True).start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
+
+def _json_value(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _cursor_export(fmt: str) -> Iterator[bytes]:
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True,
+            yield_per=EXPORT_CHUNK_ROWS,
+        ).execute(export_statement())
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in result.partitions():
+                for row in rows:
+                    values = [_json_value(v) for v in row]
+                    values[2] = json.dumps(values[2], ensure_ascii=False)
+                    writer.writerow(values)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+            return
+
+        for rows in result.partitions():
+            yield "".join(
+                json.dumps(
+                    {col: _json_value(v) for col, v in zip(EXPORT_COLUMNS, row)},
+                    ensure_ascii=False,
+                ) + "\n"
+                for row in rows
+            ).encode()
+
+
+async def _decode_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, dict]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, {"__error__": f"JSON inválido: {e.msg}"}
+
+
+async def _csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, dict]]:
+    # Un registro puede ocupar varias líneas si un campo entre comillas tiene
+    # saltos; está completo cuando las comillas son pares
+    record = ""
+    line_no = 0
+    record_line = 1
+    header: Optional[List[str]] = None
+    async for line in lines:
+        line_no += 1
+        if not record:
+            record_line = line_no
+        record += line + "\n"
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not values:
+            continue
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            continue
+        yield record_line, dict(zip(header, values))
+
+
+def iter_records(stream: AsyncIterator[bytes],
+                 fmt: str) -> AsyncIterator[Tuple[int, dict]]:
+    """Convierte el cuerpo subido en `(línea, registro)` a medida que llega."""
+    lines = _decode_lines(stream)
+    return _ndjson_records(lines) if fmt == "ndjson" else _csv_records(lines)
+
+
+class ProductImporter:
+    """Carga productos en lotes de `IMPORT_BATCH_SIZE` mientras el archivo
+    llega, con memoria acotada al lote. Con `enrich`, las filas sin
+    descripción o categoría se completan con microservicio-ia antes de
+    insertarlas."""
+
+    def __init__(self, enrich: bool = False):
+        self.enrich = enrich
+        self.imported = 0
+        self.skipped = 0
+        self.enriched = 0
+        self.errors: List[dict] = []
+
+    def _error(self, line: int, error: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    async def run(self, stream: AsyncIterator[bytes], fmt: str) -> dict:
+        batch: List[Tuple[int, dict]] = []
+        async for line, data in iter_records(stream, fmt):
+            if not isinstance(data, dict):
+                self._error(line, "Se esperaba un objeto JSON")
+                continue
+            if "__error__" in data:
+                self._error(line, data["__error__"])
+                continue
+            try:
+                row = ProductImportRow(**data).model_dump()
+            except ValidationError as e:
+                self._error(line, "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+                    for err in e.errors()
+                ))
+                continue
+            batch.append((line, row))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+
+        if self.imported:
+            # Los productos importados entran al índice en la próxima carga
+            similarity_index.reset()
+            change_feed.resync("import")
+
+        logger.info(
+            "products_imported",
+            imported=self.imported,
+            skipped=self.skipped,
+            enriched=self.enriched,
+        )
+        return {
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "enriched": self.enriched,
+            "errors": self.errors,
+        }
+
+    async def _flush(self, batch: List[Tuple[int, dict]]) -> None:
+        if self.enrich:
+            semaphore = asyncio.Semaphore(IMPORT_ENRICH_CONCURRENCY)
+            await asyncio.gather(*(
+                self._enrich_row(semaphore, row)
+                for _, row in batch
+                if not row["description"] or not row["category"]
+            ))
+        inserted, duplicates = await asyncio.to_thread(self._write_batch, batch)
+        self.imported += inserted
+        for line in duplicates:
+            self._error(line, "Producto con ese id ya existe")
+
+    async def _enrich_row(self, semaphore: asyncio.Semaphore, row: dict) -> None:
+        async with semaphore:
+            try:
+                if not row["description"]:
+                    row["description"] = await generate_description(row["name"], row["keywords"])
+                if not row["category"]:
+                    row["category"] = await generate_category(row["name"], row["description"])
+                self.enriched += 1
+            except Exception as e:
+                # Se importa igual, sin el enriquecimiento
+                logger.warning("import_enrich_error", name=row["name"], error=str(e))
+
+    def _write_batch(self, batch: List[Tuple[int, dict]]) -> Tuple[int, List[int]]:
+        db = SessionLocal()
+        try:
+            given_ids = [row["id"] for _, row in batch if row["id"]]
+            existing = set()
+            if given_ids:
+                existing = set(db.execute(
+                    select(Product.id).where(Product.id.in_(given_ids))
+                ).scalars())
+
+            rows, duplicates, seen = [], [], set()
+            for line, row in batch:
+                row = dict(row)
+                if row["id"] in existing or row["id"] in seen:
+                    duplicates.append(line)
+                    continue
+                row["id"] = row["id"] or uuid.uuid4()
+                seen.add(row["id"])
+                rows.append(row)
+
+            increments = self._link_categories(db, rows)
+            if rows:
+                if engine.dialect.name == "postgresql":
+                    self._copy_rows(db, rows)
+                else:
+                    db.execute(insert(Product), rows)
+            if increments:
+                db.execute(
+                    update(Category)
+                    .where(Category.id.in_(list(increments)))
+                    .values(product_count=Category.product_count + case(
+                        *((Category.id == cid, n) for cid, n in increments.items()),
+                        else_=0,
+                    ))
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+            return len(rows), duplicates
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _link_categories(self, db, rows: List[dict]) -> Dict[int, int]:
+        categories = CategoryService(db)
+        chains: Dict[str, list] = {}
+        increments: Counter = Counter()
+        for row in rows:
+            row["category_id"] = None
+            raw = row["category"]
+            if not raw:
+                continue
+            if raw not in chains:
+                chains[raw] = categories.resolve(raw)
+            chain = chains[raw]
+            if chain:
+                row["category_id"] = chain[-1].id
+                row["category"] = chain[-1].path
+                increments.update(c.id for c in chain)
+        return increments
+
+    def _copy_rows(self, db, rows: List[dict]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for row in rows:
+            writer.writerow([
+                str(row["id"]),
+                row["name"],
+                json.dumps(row["keywords"], ensure_ascii=False),
+                row["stock"],
+                row["description"],
+                row["category"],
+                row["category_id"],
+            ])
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY products ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.close()
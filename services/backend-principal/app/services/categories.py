@@ -0,0 +1,149 @@
+import re
+from typing import List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import logger
+from ..models import Category, Product
+from .similarity import normalize
+
+MAX_DEPTH = 5
+SEGMENT_MAX_LENGTH = 100
+
+
+def category_key(name: str) -> str:
+    return normalize(name).replace(" ", "-")
+
+
+def parse_category_path(raw: Optional[str]) -> List[str]:
+    """Separa la salida del LLM (`"A > B > C"`) en niveles limpios."""
+    if not raw:
+        return []
+    # El modelo a veces agrega comillas, punto final o una segunda línea
+    first_line = raw.strip().splitlines()[0] if raw.strip() else ""
+    segments = []
+    for segment in first_line.split(">"):
+        segment = re.sub(r"\s+", " ", segment).strip(" \"'`*.")
+        if segment:
+            segments.append(segment[:SEGMENT_MAX_LENGTH])
+    return segments[:MAX_DEPTH]
+
+
+class CategoryService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def resolve(self, raw: Optional[str]) -> List[Category]:
+        """Devuelve la cadena raíz → hoja para la categoría sugerida, creando
+        los nodos que falten. Los niveles se comparan sin mayúsculas ni
+        acentos, así `electronica > audio` cae en `Electrónica > Audio`."""
+        chain: List[Category] = []
+        for name in parse_category_path(raw):
+            key = category_key(name)
+            if not key:
+                continue
+            parent = chain[-1] if chain else None
+            path_key = f"{parent.path_key}/{key}" if parent else key
+            chain.append(self._get_or_create(parent, name, key, path_key))
+        return chain
+
+    def _get_or_create(self, parent: Optional[Category], name: str, key: str,
+                       path_key: str) -> Category:
+        category = self._by_path_key(path_key)
+        if category is not None:
+            return category
+
+        category = Category(
+            parent_id=parent.id if parent else None,
+            name=name,
+            key=key,
+            path=f"{parent.path} > {name}" if parent else name,
+            path_key=path_key,
+            depth=parent.depth + 1 if parent else 0,
+            product_count=0,
+        )
+        try:
+            with self.db.begin_nested():
+                self.db.add(category)
+        except IntegrityError:
+            # Otra transacción creó el mismo nodo
+            return self._by_path_key(path_key)
+        return category
+
+    def _by_path_key(self, path_key: str) -> Optional[Category]:
+        return (
+            self.db.query(Category)
+            .filter(Category.path_key == path_key)
+            .one_or_none()
+        )
+
+    def assign(self, product: Product, raw: Optional[str]) -> None:
+        """Enlaza el producto con su categoría hoja y suma 1 al conteo de
+        toda la rama. No hace commit."""
+        chain = self.resolve(raw)
+        if not chain:
+            return
+        product.category_id = chain[-1].id
+        product.category = chain[-1].path
+        self.db.execute(
+            update(Category)
+            .where(Category.id.in_([c.id for c in chain]))
+            .values(product_count=Category.product_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    def children(self, parent: Optional[Category]) -> List[Category]:
+        query = self.db.query(Category)
+        if parent is None:
+            query = query.filter(Category.parent_id.is_(None))
+        else:
+            query = query.filter(Category.parent_id == parent.id)
+        return (
+            query.filter(Category.product_count > 0)
+            .order_by(Category.product_count.desc(), Category.name)
+            .all()
+        )
+
+    def find(self, category_id: Optional[int] = None,
+             path: Optional[str] = None) -> Optional[Category]:
+        if category_id is not None:
+            return self.db.get(Category, category_id)
+        if path:
+            keys = [category_key(name) for name in parse_category_path(path)]
+            return self._by_path_key("/".join(key for key in keys if key))
+        return None
+
+    def subtree_filter(self, category: Category):
+        return or_(
+            Category.id == category.id,
+            Category.path_key.like(f"{category.path_key}/%"),
+        )
+
+    def backfill(self, batch_size: int = 500) -> int:
+        """Enlaza productos con `category` de texto y sin `category_id`
+        (creados antes del árbol de categorías)."""
+        assigned = 0
+        last_id = None
+        while True:
+            query = self.db.query(Product).filter(
+                Product.category_id.is_(None),
+                Product.category.isnot(None),
+            )
+            if last_id is not None:
+                query = query.filter(Product.id > last_id)
+            products = query.order_by(Product.id).limit(batch_size).all()
+            if not products:
+                break
+            last_id = products[-1].id
+
+            for product in products:
+                if parse_category_path(product.category):
+                    self.assign(product, product.category)
+                    assigned += 1
+            self.db.commit()
+
+        if assigned:
+            logger.info("categories_backfilled", products=assigned)
+        return assigned
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import queue
+import secrets
+import select
+import threading
+from collections import deque
+from typing import Optional, Set
+
+from ..config import (CHANGE_FEED_CHANNEL, CHANGE_FEED_HISTORY,
+                      CHANGE_FEED_QUEUE_SIZE, logger)
+from ..database import engine
+
+# NOTIFY acepta hasta 8000 bytes por mensaje
+NOTIFY_MAX_BYTES = 7900
+
+
+class ChangeFeed:
+    """Difunde cambios de productos (altas, stock) a los clientes conectados
+    a `GET /products/stream`.
+
+    Con Postgres los eventos viajan por LISTEN/NOTIFY: cada worker publica con
+    NOTIFY y recibe (incluidos los propios) por LISTEN, así todos los clientes
+    ven los cambios sin importar qué worker atendió la venta. Con otros motores
+    se entregan sólo dentro del proceso.
+
+    Cada evento lleva un id `<época>-<secuencia>`; un cliente que reconecta con
+    `Last-Event-ID` recibe lo que se perdió si sigue en el historial de este
+    worker, o un evento `resync` para que vuelva a pedir el catálogo."""
+
+    def __init__(self):
+        self.epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._history: deque = deque(maxlen=CHANGE_FEED_HISTORY)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._outgoing: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.use_notify = engine.dialect.name == "postgresql"
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if self.use_notify and self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run_pg,
+                name="change-feed",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def publish(self, event: dict) -> None:
+        if self.use_notify and self._thread is not None:
+            self._outgoing.put(event)
+        else:
+            self._deliver(event)
+
+    def product_created(self, product) -> None:
+        from ..schemas import ProductResponse
+
+        self.publish({
+            "type": "created",
+            "product": ProductResponse.model_validate(product).model_dump(mode="json"),
+        })
+
+    def stock_changed(self, product_id, stock: int) -> None:
+        self.publish({"type": "stock", "id": str(product_id), "stock": stock})
+
+    def resync(self, reason: str) -> None:
+        self.publish({"type": "resync", "reason": reason})
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> asyncio.Queue:
+        subscriber: asyncio.Queue = asyncio.Queue(maxsize=CHANGE_FEED_QUEUE_SIZE)
+        if last_event_id:
+            for event_id, event in self._missed_since(last_event_id):
+                subscriber.put_nowait((event_id, event))
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: asyncio.Queue) -> None:
+        self._subscribers.discard(subscriber)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def _missed_since(self, last_event_id: str) -> list:
+        epoch, _, seq = last_event_id.partition("-")
+        history = list(self._history)
+        oldest = int(history[0][0].partition("-")[2]) if history else self._seq + 1
+        if epoch != self.epoch or not seq.isdigit() or int(seq) + 1 < oldest:
+            return [(self._next_id(), {"type": "resync", "reason": "history"})]
+        return [
+            (event_id, event) for event_id, event in history
+            if int(event_id.partition("-")[2]) > int(seq)
+        ]
+
+    def _next_id(self) -> str:
+        self._seq += 1
+        return f"{self.epoch}-{self._seq}"
+
+    def _deliver(self, event: dict) -> None:
+        event_id = self._next_id()
+        self._history.append((event_id, event))
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait((event_id, event))
+            except asyncio.QueueFull:
+                # Cliente lento: se descarta lo pendiente y se le pide resync
+                while not subscriber.empty():
+                    subscriber.get_nowait()
+                subscriber.put_nowait((event_id, {"type": "resync", "reason": "lagging"}))
+
+    def _encode(self, event: dict) -> str:
+        payload = json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+        if len(payload.encode()) > NOTIFY_MAX_BYTES and event.get("type") == "created":
+            product = dict(event["product"], description=None)
+            payload = json.dumps({**event, "product": product}, separators=(",", ":"),
+                                 ensure_ascii=False)
+        if len(payload.encode()) > NOTIFY_MAX_BYTES:
+            payload = json.dumps({"type": "resync", "reason": "payload"})
+        return payload
+
+    def _run_pg(self) -> None:
+        while not self._stopping.is_set():
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                dbapi_conn = raw.dbapi_connection
+                dbapi_conn.autocommit = True
+                cursor = dbapi_conn.cursor()
+                cursor.execute(f"LISTEN {CHANGE_FEED_CHANNEL}")
+                logger.info("change_feed_listening", channel=CHANGE_FEED_CHANNEL)
+
+                while not self._stopping.is_set():
+                    while True:
+                        try:
+                            event = self._outgoing.get_nowait()
+                        except queue.Empty:
+                            break
+                        cursor.execute(
+                            "SELECT pg_notify(%s, %s)",
+                            (CHANGE_FEED_CHANNEL, self._encode(event)),
+                        )
+
+                    if select.select([dbapi_conn], [], [], 0.05)[0]:
+                        dbapi_conn.poll()
+                        while dbapi_conn.notifies:
+                            notify = dbapi_conn.notifies.pop(0)
+                            self._loop.call_soon_threadsafe(
+                                self._deliver, json.loads(notify.payload)
+                            )
+            except Exception as e:
+                logger.error("change_feed_error", error=str(e))
+                if self._loop is not None:
+                    # Pudieron perderse eventos mientras no se escuchaba
+                    self._loop.call_soon_threadsafe(
+                        self._deliver, {"type": "resync", "reason": "reconnect"}
+                    )
+                self._stopping.wait(1)
+            finally:
+                if raw is not None:
+                    # No devolver al pool una conexión con LISTEN activo
+                    raw.invalidate()
+
+
+change_feed = ChangeFeed()
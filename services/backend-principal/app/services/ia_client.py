@@ -4,6 +4,8 @@ import httpx
 import structlog
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from ..tracing import span, traceparent_headers
+
 logger = structlog.get_logger()
 
 IA_SERVICE_URL = os.getenv("IA_SERVICE_URL", "http://microservicio-ia:8001")
@@ -15,11 +17,13 @@ TIMEOUT = int(os.getenv("TIMEOUT_IA_SERVICE", 35))
     wait=wait_exponential(multiplier=1, min=1, max=10),
 )
 async def generate_description(name: str, keywords: list) -> str:
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        response = await client.post(
-            f"{IA_SERVICE_URL}/generate/description",
-            json={"name": name, "keywords": keywords},
-        )
+    with span("ia.description", kind="client"):
+        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+            response = await client.post(
+                f"{IA_SERVICE_URL}/generate/description",
+                json={"name": name, "keywords": keywords},
+                headers=traceparent_headers(),
+            )
         response.raise_for_status()
         return response.json()["generated_description"]
 
@@ -29,10 +33,12 @@ async def generate_description(name: str, keywords: list) -> str:
     wait=wait_exponential(multiplier=1, min=1, max=10),
 )
 async def generate_category(product_name: str, description: str) -> str:
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        response = await client.post(
-            f"{IA_SERVICE_URL}/generate/category",
-            json={"product_name": product_name, "description": description},
-        )
+    with span("ia.category", kind="client"):
+        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+            response = await client.post(
+                f"{IA_SERVICE_URL}/generate/category",
+                json={"product_name": product_name, "description": description},
+                headers=traceparent_headers(),
+            )
         response.raise_for_status()
         return response.json()["suggested_category"]
@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Optional, Type
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from ..config import IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_TTL_SECONDS, logger
+from ..database import SessionLocal
+from ..models import IdempotencyKey
+
+PURGE_INTERVAL_SECONDS = 300
+
+_last_purge = 0.0
+
+
+def request_hash(payload: Any) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _purge_expired(db) -> None:
+    global _last_purge
+    now = time.time()
+    if now - _last_purge < PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = now
+    result = db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at < now)
+    )
+    if result.rowcount:
+        logger.info("idempotency_keys_purged", count=result.rowcount)
+
+
+def _claim(key: str, scope: str, digest: str) -> Optional[IdempotencyKey]:
+    """Reserva la clave para este request. Retorna la fila existente si ya
+    había una vigente (completada o en curso), o None si se reservó."""
+    db = SessionLocal()
+    try:
+        _purge_expired(db)
+        now = time.time()
+        existing = db.get(IdempotencyKey, (key, scope))
+        if existing is not None:
+            expired = (
+                existing.expires_at < now
+                or (existing.status == "in_progress" and existing.locked_until < now)
+            )
+            if not expired:
+                db.expunge(existing)
+                return existing
+            if existing.status == "in_progress":
+                # El request original murió sin terminar (ver run_idempotent)
+                logger.warning(
+                    "idempotency_key_recovered",
+                    scope=scope,
+                    stale_seconds=round(now - existing.locked_until, 1),
+                )
+            db.delete(existing)
+            db.flush()
+
+        db.add(IdempotencyKey(
+            key=key,
+            scope=scope,
+            request_hash=digest,
+            status="in_progress",
+            locked_until=now + IDEMPOTENCY_LOCK_SECONDS,
+            expires_at=now + IDEMPOTENCY_LOCK_SECONDS,
+        ))
+        db.commit()
+        return None
+    except IntegrityError:
+        # Otro request reservó la misma clave al mismo tiempo
+        db.rollback()
+        existing = db.get(IdempotencyKey, (key, scope))
+        if existing is None:
+            raise
+        db.expunge(existing)
+        return existing
+    finally:
+        db.close()
+
+
+def _complete(key: str, scope: str, status_code: int, body: Any) -> None:
+    db = SessionLocal()
+    try:
+        record = db.get(IdempotencyKey, (key, scope))
+        if record is None:
+            return
+        record.status = "completed"
+        record.response_status = status_code
+        record.response_body = body
+        record.expires_at = time.time() + IDEMPOTENCY_TTL_SECONDS
+        db.commit()
+    finally:
+        db.close()
+
+
+def _release(key: str, scope: str) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.key == key,
+            IdempotencyKey.scope == scope,
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_idempotent(
+    key: Optional[str],
+    scope: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]],
+    response_model: Type[BaseModel],
+    status_code: int = status.HTTP_200_OK,
+):
+    """Ejecuta `handler` una sola vez por `Idempotency-Key` y `scope`.
+
+    Una repetición con la clave de un request terminado recibe la respuesta
+    guardada (header `Idempotent-Replayed: true`); si el primero sigue en
+    curso, 409. Reusar la clave con otro cuerpo es 422. Los errores 4xx se
+    guardan como respuesta; los 5xx liberan la clave para poder reintentar.
+
+    Las lecturas y escrituras de la clave son bloqueantes y corren en el
+    threadpool, fuera del event loop.
+
+    La respuesta se guarda en una transacción distinta de la que aplica la
+    operación: si el proceso muere entre ambos commits la clave queda en
+    curso (409 para las repeticiones) hasta `IDEMPOTENCY_LOCK_SECONDS`.
+    Pasado ese plazo la clave se recupera y el siguiente reintento vuelve a
+    ejecutar `handler`, así que en ese caso puntual una venta puede aplicarse
+    dos veces; queda registrado como `idempotency_key_recovered`."""
+    if not key:
+        return await handler()
+
+    digest = request_hash(payload)
+    existing = await asyncio.to_thread(_claim, key, scope, digest)
+    if existing is not None:
+        if existing.request_hash != digest:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key ya usada con otro contenido",
+            )
+        if existing.status == "in_progress":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Request con esta Idempotency-Key en curso",
+                headers={"Retry-After": "1"},
+            )
+        logger.info("idempotent_replay", scope=scope)
+        return JSONResponse(
+            status_code=existing.response_status,
+            content=existing.response_body,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    try:
+        result = await handler()
+    except HTTPException as e:
+        if e.status_code < 500:
+            await asyncio.to_thread(_complete, key, scope, e.status_code, {"detail": e.detail})
+        else:
+            await asyncio.to_thread(_release, key, scope)
+        raise
+    except BaseException:
+        # Cancelado o error inesperado: liberar aunque la tarea se cancele
+        await asyncio.shield(asyncio.to_thread(_release, key, scope))
+        raise
+
+    body = response_model.model_validate(result).model_dump(mode="json")
+    await asyncio.to_thread(_complete, key, scope, status_code, body)
+    return result
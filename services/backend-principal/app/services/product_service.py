@@ -1,28 +1,40 @@
 import asyncio
-from typing import List
+import uuid
+from typing import List, Optional, Tuple
 
 import httpx
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from ..config import (ALERTS_SERVICE_URL, ALERTS_WEBHOOK_TIMEOUT,
-                      LOW_STOCK_THRESHOLD, logger)
-from ..models import Product
+                      LOW_STOCK_THRESHOLD, REORDER_COVER_DAYS,
+                      SELL_BATCHING_ENABLED, SIMILARITY_ENABLED,
+                      STOCK_SHARD_MIN_STOCK, STOCK_SHARDS, STOCK_SWEEP_ENABLED,
+                      logger)
+from ..models import Category, Product
 from ..schemas import ProductCreate
+from ..tracing import span, traceparent_headers
+from .categories import CategoryService
+from .change_feed import change_feed
 from .ia_client import generate_category, generate_description
+from .sales import SalesService, days_of_cover
+from .search import search_backend
+from .sell_batcher import sell_batcher
+from .similarity import adapt_description, similarity_index
+from .stock_shards import StockShardService
 
 
 class ProductService:
     def __init__(self, db: Session):
         self.db = db
+        self.shards = StockShardService(db)
+        self.categories = CategoryService(db)
+        self.sales = SalesService(db)
 
     async def create_product(self, product_data: ProductCreate) -> Product:
         logger.info("create_product_request", name=product_data.name)
 
-        description = await generate_description(
-            product_data.name,
-            product_data.keywords,
-        )
-        category = await generate_category(product_data.name, description)
+        description, category = await self._enrich(product_data)
 
         db_product = Product(
             name=product_data.name,
@@ -33,8 +45,16 @@ class ProductService:
         )
 
         self.db.add(db_product)
+        self.categories.assign(db_product, category)
+        if STOCK_SHARDS > 1 and product_data.stock >= STOCK_SHARD_MIN_STOCK:
+            self.db.flush()
+            self.shards.attach_shards(db_product, product_data.stock, STOCK_SHARDS)
         self.db.commit()
         self.db.refresh(db_product)
+        self.shards.apply_totals([db_product])
+        if SIMILARITY_ENABLED:
+            similarity_index.add(db_product)
+        change_feed.product_created(db_product)
 
         logger.info(
             "product_created",
@@ -44,10 +64,74 @@ class ProductService:
 
         return db_product
 
-    def list_products(self) -> List[Product]:
-        return self.db.query(Product).all()
+    async def _enrich(self, product_data: ProductCreate) -> Tuple[str, str]:
+        if SIMILARITY_ENABLED:
+            similarity_index.ensure_loaded(self.db)
+            match = similarity_index.find_similar(
+                product_data.name,
+                product_data.keywords,
+            )
+            if match is not None:
+                logger.info(
+                    "enrichment_reused",
+                    name=product_data.name,
+                    source_product_id=match.product.product_id,
+                    similarity=round(match.similarity, 3),
+                )
+                description = adapt_description(
+                    match.product.description,
+                    match.product.name,
+                    product_data.name,
+                )
+                return description, match.product.category
+
+        # Devolver la conexión al pool mientras se espera a la IA; la sesión
+        # no tiene cambios pendientes todavía
+        self.db.rollback()
+        description = await generate_description(
+            product_data.name,
+            product_data.keywords,
+        )
+        category = await generate_category(product_data.name, description)
+        return description, category
+
+    def list_products(self, category: Optional[Category] = None) -> List[Product]:
+        query = self.db.query(Product)
+        if category is not None:
+            query = query.join(Category, Product.category_id == Category.id).filter(
+                self.categories.subtree_filter(category)
+            )
+        return self.shards.apply_totals(query.all())
+
+    def search_products(self, query: str, limit: int,
+                        offset: int) -> List[Tuple[Product, float]]:
+        hits = search_backend().search(self.db, query, limit, offset)
+        if not hits:
+            return []
+        ids = [uuid.UUID(product_id) for product_id, _ in hits]
+        products = {
+            p.id: p
+            for p in self.db.query(Product).filter(Product.id.in_(ids)).all()
+        }
+        self.shards.apply_totals(list(products.values()))
+        return [
+            (products[product_id], rank)
+            for product_id, (_, rank) in zip(ids, hits)
+            if product_id in products
+        ]
+
+    def shard_stock(self, product: Product, slots: int) -> Product:
+        self.shards.reshard(product, slots)
+        self.db.commit()
+        self.db.refresh(product)
+        return self.shards.apply_totals([product])[0]
 
     async def sell_product(self, product: Product) -> Product:
+        if product.stock_shards > 1:
+            return await self._sell_sharded(product)
+        if SELL_BATCHING_ENABLED:
+            return await self._sell_batched(product)
+
         if product.stock <= 0:
             from fastapi import HTTPException, status
 
@@ -57,6 +141,7 @@ class ProductService:
             )
 
         product.stock -= 1
+        self.sales.record({product.id: 1})
         self.db.commit()
         self.db.refresh(product)
 
@@ -65,22 +150,92 @@ class ProductService:
             product_id=str(product.id),
             new_stock=product.stock,
         )
+        change_feed.stock_changed(product.id, product.stock)
 
         # Verificar y enviar alerta de stock bajo en segundo plano
-        if self.needs_stock_alert(product):
-            asyncio.create_task(self._send_stock_alert(product))
+        self._check_stock_alert(product)
+
+        return product
+
+    async def _sell_sharded(self, product: Product) -> Product:
+        remaining = self.shards.sell_one(product)
+        if remaining is None:
+            from fastapi import HTTPException, status
+
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Stock insuficiente",
+            )
+
+        set_committed_value(product, "stock", remaining)
+
+        logger.info(
+            "product_sold",
+            product_id=str(product.id),
+            new_stock=remaining,
+            sharded=True,
+        )
+        change_feed.stock_changed(product.id, remaining)
+
+        self._check_stock_alert(product)
 
         return product
 
-    def needs_stock_alert(self, product: Product) -> bool:
-        return product.stock < LOW_STOCK_THRESHOLD
+    async def _sell_batched(self, product: Product) -> Product:
+        # Devolver la conexión al pool mientras se espera el lote: con muchas
+        # ventas en espera el pool se agotaría y el lote no podría confirmar.
+        self.db.expunge(product)
+        self.db.rollback()
+
+        outcome = await sell_batcher.sell(product.id)
+        if not outcome.sold:
+            from fastapi import HTTPException, status
 
-    async def _send_stock_alert(self, product: Product) -> None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Stock insuficiente",
+            )
+
+        set_committed_value(product, "stock", outcome.stock)
+
+        logger.info(
+            "product_sold",
+            product_id=str(product.id),
+            new_stock=outcome.stock,
+            batched=True,
+        )
+        change_feed.stock_changed(product.id, outcome.stock)
+
+        self._check_stock_alert(product)
+
+        return product
+
+    def needs_stock_alert(self, product: Product, cover: Optional[float]) -> bool:
+        if product.stock < LOW_STOCK_THRESHOLD:
+            return True
+        return REORDER_COVER_DAYS > 0 and cover is not None and cover < REORDER_COVER_DAYS
+
+    def _check_stock_alert(self, product: Product) -> None:
+        if STOCK_SWEEP_ENABLED:
+            # El barrido periódico alerta por todo el catálogo
+            return
+        # La velocidad sólo se consulta si puede haber alerta
+        velocity = None
+        if product.stock < LOW_STOCK_THRESHOLD or REORDER_COVER_DAYS > 0:
+            velocity = self.sales.velocity(product.id)
+        cover = days_of_cover(product.stock, velocity)
+        if self.needs_stock_alert(product, cover):
+            asyncio.create_task(self._send_stock_alert(product, velocity, cover))
+
+    async def _send_stock_alert(self, product: Product, velocity: Optional[float],
+                                cover: Optional[float]) -> None:
         """
         Envía una alerta al microservicio de alertas cuando el stock es bajo.
-        
+
         Args:
             product: Producto con stock bajo
+            velocity: Unidades vendidas por día (promedio móvil), si hay ventas
+            cover: Días que dura el stock a esa velocidad
         """
         try:
             webhook_url = f"{ALERTS_SERVICE_URL}/webhook/stock-alert"
@@ -88,6 +243,8 @@ class ProductService:
                 "product_id": str(product.id),
                 "product_name": product.name,
                 "current_stock": product.stock,
+                "velocity_per_day": round(velocity, 2) if velocity else None,
+                "days_of_cover": cover,
             }
 
             logger.info(
@@ -96,11 +253,16 @@ class ProductService:
                 webhook_url=webhook_url,
             )
 
-            async with httpx.AsyncClient(
-                timeout=ALERTS_WEBHOOK_TIMEOUT
-            ) as client:
-                response = await client.post(webhook_url, json=payload)
-                response.raise_for_status()
+            with span("alerts.webhook", kind="client"):
+                async with httpx.AsyncClient(
+                    timeout=ALERTS_WEBHOOK_TIMEOUT
+                ) as client:
+                    response = await client.post(
+                        webhook_url,
+                        json=payload,
+                        headers=traceparent_headers(),
+                    )
+                    response.raise_for_status()
 
             logger.info(
                 "stock_alert_sent",
@@ -0,0 +1,347 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import (and_, bindparam, case, delete, func, insert, literal,
+                        or_, select, update)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import (SALES_RECOMPUTE_INTERVAL, SALES_ROLLUP_INTERVAL,
+                      SALES_VELOCITY_WINDOW_DAYS, logger)
+from ..database import SessionLocal, engine
+from ..models import (ProductSalesStats, SaleEvent, SalesRollup,
+                      SalesRollupState)
+
+ROLLUP_BATCH_SIZE = 10000
+# Un hueco bajo `last_event_id` que no aparece en este tiempo es de una
+# transacción revertida: se deja de buscar
+GAP_TIMEOUT_SECONDS = 300
+MAX_PENDING_IDS = 10000
+HOURLY_RETENTION_DAYS = 7
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite devuelve los timestamps sin zona horaria; se guardan en UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _upsert(model):
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert(model)
+
+
+def days_of_cover(stock: int, velocity: Optional[float]) -> Optional[float]:
+    """Días que dura el stock al ritmo de venta actual; None sin ventas."""
+    if not velocity:
+        return None
+    return round(stock / velocity, 1)
+
+
+class SalesService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, quantities: Dict) -> None:
+        """Agrega las ventas (`{product_id: unidades}`) a la transacción en
+        curso; quedan confirmadas junto con el descuento de stock."""
+        sold_at = utcnow()
+        rows = [
+            {"product_id": product_id, "quantity": units, "sold_at": sold_at}
+            for product_id, units in quantities.items()
+            if units > 0
+        ]
+        if rows:
+            self.db.execute(insert(SaleEvent), rows)
+
+    def stats(self, product_id) -> Optional[ProductSalesStats]:
+        return self.db.get(ProductSalesStats, product_id)
+
+    def velocity(self, product_id) -> Optional[float]:
+        stats = self.stats(product_id)
+        return stats.velocity if stats else None
+
+    def daily(self, product_id) -> List[tuple]:
+        since = utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(
+            days=SALES_VELOCITY_WINDOW_DAYS - 1
+        )
+        return [
+            (as_utc(bucket), units)
+            for bucket, units in self.db.execute(
+                select(SalesRollup.bucket, SalesRollup.units)
+                .where(
+                    SalesRollup.product_id == product_id,
+                    SalesRollup.period == "day",
+                    SalesRollup.bucket >= since,
+                )
+                .order_by(SalesRollup.bucket)
+            )
+        ]
+
+
+class SalesRollups:
+    """Mantiene `sales_rollups` y `product_sales_stats` a partir de
+    `sales_events` en segundo plano.
+
+    Cada pasada lee sólo los eventos posteriores a `last_event_id`, suma sus
+    unidades por hora y por día con un upsert y recalcula la velocidad de los
+    productos tocados. Un id menor que todavía no es visible (su transacción
+    confirma después que otra con id mayor, p. ej. esperando el bloqueo de un
+    producto en oferta) queda en `pending_ids` y se agrega cuando aparece.
+
+    Con varios workers, el `FOR UPDATE` sobre `sales_rollup_state` hace que
+    sólo uno agregue a la vez. El recálculo completo actualiza la velocidad
+    de todo el catálogo con una sola consulta agrupada sobre los rollups (no
+    sobre los eventos), para que baje la de productos que dejaron de
+    venderse."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.events_rolled_up = 0
+        self.late_events = 0
+        self.pending_events = 0
+        self.last_event_id = 0
+        self.last_run_at: Optional[str] = None
+        self.last_recompute_at: Optional[str] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        next_recompute = 0.0
+        while True:
+            try:
+                while await asyncio.to_thread(self.roll_up) >= ROLLUP_BATCH_SIZE:
+                    pass
+                if time.monotonic() >= next_recompute:
+                    await asyncio.to_thread(self.recompute)
+                    next_recompute = time.monotonic() + SALES_RECOMPUTE_INTERVAL
+            except Exception as e:
+                logger.error("sales_rollup_error", error=str(e))
+            await asyncio.sleep(SALES_ROLLUP_INTERVAL)
+
+    def _lock_state(self, db: Session) -> SalesRollupState:
+        query = select(SalesRollupState).where(SalesRollupState.id == 1).with_for_update()
+        state = db.execute(query).scalar_one_or_none()
+        if state is None:
+            db.execute(
+                _upsert(SalesRollupState)
+                .values(id=1, last_event_id=0)
+                .on_conflict_do_nothing()
+            )
+            state = db.execute(query).scalar_one()
+        return state
+
+    def roll_up(self) -> int:
+        """Agrega los eventos nuevos; retorna cuántos procesó."""
+        db = SessionLocal()
+        try:
+            state = self._lock_state(db)
+            stored = [tuple(item) for item in state.pending_ids or []]
+            pending = {int(event_id): seen for event_id, seen in stored}
+            columns = (SaleEvent.id, SaleEvent.product_id, SaleEvent.quantity,
+                       SaleEvent.sold_at)
+            late = db.execute(
+                select(*columns).where(SaleEvent.id.in_(list(pending)))
+            ).all() if pending else []
+            events = db.execute(
+                select(*columns)
+                .where(SaleEvent.id > state.last_event_id)
+                .order_by(SaleEvent.id)
+                .limit(ROLLUP_BATCH_SIZE)
+            ).all()
+
+            last_id = events[-1].id if events else state.last_event_id
+            for event in late:
+                del pending[event.id]
+            self._track_gaps(pending, state.last_event_id, last_id, events)
+            pending_ids = sorted([event_id, seen] for event_id, seen in pending.items())
+
+            processed = late + events
+            if not processed and pending_ids == sorted(list(item) for item in stored):
+                db.rollback()
+                return 0
+            self._apply_events(db, processed)
+            state.last_event_id = last_id
+            state.pending_ids = pending_ids
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.events_rolled_up += len(processed)
+        self.late_events += len(late)
+        self.pending_events = len(pending_ids)
+        self.last_event_id = last_id
+        self.last_run_at = utcnow().isoformat()
+        return len(processed)
+
+    def _track_gaps(self, pending: Dict[int, float], previous_id: int,
+                    last_id: int, events: List) -> None:
+        """Agrega a `pending` los ids entre el watermark anterior y el nuevo
+        que no se vieron, y descarta los vencidos."""
+        now = time.time()
+        missing = last_id - previous_id - len(events)
+        if 0 < missing <= MAX_PENDING_IDS:
+            seen = {event.id for event in events}
+            for event_id in range(previous_id + 1, last_id):
+                if event_id not in seen:
+                    pending[event_id] = now
+        elif missing > MAX_PENDING_IDS:
+            # Salto de la secuencia (p. ej. tras restaurar un backup), no
+            # transacciones en curso
+            logger.warning("sales_rollup_gap_too_large", missing=missing,
+                           from_id=previous_id, to_id=last_id)
+        for event_id, seen_at in list(pending.items()):
+            if now - seen_at >= GAP_TIMEOUT_SECONDS:
+                del pending[event_id]
+
+    def _apply_events(self, db: Session, events: List) -> None:
+        units: Counter = Counter()
+        last_sale: Dict = {}
+        for _, product_id, quantity, sold_at in events:
+            sold_at = as_utc(sold_at)
+            hour = sold_at.replace(minute=0, second=0, microsecond=0)
+            units[(product_id, "hour", hour)] += quantity
+            units[(product_id, "day", hour.replace(hour=0))] += quantity
+            last_sale[product_id] = max(last_sale.get(product_id, sold_at), sold_at)
+        if not units:
+            return
+
+        stmt = _upsert(SalesRollup)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["product_id", "period", "bucket"],
+                set_={"units": SalesRollup.units + stmt.excluded.units},
+            ),
+            [
+                {"product_id": product_id, "period": period, "bucket": bucket, "units": n}
+                for (product_id, period, bucket), n in units.items()
+            ],
+        )
+        self._recompute_stats(db, list(last_sale))
+        # Un evento tardío no retrocede la última venta
+        db.execute(
+            update(ProductSalesStats.__table__)
+            .where(
+                ProductSalesStats.product_id == bindparam("pid"),
+                or_(
+                    ProductSalesStats.last_sale_at.is_(None),
+                    ProductSalesStats.last_sale_at < bindparam("sold_at"),
+                ),
+            )
+            .values(last_sale_at=bindparam("sold_at")),
+            [{"pid": product_id, "sold_at": sold_at}
+             for product_id, sold_at in last_sale.items()],
+        )
+
+    def recompute(self) -> None:
+        """Recalcula la velocidad de todo el catálogo desde los rollups."""
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            self._lock_state(db)
+            updated = self._recompute_stats(db)
+            db.execute(
+                delete(SalesRollup).where(
+                    SalesRollup.period == "hour",
+                    SalesRollup.bucket < utcnow() - timedelta(days=HOURLY_RETENTION_DAYS),
+                )
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.last_recompute_at = utcnow().isoformat()
+        logger.info(
+            "sales_velocity_recomputed",
+            products=updated,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+
+    def _recompute_stats(self, db: Session, product_ids: Optional[List] = None) -> int:
+        now = utcnow()
+        hour_cutoff = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
+        day_cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(
+            days=SALES_VELOCITY_WINDOW_DAYS - 1
+        )
+
+        units_24h = func.sum(case(
+            (and_(SalesRollup.period == "hour", SalesRollup.bucket >= hour_cutoff),
+             SalesRollup.units),
+            else_=0,
+        ))
+        units_window = func.sum(case(
+            (and_(SalesRollup.period == "day", SalesRollup.bucket >= day_cutoff),
+             SalesRollup.units),
+            else_=0,
+        ))
+        query = (
+            select(
+                SalesRollup.product_id,
+                units_24h,
+                units_window,
+                units_window * 1.0 / SALES_VELOCITY_WINDOW_DAYS,
+                literal(now, ProductSalesStats.updated_at.type),
+            )
+            .where(SalesRollup.bucket >= min(hour_cutoff, day_cutoff))
+            .group_by(SalesRollup.product_id)
+        )
+        if product_ids is not None:
+            query = query.where(SalesRollup.product_id.in_(product_ids))
+
+        stmt = _upsert(ProductSalesStats).from_select(
+            ["product_id", "units_24h", "units_window", "velocity", "updated_at"],
+            query,
+        )
+        result = db.execute(stmt.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={
+                "units_24h": stmt.excluded.units_24h,
+                "units_window": stmt.excluded.units_window,
+                "velocity": stmt.excluded.velocity,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ))
+
+        if product_ids is None:
+            # Productos sin ventas dentro de la ventana
+            db.execute(
+                update(ProductSalesStats)
+                .where(ProductSalesStats.updated_at < now)
+                .values(units_24h=0, units_window=0, velocity=0.0, updated_at=now)
+            )
+        return result.rowcount
+
+    def stats(self) -> dict:
+        return {
+            "last_event_id": self.last_event_id,
+            "events_rolled_up": self.events_rolled_up,
+            "late_events": self.late_events,
+            "pending_events": self.pending_events,
+            "last_run_at": self.last_run_at,
+            "last_recompute_at": self.last_recompute_at,
+        }
+
+
+sales_rollups = SalesRollups()
@@ -0,0 +1,189 @@
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..config import logger
+from ..database import engine
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Las keywords se guardan como JSON con escapes \uXXXX; se indexa el texto
+# decodificado
+KEYWORDS_TEXT = (
+    "(SELECT group_concat(value, ' ') FROM json_each({row}.keywords))"
+)
+
+
+class SearchBackend(ABC):
+    name = "none"
+
+    def setup(self, engine: Engine) -> None:
+        pass
+
+    @abstractmethod
+    def search(self, db: Session, query: str, limit: int,
+               offset: int) -> List[Tuple[str, float]]:
+        """Retorna `(product_id, rank)` ordenados por relevancia."""
+
+
+class PostgresSearchBackend(SearchBackend):
+    """`tsvector` generado (configuración `spanish`) con índice GIN. Al ser
+    columna generada, Postgres la mantiene en cada INSERT/UPDATE."""
+
+    name = "postgres"
+
+    def setup(self, engine: Engine) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('spanish', coalesce(name, '')), 'A') ||
+                    setweight(to_tsvector('spanish', coalesce(keywords::jsonb::text, '')), 'B') ||
+                    setweight(to_tsvector('spanish', coalesce(description, '')), 'C')
+                ) STORED
+            """))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_products_search "
+                "ON products USING GIN (search_vector)"
+            ))
+
+    def search(self, db: Session, query: str, limit: int,
+               offset: int) -> List[Tuple[str, float]]:
+        rows = db.execute(
+            text("""
+                SELECT id, ts_rank_cd(search_vector, q) AS rank
+                FROM products, websearch_to_tsquery('spanish', :query) AS q
+                WHERE search_vector @@ q
+                ORDER BY rank DESC, id
+                LIMIT :limit OFFSET :offset
+            """),
+            {"query": query, "limit": limit, "offset": offset},
+        ).all()
+        return [(str(row.id), float(row.rank)) for row in rows]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """Tabla FTS5 con triggers sobre `products`; el ranking es BM25 con más
+    peso para el nombre que para keywords y descripción."""
+
+    name = "sqlite-fts5"
+
+    def setup(self, engine: Engine) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                    product_id UNINDEXED, name, keywords, description,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS products_fts_insert
+                AFTER INSERT ON products BEGIN
+                    INSERT INTO products_fts (product_id, name, keywords, description)
+                    VALUES (new.id, new.name, {keywords}, new.description);
+                END
+            """.format(keywords=KEYWORDS_TEXT.format(row="new"))))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS products_fts_update
+                AFTER UPDATE OF name, keywords, description ON products BEGIN
+                    DELETE FROM products_fts WHERE product_id = old.id;
+                    INSERT INTO products_fts (product_id, name, keywords, description)
+                    VALUES (new.id, new.name, {keywords}, new.description);
+                END
+            """.format(keywords=KEYWORDS_TEXT.format(row="new"))))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS products_fts_delete
+                AFTER DELETE ON products BEGIN
+                    DELETE FROM products_fts WHERE product_id = old.id;
+                END
+            """))
+            # Productos creados antes de la tabla FTS
+            indexed = conn.execute(text("SELECT count(*) FROM products_fts")).scalar()
+            if not indexed:
+                conn.execute(text("""
+                    INSERT INTO products_fts (product_id, name, keywords, description)
+                    SELECT id, name, {keywords}, description FROM products
+                """.format(keywords=KEYWORDS_TEXT.format(row="products"))))
+
+    @staticmethod
+    def match_expression(query: str) -> Optional[str]:
+        # Cada palabra como prefijo entre comillas: el texto del usuario no se
+        # interpreta como sintaxis de FTS5
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def search(self, db: Session, query: str, limit: int,
+               offset: int) -> List[Tuple[str, float]]:
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+        rows = db.execute(
+            text("""
+                SELECT product_id, bm25(products_fts, 0.0, 10.0, 5.0, 1.0) AS rank
+                FROM products_fts
+                WHERE products_fts MATCH :query
+                ORDER BY rank
+                LIMIT :limit OFFSET :offset
+            """),
+            {"query": expression, "limit": limit, "offset": offset},
+        ).all()
+        # bm25 es menor mientras más relevante; se invierte el signo
+        return [(row.product_id, -float(row.rank)) for row in rows]
+
+
+class LikeSearchBackend(SearchBackend):
+    """Respaldo sin índice para motores sin búsqueda de texto."""
+
+    name = "like"
+
+    def search(self, db: Session, query: str, limit: int,
+               offset: int) -> List[Tuple[str, float]]:
+        tokens = TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return []
+        conditions = " AND ".join(
+            f"(lower(name) LIKE :t{i} OR lower(coalesce(description, '')) LIKE :t{i})"
+            for i in range(len(tokens))
+        )
+        params = {f"t{i}": f"%{token}%" for i, token in enumerate(tokens)}
+        rows = db.execute(
+            text(f"SELECT id FROM products WHERE {conditions} "
+                 "ORDER BY name LIMIT :limit OFFSET :offset"),
+            {**params, "limit": limit, "offset": offset},
+        ).all()
+        return [(str(row.id), 0.0) for row in rows]
+
+
+_backend: Optional[SearchBackend] = None
+
+
+def search_backend() -> SearchBackend:
+    global _backend
+    if _backend is None:
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            _backend = PostgresSearchBackend()
+        elif dialect == "sqlite":
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = LikeSearchBackend()
+    return _backend
+
+
+def setup_search() -> None:
+    global _backend
+    backend = search_backend()
+    try:
+        backend.setup(engine)
+    except Exception as e:
+        # p. ej. SQLite compilado sin FTS5
+        logger.warning("search_setup_error", backend=backend.name, error=str(e))
+        _backend = LikeSearchBackend()
+        backend = _backend
+    logger.info("search_backend_ready", backend=backend.name)
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, select, update
+
+from ..config import SELL_BATCH_MAX_SIZE, SELL_BATCH_WINDOW_MS, logger
+from ..database import SessionLocal
+from ..models import Product
+from ..tracing import span
+from .sales import SalesService
+
+MAX_FLUSH_ATTEMPTS = 3
+
+
+@dataclass
+class SellOutcome:
+    sold: bool
+    stock: int
+
+
+class StockConflict(Exception):
+    """El stock cambió entre la lectura y el UPDATE condicional del lote."""
+
+
+class SellBatcher:
+    """Agrupa las ventas que llegan dentro de una ventana corta y las aplica
+    en una sola transacción (group commit).
+
+    Cada lote bloquea las filas de sus productos, reparte el stock disponible
+    en orden de llegada y descuenta todo con un único UPDATE condicional. Cada
+    venta recibe su propio `SellOutcome`: vendida con el stock que dejó, o
+    rechazada por stock insuficiente. Mientras un lote se confirma, las ventas
+    nuevas se acumulan para el siguiente."""
+
+    def __init__(self, window_ms: float, max_size: int):
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._pending: List[Tuple[object, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing = False
+        self._tasks: set = set()
+
+    async def sell(self, product_id) -> SellOutcome:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((product_id, future))
+
+        if len(self._pending) >= self.max_size:
+            self._dispatch()
+        elif self._timer is None and not self._flushing:
+            self._timer = loop.call_later(self.window, self._dispatch)
+
+        with span("sell.batch_wait"):
+            return await future
+
+    async def stop(self) -> None:
+        self._dispatch()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing or not self._pending:
+            return
+
+        batch = self._pending[:self.max_size]
+        self._pending = self._pending[self.max_size:]
+        self._flushing = True
+        task = asyncio.create_task(self._flush(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, batch: List[Tuple[object, asyncio.Future]]) -> None:
+        try:
+            outcomes = await asyncio.to_thread(
+                self._apply, [product_id for product_id, _ in batch]
+            )
+        except Exception as e:
+            logger.error("sell_batch_error", size=len(batch), error=str(e))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), outcome in zip(batch, outcomes):
+                if not future.done():
+                    future.set_result(outcome)
+        finally:
+            self._flushing = False
+            # Lo acumulado durante el commit sale de inmediato: ya esperó
+            # al menos lo que dura una ventana.
+            self._dispatch()
+
+    def _apply(self, product_ids: List) -> List[SellOutcome]:
+        for attempt in range(1, MAX_FLUSH_ATTEMPTS + 1):
+            try:
+                return self._apply_once(product_ids)
+            except StockConflict:
+                logger.warning("sell_batch_conflict", attempt=attempt)
+                if attempt == MAX_FLUSH_ATTEMPTS:
+                    raise
+
+    def _apply_once(self, product_ids: List) -> List[SellOutcome]:
+        started = time.perf_counter()
+        requested = Counter(product_ids)
+        db = SessionLocal()
+        try:
+            # Orden fijo de bloqueo para no entrar en deadlock con otros lotes
+            rows = db.execute(
+                select(Product.id, Product.stock)
+                .where(Product.id.in_(sorted(requested, key=str)))
+                .order_by(Product.id)
+                .with_for_update()
+            ).all()
+            available: Dict = {product_id: stock for product_id, stock in rows}
+            granted = {
+                product_id: min(count, available.get(product_id, 0))
+                for product_id, count in requested.items()
+            }
+            granted = {pid: n for pid, n in granted.items() if n > 0}
+
+            if granted:
+                decrement = case(
+                    *((Product.id == pid, n) for pid, n in granted.items()),
+                    else_=0,
+                )
+                result = db.execute(
+                    update(Product)
+                    .where(Product.id.in_(list(granted)), Product.stock >= decrement)
+                    .values(stock=Product.stock - decrement)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != len(granted):
+                    db.rollback()
+                    raise StockConflict()
+                SalesService(db).record(granted)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        outcomes = []
+        remaining = dict(available)
+        left_to_grant = dict(granted)
+        for product_id in product_ids:
+            if left_to_grant.get(product_id, 0) > 0:
+                left_to_grant[product_id] -= 1
+                remaining[product_id] -= 1
+                outcomes.append(SellOutcome(sold=True, stock=remaining[product_id]))
+            else:
+                outcomes.append(SellOutcome(sold=False, stock=remaining.get(product_id, 0)))
+
+        logger.info(
+            "sell_batch_committed",
+            size=len(product_ids),
+            products=len(requested),
+            sold=sum(granted.values()),
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        return outcomes
+
+
+sell_batcher = SellBatcher(SELL_BATCH_WINDOW_MS, SELL_BATCH_MAX_SIZE)
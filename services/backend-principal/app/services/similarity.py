@@ -0,0 +1,271 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config import SIMILARITY_THRESHOLD, logger
+from ..models import Product
+from ..shared_state import shared_state
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+# Contadores en el estado compartido: `version` sube con cada producto
+# agregado en cualquier worker, `generation` con cada reset
+VERSION_KEY = "similarity:version"
+GENERATION_KEY = "similarity:generation"
+# Productos confirmados con un created_at algo anterior al último visto
+# (transacciones largas) también entran en la sincronización incremental
+SYNC_MARGIN = timedelta(seconds=60)
+# Tallas: dos nombres que sólo difieren en la talla son SKUs distintos
+SIZE_TOKENS = {
+    "xxs", "xs", "s", "m", "l", "xl", "xxl", "xxxl",
+    "chico", "chica", "mediano", "mediana", "grande",
+}
+
+
+def _permutations() -> List[tuple]:
+    # Coeficientes fijos para que las firmas sean estables entre procesos
+    perms = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % _PRIME or 1
+        b = int.from_bytes(digest[8:], "big") % _PRIME
+        perms.append((a, b))
+    return perms
+
+
+PERMUTATIONS = _permutations()
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def shingles(name: str, keywords: List[str]) -> Set[str]:
+    """n-gramas de caracteres del nombre más las keywords como tokens; el
+    orden de las keywords no cambia el resultado."""
+    padded = f" {normalize(name)} "
+    result = {
+        padded[i:i + SHINGLE_SIZE]
+        for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))
+    }
+    result.update(f"kw:{normalize(k)}" for k in keywords if normalize(k))
+    return result
+
+
+def keyword_set(keywords: List[str]) -> FrozenSet[str]:
+    return frozenset(normalize(k) for k in keywords if normalize(k))
+
+
+def variant_tokens(name: str) -> FrozenSet[str]:
+    """Tokens del nombre que distinguen variantes de un mismo producto:
+    los que llevan dígitos (modelo, capacidad, año) y las tallas."""
+    return frozenset(
+        token for token in normalize(name).split()
+        if token in SIZE_TOKENS or any(c.isdigit() for c in token)
+    )
+
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big"
+    )
+
+
+def minhash(items: Set[str]) -> List[int]:
+    hashes = [_hash(item) for item in items]
+    return [
+        min((a * h + b) % _PRIME for h in hashes)
+        for a, b in PERMUTATIONS
+    ]
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class IndexedProduct:
+    product_id: str
+    name: str
+    shingles: Set[str]
+    keywords: FrozenSet[str]
+    variant: FrozenSet[str]
+    description: str
+    category: str
+
+
+@dataclass
+class SimilarMatch:
+    product: IndexedProduct
+    similarity: float
+
+
+class SimilarityIndex:
+    """Índice MinHash + LSH en memoria sobre nombre y keywords de productos.
+
+    Los candidatos salen de las bandas LSH y se confirman con la similitud de
+    Jaccard exacta. Se carga desde la base de datos en el primer uso y luego
+    se actualiza con cada producto creado.
+
+    Cada worker tiene su propia copia: cuando otro worker agrega un producto
+    sube la versión compartida y este carga sólo los productos recientes;
+    tras un reset (import masivo) se recarga completo."""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._entries: Dict[str, IndexedProduct] = {}
+        self._buckets: Dict[tuple, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._versions: Tuple = (None, None)
+        self._high_water = None
+        self.lookups = 0
+        self.reused = 0
+        self.syncs = 0
+
+    def ensure_loaded(self, db: Session) -> None:
+        versions = self._shared_versions()
+        if self._loaded and versions == self._versions:
+            return
+        full = not self._loaded or versions[1] != self._versions[1]
+
+        query = db.query(
+            Product.id,
+            Product.name,
+            Product.keywords,
+            Product.description,
+            Product.category,
+            Product.created_at,
+        )
+        if not full and self._high_water is not None:
+            query = query.filter(Product.created_at >= self._high_water - SYNC_MARGIN)
+        rows = query.all()
+
+        with self._lock:
+            if full:
+                self._entries.clear()
+                self._buckets.clear()
+            for row in rows:
+                self._add(str(row.id), row.name, row.keywords or [],
+                          row.description, row.category)
+                if row.created_at and (self._high_water is None
+                                       or row.created_at > self._high_water):
+                    self._high_water = row.created_at
+            self._loaded = True
+            self._versions = versions
+            self.syncs += 1
+        if full:
+            logger.info("similarity_index_loaded", products=len(self._entries))
+
+    def _shared_versions(self) -> Tuple:
+        try:
+            return shared_state.get(VERSION_KEY), shared_state.get(GENERATION_KEY)
+        except Exception as e:
+            logger.warning("shared_state_error", error=str(e))
+            return self._versions
+
+    def _bump(self, key: str) -> Optional[int]:
+        try:
+            return shared_state.incr(key)
+        except Exception as e:
+            logger.warning("shared_state_error", error=str(e))
+            return None
+
+    def reset(self) -> None:
+        """Descarta el índice en todos los workers; se vuelve a cargar en el
+        próximo uso."""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._loaded = False
+            self._high_water = None
+        self._bump(GENERATION_KEY)
+
+    def add(self, product: Product) -> None:
+        with self._lock:
+            self._add(str(product.id), product.name, product.keywords or [],
+                      product.description, product.category)
+        version = self._bump(VERSION_KEY)
+        with self._lock:
+            # Si ningún otro worker agregó productos desde la última
+            # sincronización, este índice ya está al día
+            if self._loaded and version == int(self._versions[0] or 0) + 1:
+                self._versions = (str(version), self._versions[1])
+
+    def _add(self, product_id: str, name: str, keywords: List[str],
+             description: Optional[str], category: Optional[str]) -> None:
+        if not description or not category:
+            return
+        items = shingles(name, keywords)
+        self._entries[product_id] = IndexedProduct(
+            product_id, name, items, keyword_set(keywords), variant_tokens(name),
+            description, category,
+        )
+        for band in self._bands(minhash(items)):
+            self._buckets.setdefault(band, set()).add(product_id)
+
+    def _bands(self, signature: List[int]) -> List[tuple]:
+        return [
+            (i, tuple(signature[i * ROWS:(i + 1) * ROWS]))
+            for i in range(BANDS)
+        ]
+
+    def find_similar(self, name: str, keywords: List[str]) -> Optional[SimilarMatch]:
+        """Producto indexado casi idéntico: Jaccard sobre el umbral, las
+        mismas keywords y los mismos tokens de variante en el nombre ("S23"
+        y "S24", o "talla M" y "talla L", son productos distintos)."""
+        items = shingles(name, keywords)
+        wanted_keywords = keyword_set(keywords)
+        wanted_variant = variant_tokens(name)
+        bands = self._bands(minhash(items))
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for band in bands:
+                candidates |= self._buckets.get(band, set())
+
+            best = None
+            for product_id in candidates:
+                entry = self._entries[product_id]
+                if entry.keywords != wanted_keywords or entry.variant != wanted_variant:
+                    continue
+                score = jaccard(items, entry.shingles)
+                if score >= self.threshold and (best is None or score > best.similarity):
+                    best = SimilarMatch(entry, score)
+
+            if best is not None:
+                self.reused += 1
+            return best
+
+    def stats(self) -> dict:
+        return {
+            "indexed_products": len(self._entries),
+            "lookups": self.lookups,
+            "reused": self.reused,
+            "reuse_rate": round(self.reused / self.lookups, 4) if self.lookups else 0.0,
+            "syncs": self.syncs,
+            "threshold": self.threshold,
+        }
+
+
+def adapt_description(description: str, old_name: str, new_name: str) -> str:
+    """Cambia el nombre del producto original por el nuevo en la descripción."""
+    if not old_name or old_name == new_name:
+        return description
+    return re.sub(re.escape(old_name), lambda _: new_name, description, flags=re.IGNORECASE)
+
+
+similarity_index = SimilarityIndex(SIMILARITY_THRESHOLD)
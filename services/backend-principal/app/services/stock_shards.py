@@ -0,0 +1,176 @@
+import random
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..config import logger
+from ..models import Product, ProductStockShard
+from .sales import SalesService
+
+
+def split_stock(total: int, slots: int) -> List[int]:
+    base, extra = divmod(total, slots)
+    return [base + (1 if slot < extra else 0) for slot in range(slots)]
+
+
+class StockShardService:
+    """Stock repartido en N contadores por producto.
+
+    Cada venta descuenta de un contador elegido al azar, así las ventas
+    concurrentes del mismo producto bloquean filas distintas en lugar de
+    serializarse sobre la fila de `products`. El stock total es la suma de los
+    contadores; para productos fragmentados `products.stock` queda en 0.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def attach_shards(self, product: Product, total: int, slots: int) -> None:
+        product.stock = 0
+        product.stock_shards = slots
+        for slot, stock in enumerate(split_stock(total, slots)):
+            self.db.add(
+                ProductStockShard(product_id=product.id, slot=slot, stock=stock)
+            )
+
+    def reshard(self, product: Product, slots: int) -> int:
+        """Reparte el stock actual en `slots` contadores; con `slots <= 1`
+        lo devuelve a `products.stock`. No hace commit."""
+        locked = (
+            self.db.query(Product)
+            .filter(Product.id == product.id)
+            .with_for_update()
+            .one()
+        )
+        shards = (
+            self.db.query(ProductStockShard)
+            .filter(ProductStockShard.product_id == product.id)
+            .with_for_update()
+            .all()
+        )
+        total = locked.stock + sum(shard.stock for shard in shards)
+        for shard in shards:
+            self.db.delete(shard)
+        self.db.flush()
+
+        if slots > 1:
+            self.attach_shards(locked, total, slots)
+        else:
+            locked.stock = total
+            locked.stock_shards = 0
+
+        logger.info(
+            "product_stock_resharded",
+            product_id=str(product.id),
+            slots=max(slots, 1),
+            total_stock=total,
+        )
+        return total
+
+    def total_stock(self, product_id) -> int:
+        total = self.db.execute(
+            select(func.coalesce(func.sum(ProductStockShard.stock), 0))
+            .where(ProductStockShard.product_id == product_id)
+        ).scalar_one()
+        return int(total)
+
+    def totals(self, product_ids: Iterable) -> Dict:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        rows = self.db.execute(
+            select(ProductStockShard.product_id, func.sum(ProductStockShard.stock))
+            .where(ProductStockShard.product_id.in_(product_ids))
+            .group_by(ProductStockShard.product_id)
+        ).all()
+        return {product_id: int(total) for product_id, total in rows}
+
+    def apply_totals(self, products: List[Product]) -> List[Product]:
+        """Expone el stock total en `product.stock` sin marcarlo como
+        modificado en la sesión."""
+        totals = self.totals(p.id for p in products if p.stock_shards > 1)
+        for product in products:
+            if product.id in totals:
+                set_committed_value(product, "stock", totals[product.id])
+        return products
+
+    def sell_one(self, product: Product) -> Optional[int]:
+        """Descuenta una unidad de algún contador con stock y hace commit.
+        Retorna el stock total restante o None si no queda stock."""
+        slots = random.sample(range(product.stock_shards), product.stock_shards)
+        dry_slots = []
+        sold_slot = None
+
+        for slot in slots:
+            result = self.db.execute(
+                update(ProductStockShard)
+                .where(
+                    ProductStockShard.product_id == product.id,
+                    ProductStockShard.slot == slot,
+                    ProductStockShard.stock > 0,
+                )
+                .values(stock=ProductStockShard.stock - 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                sold_slot = slot
+                break
+            dry_slots.append(slot)
+
+        if sold_slot is None:
+            self.db.rollback()
+            return None
+
+        if dry_slots:
+            self._rebalance(product, sold_slot, dry_slots)
+
+        SalesService(self.db).record({product.id: 1})
+        self.db.commit()
+        return self.total_stock(product.id)
+
+    def _rebalance(self, product: Product, source_slot: int, dry_slots: List[int]) -> None:
+        # Mueve la mitad del contador recién usado (ya bloqueado por esta
+        # transacción) a un contador vacío. SKIP LOCKED evita esperar (o
+        # entrar en deadlock) si otra venta está tocando ese contador.
+        target = self.db.execute(
+            select(ProductStockShard.slot)
+            .where(
+                ProductStockShard.product_id == product.id,
+                ProductStockShard.slot.in_(dry_slots),
+            )
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if target is None:
+            return
+
+        source_stock = self.db.execute(
+            select(ProductStockShard.stock).where(
+                ProductStockShard.product_id == product.id,
+                ProductStockShard.slot == source_slot,
+            )
+        ).scalar_one()
+        moved = source_stock // 2
+        if moved <= 0:
+            return
+
+        for slot, delta in ((source_slot, -moved), (target, moved)):
+            self.db.execute(
+                update(ProductStockShard)
+                .where(
+                    ProductStockShard.product_id == product.id,
+                    ProductStockShard.slot == slot,
+                )
+                .values(stock=ProductStockShard.stock + delta)
+                .execution_options(synchronize_session=False)
+            )
+
+        logger.info(
+            "stock_shards_rebalanced",
+            product_id=str(product.id),
+            from_slot=source_slot,
+            to_slot=target,
+            moved=moved,
+        )
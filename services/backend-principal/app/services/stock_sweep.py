@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import httpx
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from ..config import (ALERTS_SERVICE_URL, ALERTS_WEBHOOK_TIMEOUT,
+                      LOW_STOCK_THRESHOLD, REORDER_COVER_DAYS,
+                      STOCK_SWEEP_DIGEST_MAX_ITEMS, STOCK_SWEEP_INTERVAL,
+                      logger)
+from ..database import SessionLocal
+from ..models import Product, ProductSalesStats, ProductStockShard
+from ..shared_state import shared_state
+from ..tracing import span, traceparent_headers
+from .sales import days_of_cover, utcnow
+
+LEASE_KEY = "stock_sweep:lease"
+SNAPSHOT_KEY = "stock_sweep:last"
+
+
+class StockSweep:
+    """Barrido periódico de productos con stock bajo.
+
+    Cada `STOCK_SWEEP_INTERVAL` segundos busca los productos bajo el umbral
+    con el índice `idx_products_stock` (más los totales de los productos con
+    stock fragmentado y, con `REORDER_COVER_DAYS > 0`, los que se quedan sin
+    cobertura), lo compara con el resultado del barrido anterior y manda al
+    microservicio de alertas un solo digest con los que entraron.
+
+    El resultado anterior vive en el estado compartido: con varios workers
+    sólo el que toma el turno barre, y un producto alerta una vez hasta que
+    se repone. El turno dura lo que un lote más un intervalo y se renueva
+    antes de cada lote, así un barrido largo no se solapa con otro worker.
+    Después de cada lote entregado se guarda el resultado anterior más los
+    productos enviados: si un lote falla, sólo sus productos y los de los
+    lotes siguientes se reintentan en el próximo barrido."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.sweeps = 0
+        self.alerted = 0
+        self.low_stock = 0
+        self.last_run_at: Optional[str] = None
+        self.last_duration_ms: Optional[float] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                turn = await asyncio.to_thread(
+                    shared_state.set, LEASE_KEY, self._owner, self._lease_ttl(), True,
+                )
+                if turn:
+                    try:
+                        await self.sweep()
+                    finally:
+                        # El próximo turno, de cualquier worker, en un intervalo
+                        await asyncio.to_thread(self._hold_lease, STOCK_SWEEP_INTERVAL)
+            except Exception as e:
+                logger.error("stock_sweep_error", error=str(e))
+            await asyncio.sleep(STOCK_SWEEP_INTERVAL)
+
+    def _lease_ttl(self) -> float:
+        # Cubre la consulta y un lote; se renueva antes de cada lote
+        return STOCK_SWEEP_INTERVAL + ALERTS_WEBHOOK_TIMEOUT
+
+    def _hold_lease(self, ttl: float) -> bool:
+        """Extiende el turno si sigue siendo de este worker."""
+        return shared_state.renew(LEASE_KEY, self._owner, ttl)
+
+    async def sweep(self) -> int:
+        """Un barrido: manda los digests de los productos que entraron bajo
+        el umbral desde el barrido anterior y retorna cuántos se enviaron.
+        Requiere el turno (`_run`); si lo pierde entre lotes, se detiene. Si
+        un lote falla propaga la excepción, con los lotes anteriores ya
+        registrados."""
+        started = time.perf_counter()
+        current = await asyncio.to_thread(self.find_low_stock)
+        previous = await asyncio.to_thread(self._load_snapshot)
+
+        entered = [item for product_id, item in current.items() if product_id not in previous]
+        recovered = len(previous - current.keys())
+        sent: Set[str] = set()
+        for start in range(0, len(entered), STOCK_SWEEP_DIGEST_MAX_ITEMS):
+            if not await asyncio.to_thread(self._hold_lease, self._lease_ttl()):
+                logger.warning(
+                    "stock_sweep_lease_lost",
+                    sent=len(sent),
+                    pending=len(entered) - len(sent),
+                )
+                return len(sent)
+            chunk = entered[start:start + STOCK_SWEEP_DIGEST_MAX_ITEMS]
+            await self._send_digest(chunk)
+            sent.update(item["product_id"] for item in chunk)
+            self.alerted += len(chunk)
+            await asyncio.to_thread(self._save_snapshot, previous | sent)
+        # Completo: los repuestos salen del resultado guardado
+        await asyncio.to_thread(self._save_snapshot, current.keys())
+
+        self.sweeps += 1
+        self.low_stock = len(current)
+        self.last_run_at = utcnow().isoformat()
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(
+            "stock_sweep_completed",
+            low_stock=len(current),
+            alerted=len(entered),
+            recovered=recovered,
+            duration_ms=self.last_duration_ms,
+        )
+        return len(entered)
+
+    def find_low_stock(self) -> Dict[str, dict]:
+        db = SessionLocal()
+        try:
+            rows = self._below_threshold(db) + self._sharded_below_threshold(db)
+            if REORDER_COVER_DAYS > 0:
+                rows += self._low_cover(db)
+        finally:
+            db.close()
+
+        items = {}
+        for product_id, name, stock, velocity in rows:
+            items[str(product_id)] = {
+                "product_id": str(product_id),
+                "product_name": name,
+                "current_stock": int(stock),
+                "velocity_per_day": round(velocity, 2) if velocity else None,
+                "days_of_cover": days_of_cover(int(stock), velocity),
+            }
+        return items
+
+    def _below_threshold(self, db: Session) -> List[tuple]:
+        # Rango sobre idx_products_stock; los productos fragmentados tienen
+        # products.stock en 0 y se revisan aparte
+        return db.execute(
+            select(Product.id, Product.name, Product.stock, ProductSalesStats.velocity)
+            .outerjoin(ProductSalesStats, ProductSalesStats.product_id == Product.id)
+            .where(Product.stock < LOW_STOCK_THRESHOLD, Product.stock_shards <= 1)
+        ).all()
+
+    def _sharded_below_threshold(self, db: Session) -> List[tuple]:
+        totals = (
+            select(
+                ProductStockShard.product_id,
+                func.sum(ProductStockShard.stock).label("stock"),
+            )
+            .group_by(ProductStockShard.product_id)
+            .having(func.sum(ProductStockShard.stock) < LOW_STOCK_THRESHOLD)
+            .subquery()
+        )
+        return db.execute(
+            select(Product.id, Product.name, totals.c.stock, ProductSalesStats.velocity)
+            .join(totals, totals.c.product_id == Product.id)
+            .outerjoin(ProductSalesStats, ProductSalesStats.product_id == Product.id)
+            .where(Product.stock_shards > 1)
+        ).all()
+
+    def _low_cover(self, db: Session) -> List[tuple]:
+        # Sólo productos con ventas en la ventana; sin fragmentar (los
+        # fragmentados quedan cubiertos por el umbral)
+        return db.execute(
+            select(Product.id, Product.name, Product.stock, ProductSalesStats.velocity)
+            .join(ProductSalesStats, ProductSalesStats.product_id == Product.id)
+            .where(and_(
+                ProductSalesStats.velocity > 0,
+                Product.stock_shards <= 1,
+                Product.stock < ProductSalesStats.velocity * REORDER_COVER_DAYS,
+            ))
+        ).all()
+
+    def _load_snapshot(self) -> Set[str]:
+        raw = shared_state.get(SNAPSHOT_KEY)
+        return set(json.loads(raw)) if raw else set()
+
+    def _save_snapshot(self, items: Iterable[str]) -> None:
+        shared_state.set(SNAPSHOT_KEY, json.dumps(sorted(items)))
+
+    async def _send_digest(self, items: List[dict]) -> None:
+        webhook_url = f"{ALERTS_SERVICE_URL}/webhook/stock-digest"
+        logger.info("sending_stock_digest", items=len(items), webhook_url=webhook_url)
+
+        with span("alerts.digest", kind="client"):
+            async with httpx.AsyncClient(timeout=ALERTS_WEBHOOK_TIMEOUT) as client:
+                response = await client.post(
+                    webhook_url,
+                    json={"items": items},
+                    headers=traceparent_headers(),
+                )
+                response.raise_for_status()
+
+        logger.info(
+            "stock_digest_sent",
+            items=len(items),
+            response_status=response.status_code,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "interval": STOCK_SWEEP_INTERVAL,
+            "sweeps": self.sweeps,
+            "alerted": self.alerted,
+            "low_stock": self.low_stock,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+
+stock_sweep = StockSweep()
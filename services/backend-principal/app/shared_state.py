@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from .config import SHARED_STATE_URL, logger
+
+
+def default_state_url(service: str) -> str:
+    # /dev/shm es memoria compartida entre los workers del contenedor
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return f"sqlite:///{os.path.join(directory, f'{service}-state.db')}"
+
+
+class SQLiteState:
+    """Clave-valor con expiración sobre un archivo SQLite, compartido por los
+    workers de la misma máquina. Implementa el subconjunto de comandos de
+    Redis que usan los servicios (`GET`, `SET` con `EX`/`NX`, `INCR`,
+    `DEL`), más `renew` para extender una clave sólo si sigue siendo de
+    quien la tomó."""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, namespace: str):
+        self.path = path
+        self.prefix = f"{namespace}:"
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Se abre en el primer uso (dentro de cada worker, después del fork)
+        if self._db is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=5,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._db = conn
+        return self._db
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (self.prefix + key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ex: Optional[float] = None,
+            nx: bool = False) -> bool:
+        now = time.time()
+        expires_at = now + ex if ex else None
+        with self._lock:
+            if nx:
+                # Sólo reemplaza una clave vencida
+                cursor = self._conn.execute(
+                    "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                    "expires_at = excluded.expires_at "
+                    "WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?",
+                    (self.prefix + key, value, expires_at, now),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (self.prefix + key, value, expires_at),
+                )
+            self._maybe_purge(now)
+        return cursor.rowcount > 0
+
+    def renew(self, key: str, value: str, ex: float) -> bool:
+        """Extiende la expiración sólo si la clave vigente vale `value`, en un
+        único UPDATE (un lease que otro worker ya tomó no se pisa)."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE kv SET expires_at = ? WHERE key = ? AND value = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (now + ex, self.prefix + key, value, now),
+            )
+        return cursor.rowcount > 0
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, '1', NULL) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(kv.value AS INTEGER) + 1 "
+                "RETURNING value",
+                (self.prefix + key,),
+            ).fetchone()
+        return int(row[0])
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (self.prefix + key,))
+
+    def ping(self) -> None:
+        with self._lock:
+            self._conn.execute("SELECT 1")
+
+    def _maybe_purge(self, now: float) -> None:
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+
+
+class RedisState:
+    """Mismo contrato que `SQLiteState` sobre Redis (o un servidor
+    compatible), para workers en varias máquinas."""
+
+    # Comparar y extender en el servidor, sin carrera entre GET y SET
+    RENEW_SCRIPT = (
+        "if redis.call('GET', KEYS[1]) == ARGV[1] then "
+        "return redis.call('PEXPIRE', KEYS[1], ARGV[2]) end "
+        "return 0"
+    )
+
+    def __init__(self, url: str, namespace: str):
+        import redis
+
+        self.prefix = f"{namespace}:"
+
+        self._client = redis.Redis.from_url(
+            url,
+            decode_responses=True,
+            socket_timeout=2,
+            socket_connect_timeout=2,
+        )
+        self._renew = self._client.register_script(self.RENEW_SCRIPT)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ex: Optional[float] = None,
+            nx: bool = False) -> bool:
+        px = int(ex * 1000) if ex else None
+        return bool(self._client.set(self.prefix + key, value, px=px, nx=nx))
+
+    def renew(self, key: str, value: str, ex: float) -> bool:
+        return bool(self._renew(keys=[self.prefix + key], args=[value, int(ex * 1000)]))
+
+    def incr(self, key: str) -> int:
+        return int(self._client.incr(self.prefix + key))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+    def ping(self) -> None:
+        self._client.ping()
+
+
+def create_state(url: str, namespace: str):
+    """Las claves llevan el nombre del servicio como prefijo: varios servicios
+    pueden compartir el mismo Redis."""
+    if url.startswith(("redis://", "rediss://")):
+        state = RedisState(url, namespace)
+    elif url.startswith("sqlite:///"):
+        state = SQLiteState(url[len("sqlite:///"):], namespace)
+    else:
+        raise ValueError(f"SHARED_STATE_URL no soportada: {url}")
+    logger.info("shared_state_configured", backend=type(state).__name__)
+    return state
+
+
+shared_state = create_state(
+    SHARED_STATE_URL or default_state_url("backend-principal"),
+    "backend-principal",
+)
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# La app lee la configuración al importarse: base SQLite temporal
+_tmp = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ.setdefault("SHARED_STATE_URL", f"sqlite:///{_tmp}/state.db")
+os.environ.setdefault("SIMILARITY_ENABLED", "false")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
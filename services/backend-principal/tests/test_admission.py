@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import admission
+from app.admission import AdmissionMiddleware, Bulkhead, Rejected
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        bulkhead = Bulkhead("db", limit=1, max_queue=1, max_wait_ms=1000)
+        await bulkhead.acquire()
+        queued = asyncio.create_task(bulkhead.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(Rejected) as exc:
+            await bulkhead.acquire()
+        assert exc.value.status_code == 429
+        assert exc.value.retry_after >= 1
+
+        # El lugar liberado pasa al que estaba en cola
+        bulkhead.release(0.01)
+        await queued
+        assert bulkhead.in_flight == 1
+        assert bulkhead.rejected == 1
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_is_shed_with_503_after_max_wait():
+    async def scenario():
+        bulkhead = Bulkhead("db", limit=1, max_queue=5, max_wait_ms=20)
+        await bulkhead.acquire()
+
+        with pytest.raises(Rejected) as exc:
+            await bulkhead.acquire()
+        assert exc.value.status_code == 503
+        assert bulkhead.shed == 1
+        assert bulkhead.stats()["queued_now"] == 0
+
+        bulkhead.release()
+        assert bulkhead.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_middleware_rejects_with_retry_after(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    monkeypatch.setitem(admission.bulkheads, "db", Bulkhead("db", 1, 0, 1000))
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await gate.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        transport = httpx.ASGITransport(app=AdmissionMiddleware(app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/products/1/sell"))
+            await asyncio.sleep(0.01)
+
+            rejected = await client.post("/products/2/sell")
+            assert rejected.status_code == 429
+            assert int(rejected.headers["retry-after"]) >= 1
+
+            # Las rutas sin bulkhead no pasan por admisión
+            gate.set()
+            assert (await client.get("/health")).status_code == 200
+            assert (await first).status_code == 200
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.database import Base, SessionLocal, engine
+from app.models import Product
+from app.schemas import ProductImportRow
+from app.services.bulk import ProductImporter, iter_records
+
+
+async def _stream(text: str, chunk_size: int = 7):
+    data = text.encode()
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_blank_id_and_stock_cells_use_defaults():
+    row = ProductImportRow(id="", name="Lámpara", keywords="led", stock=" ",
+                           description="", category="")
+    assert row.id is None
+    assert row.stock == 0
+    assert row.description is None
+    assert row.category is None
+
+
+def test_csv_records_span_quoted_newlines():
+    csv_text = 'name,description\nMochila,"Dos\nlíneas"\nReloj,simple\n'
+
+    async def collect():
+        return [r async for r in iter_records(_stream(csv_text), "csv")]
+
+    records = asyncio.run(collect())
+    assert records == [
+        (2, {"name": "Mochila", "description": "Dos\nlíneas"}),
+        (4, {"name": "Reloj", "description": "simple"}),
+    ]
+
+
+def test_import_csv_with_blank_id_rows(db):
+    # Export con filas nuevas agregadas a mano: sin id ni stock
+    csv_text = (
+        "id,name,keywords,stock,description,category\n"
+        "3f2b8a52-2c1e-4d8a-9a55-0b7f5e0c1a01,Existente,led,5,Desc,Hogar > Luz\n"
+        ",Nuevo uno,rgb,,Desc,Hogar > Luz\n"
+        ",Nuevo dos,,3,,\n"
+    )
+    result = asyncio.run(ProductImporter().run(_stream(csv_text), "csv"))
+
+    assert result["errors"] == []
+    assert result["imported"] == 3
+    stocks = {p.name: p.stock for p in db.query(Product).all()}
+    assert stocks == {"Existente": 5, "Nuevo uno": 0, "Nuevo dos": 3}
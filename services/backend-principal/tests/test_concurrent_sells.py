@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import event, func, select, update
+
+from app.database import Base, SessionLocal, engine
+from app.models import Product, ProductStockShard, SaleEvent
+from app.services.sell_batcher import SellBatcher
+from app.services.stock_shards import StockShardService
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def _units_sold(db, product_id):
+    return db.execute(
+        select(func.coalesce(func.sum(SaleEvent.quantity), 0))
+        .where(SaleEvent.product_id == product_id)
+    ).scalar_one()
+
+
+def test_concurrent_sharded_sells_never_oversell(db):
+    product = Product(name="Oferta", keywords=[], stock=0)
+    db.add(product)
+    db.flush()
+    StockShardService(db).attach_shards(product, total=20, slots=4)
+    db.commit()
+    db.refresh(product)
+    db.expunge(product)
+
+    def sell(_):
+        session = SessionLocal()
+        try:
+            return StockShardService(session).sell_one(product)
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(sell, range(30)))
+
+    sold = [remaining for remaining in results if remaining is not None]
+    assert len(sold) == 20
+    assert results.count(None) == 10
+    shards = db.execute(
+        select(ProductStockShard.stock).where(ProductStockShard.product_id == product.id)
+    ).scalars().all()
+    assert len(shards) == 4
+    assert all(stock == 0 for stock in shards)
+    assert _units_sold(db, product.id) == 20
+
+
+def test_batch_retries_after_stock_conflict_without_overselling(db):
+    product = Product(name="Oferta", keywords=[], stock=3)
+    db.add(product)
+    db.commit()
+    product_id = product.id
+    raced = []
+
+    def competing_sale(conn, cursor, statement, parameters, context, executemany):
+        # Otra venta descuenta 2 entre la lectura del lote y su UPDATE
+        if raced or not statement.startswith("UPDATE products SET stock"):
+            return
+        raced.append(True)
+        with engine.begin() as other:
+            other.execute(
+                update(Product).where(Product.id == product_id)
+                .values(stock=Product.stock - 2)
+            )
+
+    event.listen(engine, "before_cursor_execute", competing_sale)
+    try:
+        outcomes = SellBatcher(window_ms=0, max_size=10)._apply([product_id] * 3)
+    finally:
+        event.remove(engine, "before_cursor_execute", competing_sale)
+
+    assert raced
+    assert [outcome.sold for outcome in outcomes] == [True, False, False]
+    assert [outcome.stock for outcome in outcomes] == [0, 0, 0]
+    db.expire_all()
+    assert db.get(Product, product_id).stock == 0
+    assert _units_sold(db, product_id) == 1
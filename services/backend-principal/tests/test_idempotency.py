@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.database import Base, SessionLocal, engine
+from app.models import IdempotencyKey
+from app.services.idempotency import _claim, request_hash, run_idempotent
+
+
+class Echo(BaseModel):
+    value: int
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def _run(key, calls):
+    async def handler():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    return asyncio.run(run_idempotent(key, "test", {"a": 1}, handler, Echo))
+
+
+def test_in_progress_key_is_rejected_until_lock_expires():
+    # Simula un request que reservó la clave y murió antes de guardar la respuesta
+    assert _claim("k1", "test", request_hash({"a": 1})) is None
+    calls = []
+
+    with pytest.raises(HTTPException) as exc:
+        _run("k1", calls)
+    assert exc.value.status_code == 409
+    assert calls == []
+
+    db = SessionLocal()
+    db.get(IdempotencyKey, ("k1", "test")).locked_until = time.time() - 1
+    db.commit()
+    db.close()
+
+    assert _run("k1", calls) == {"value": 1}
+    replay = _run("k1", calls)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert calls == [1]
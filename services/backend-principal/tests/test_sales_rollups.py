@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.database import Base, SessionLocal, engine
+from app.models import (Product, ProductSalesStats, SaleEvent, SalesRollup,
+                        SalesRollupState)
+from app.services.sales import SalesRollups, utcnow
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def _sell(db, product_id, event_id, sold_at):
+    db.execute(insert(SaleEvent), [
+        {"id": event_id, "product_id": product_id, "quantity": 1, "sold_at": sold_at},
+    ])
+    db.commit()
+
+
+def _day_units(db, product_id):
+    return db.execute(
+        select(func.sum(SalesRollup.units)).where(
+            SalesRollup.product_id == product_id, SalesRollup.period == "day",
+        )
+    ).scalar_one()
+
+
+def test_late_commit_below_watermark_is_rolled_up(db):
+    product = Product(name="Oferta", keywords=[], stock=100)
+    db.add(product)
+    db.commit()
+    earlier = utcnow() - timedelta(minutes=1)
+
+    # El id 3 se asignó antes que el 4 pero su transacción confirma después
+    for event_id in (1, 2, 4):
+        _sell(db, product.id, event_id, earlier)
+    rollups = SalesRollups()
+    assert rollups.roll_up() == 3
+    state = db.get(SalesRollupState, 1)
+    assert state.last_event_id == 4
+    assert [event_id for event_id, _ in state.pending_ids] == [3]
+
+    _sell(db, product.id, 3, earlier - timedelta(seconds=5))
+    assert rollups.roll_up() == 1
+    db.expire_all()
+    assert db.get(SalesRollupState, 1).pending_ids == []
+    assert _day_units(db, product.id) == 4
+    # El evento tardío no retrocede la última venta
+    stats = db.get(ProductSalesStats, product.id)
+    assert stats.last_sale_at.replace(tzinfo=None) == earlier.replace(tzinfo=None)
+
+    assert rollups.roll_up() == 0
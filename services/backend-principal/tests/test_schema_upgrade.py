@@ -0,0 +1,63 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import MetaData, inspect, text
+
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models import Category, Product
+
+# `products` como la creaba la primera versión del servicio
+BASELINE_PRODUCTS = """
+    CREATE TABLE products (
+        id UUID NOT NULL PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        keywords JSON NOT NULL,
+        stock INTEGER NOT NULL,
+        description TEXT,
+        category VARCHAR(300),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT check_stock_non_negative CHECK (stock >= 0)
+    )
+"""
+
+
+def _drop_everything():
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+    metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def baseline_db():
+    _drop_everything()
+    product_id = uuid.uuid4()
+    with engine.begin() as conn:
+        conn.execute(text(BASELINE_PRODUCTS))
+        conn.execute(
+            text("INSERT INTO products (id, name, keywords, stock, category) "
+                 "VALUES (:id, 'Audífonos', '[]', 5, 'Electrónica > Audio')"),
+            {"id": product_id.hex},
+        )
+    yield product_id
+    _drop_everything()
+
+
+def test_startup_upgrades_baseline_products_table(baseline_db):
+    with TestClient(app) as client:
+        assert client.get("/products").status_code == 200
+
+    columns = {column["name"] for column in inspect(engine).get_columns("products")}
+    assert {"stock_shards", "category_id"} <= columns
+    indexes = {index["name"] for index in inspect(engine).get_indexes("products")}
+    assert {"idx_products_category_id", "idx_products_stock"} <= indexes
+
+    db = SessionLocal()
+    try:
+        product = db.get(Product, baseline_db)
+        assert product.stock_shards == 0
+        assert db.get(Category, product.category_id).path == "Electrónica > Audio"
+    finally:
+        db.close()
@@ -0,0 +1,40 @@
+import uuid
+
+import pytest
+
+from app.models import Product
+from app.services.similarity import SimilarityIndex
+
+
+def _product(name, keywords):
+    return Product(
+        id=uuid.uuid4(),
+        name=name,
+        keywords=keywords,
+        description=f"{name}: descripción generada.",
+        category="Electrónica > Celulares",
+    )
+
+
+@pytest.fixture
+def index():
+    index = SimilarityIndex(0.8)
+    index.add(_product("Samsung Galaxy S23", ["celular", "android"]))
+    index.add(_product("Camiseta talla M", ["ropa", "algodón"]))
+    return index
+
+
+def test_near_duplicate_is_reused(index):
+    match = index.find_similar("samsung  galaxy S23", ["Android", "celular"])
+    assert match is not None
+    assert match.product.name == "Samsung Galaxy S23"
+    assert match.similarity >= 0.8
+
+
+@pytest.mark.parametrize("name,keywords", [
+    ("Samsung Galaxy S24", ["celular", "android"]),
+    ("Camiseta talla L", ["ropa", "algodón"]),
+    ("Samsung Galaxy S23", ["celular", "android", "reacondicionado"]),
+])
+def test_distinct_sku_is_not_reused(index, name, keywords):
+    assert index.find_similar(name, keywords) is None
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import stock_sweep as module
+from app.services.stock_sweep import LEASE_KEY, SNAPSHOT_KEY, StockSweep
+from app.shared_state import shared_state
+
+
+@pytest.fixture
+def sweep(monkeypatch):
+    monkeypatch.setattr(module, "STOCK_SWEEP_DIGEST_MAX_ITEMS", 1)
+    shared_state.delete(SNAPSHOT_KEY)
+    sweep = StockSweep()
+    shared_state.set(LEASE_KEY, sweep._owner, 60)
+    items = {
+        product_id: {"product_id": product_id, "product_name": product_id, "current_stock": 1}
+        for product_id in ("a", "b", "c")
+    }
+    monkeypatch.setattr(sweep, "find_low_stock", lambda: items)
+    yield sweep
+    shared_state.delete(LEASE_KEY)
+    shared_state.delete(SNAPSHOT_KEY)
+
+
+def test_failed_chunk_keeps_delivered_chunks(sweep, monkeypatch):
+    sent, calls = [], []
+
+    async def send_digest(items):
+        calls.append(items)
+        if len(calls) == 2:
+            raise RuntimeError("alertas caído")
+        sent.extend(item["product_id"] for item in items)
+
+    monkeypatch.setattr(sweep, "_send_digest", send_digest)
+    with pytest.raises(RuntimeError):
+        asyncio.run(sweep.sweep())
+    assert sweep._load_snapshot() == {"a"}
+
+    # El reintento manda sólo los que faltaban
+    assert asyncio.run(sweep.sweep()) == 2
+    assert sent == ["a", "b", "c"]
+    assert sweep._load_snapshot() == {"a", "b", "c"}
+
+
+def test_lost_lease_stops_sending(sweep, monkeypatch):
+    sent = []
+
+    async def send_digest(items):
+        sent.extend(item["product_id"] for item in items)
+        shared_state.set(LEASE_KEY, "otro-worker", 60)
+
+    monkeypatch.setattr(sweep, "_send_digest", send_digest)
+    assert asyncio.run(sweep.sweep()) == 1
+    assert sent == ["a"]
+    assert sweep._load_snapshot() == {"a"}
+
+
+def test_hold_lease_only_renews_own_lease(sweep):
+    assert sweep._hold_lease(120)
+    assert shared_state.get(LEASE_KEY) == sweep._owner
+
+    shared_state.set(LEASE_KEY, "otro-worker", 60)
+    assert not sweep._hold_lease(120)
+    assert shared_state.get(LEASE_KEY) == "otro-worker"
+
+    # Un lease vencido tampoco se renueva: hay que volver a tomarlo con NX
+    shared_state.set(LEASE_KEY, sweep._owner, 0.01)
+    time.sleep(0.02)
+    assert not sweep._hold_lease(120)
+    assert shared_state.set(LEASE_KEY, sweep._owner, 60, True)
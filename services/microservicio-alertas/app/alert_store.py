@@ -0,0 +1,373 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Optional
+
+from .config import (ALERT_BUFFER_MAX, ALERT_FLUSH_BATCH_SIZE,
+                     ALERT_FLUSH_INTERVAL, ALERT_STORE_BACKEND,
+                     ALERT_STORE_PATH, logger)
+
+
+def to_utc_iso(value: datetime) -> str:
+    # Todas las fechas se guardan como ISO UTC sin zona para que el orden
+    # lexicográfico coincida con el cronológico.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def build_alert_record(
+    product_id: str,
+    product_name: str,
+    current_stock: int,
+    supplier_price: float,
+    alert_text: str,
+    velocity_per_day: Optional[float] = None,
+    days_of_cover: Optional[float] = None,
+) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "product_id": product_id,
+        "product_name": product_name,
+        "current_stock": current_stock,
+        "supplier_price": supplier_price,
+        "velocity_per_day": velocity_per_day,
+        "days_of_cover": days_of_cover,
+        "alert_text": alert_text,
+        "created_at": to_utc_iso(datetime.utcnow()),
+    }
+
+
+class AlertSink(ABC):
+    """Destino persistente de alertas. Las implementaciones son síncronas y
+    se ejecutan fuera del event loop desde `BufferedAlertWriter`."""
+
+    @abstractmethod
+    def write_batch(self, records: list[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        product_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        ...
+
+    def ping(self) -> None:
+        """Lanza si el destino no puede escribirse."""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteAlertSink(AlertSink):
+    COLUMNS = (
+        "id",
+        "product_id",
+        "product_name",
+        "current_stock",
+        "supplier_price",
+        "velocity_per_day",
+        "days_of_cover",
+        "alert_text",
+        "created_at",
+    )
+    # Columnas agregadas después de la primera versión de la tabla
+    ADDED_COLUMNS = {"velocity_per_day": "REAL", "days_of_cover": "REAL"}
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS stock_alerts (
+                id TEXT PRIMARY KEY,
+                product_id TEXT NOT NULL,
+                product_name TEXT NOT NULL,
+                current_stock INTEGER NOT NULL,
+                supplier_price REAL,
+                velocity_per_day REAL,
+                days_of_cover REAL,
+                alert_text TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_stock_alerts_product_created
+                ON stock_alerts(product_id, created_at);
+            CREATE INDEX IF NOT EXISTS idx_stock_alerts_created
+                ON stock_alerts(created_at);
+            """
+        )
+        # Cada worker migra al arrancar: el bloqueo de escritura hace que la
+        # revisión y el ALTER de uno no se intercalen con los de otro
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = {
+                row["name"]
+                for row in self._conn.execute("PRAGMA table_info(stock_alerts)")
+            }
+            for column, column_type in self.ADDED_COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(
+                        f"ALTER TABLE stock_alerts ADD COLUMN {column} {column_type}"
+                    )
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+
+    def write_batch(self, records: list[dict]) -> None:
+        placeholders = ", ".join(f":{column}" for column in self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO stock_alerts ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                records,
+            )
+
+    def query(
+        self,
+        product_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        clauses, params = [], []
+        if product_id:
+            clauses.append("product_id = ?")
+            params.append(product_id)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at <= ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f"SELECT {', '.join(self.COLUMNS)} FROM stock_alerts {where} "
+            "ORDER BY created_at DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, [*params, limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def ping(self) -> None:
+        with self._lock:
+            self._conn.execute("SELECT 1 FROM stock_alerts LIMIT 1")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JSONLAlertSink(AlertSink):
+    """Archivo append-only, una alerta por línea. No tiene índices: las
+    consultas recorren el archivo completo, útil para auditoría y envío a
+    otros sistemas más que para consultas frecuentes."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self.path = path
+
+    def write_batch(self, records: list[dict]) -> None:
+        lines = "".join(
+            json.dumps(record, ensure_ascii=False) + "\n" for record in records
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(lines)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def query(
+        self,
+        product_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        if not os.path.exists(self.path):
+            return []
+
+        matches = []
+        with self._lock, open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if product_id and record["product_id"] != product_id:
+                    continue
+                if since and record["created_at"] < since:
+                    continue
+                if until and record["created_at"] > until:
+                    continue
+                matches.append(record)
+
+        matches.sort(key=lambda record: record["created_at"], reverse=True)
+        return matches[:limit]
+
+    def ping(self) -> None:
+        if not os.access(os.path.dirname(self.path) or ".", os.W_OK):
+            raise OSError(f"Sin permiso de escritura para {self.path}")
+
+
+def create_alert_sink(backend: str = ALERT_STORE_BACKEND,
+                      path: str = ALERT_STORE_PATH) -> AlertSink:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if backend == "sqlite":
+        return SQLiteAlertSink(path)
+    if backend == "jsonl":
+        return JSONLAlertSink(path)
+    raise ValueError(f"ALERT_STORE_BACKEND no soportado: {backend}")
+
+
+class BufferedAlertWriter:
+    """Acumula alertas en memoria y las persiste por lotes en un hilo aparte,
+    cuando se alcanza `batch_size` o pasa `flush_interval` segundos.
+
+    Si el destino falla, el lote vuelve al buffer para el próximo intento;
+    con el destino caído el buffer guarda a lo sumo `max_buffered` alertas y
+    descarta las más antiguas, contándolas en `dropped`."""
+
+    def __init__(
+        self,
+        batch_size: int = ALERT_FLUSH_BATCH_SIZE,
+        flush_interval: float = ALERT_FLUSH_INTERVAL,
+        max_buffered: int = ALERT_BUFFER_MAX,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.dropped = 0
+        self.sink: Optional[AlertSink] = None
+        self._buffer: list[dict] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, sink: Optional[AlertSink] = None) -> None:
+        self.sink = sink or await asyncio.to_thread(create_alert_sink)
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "alert_writer_started",
+            sink=type(self.sink).__name__,
+            batch_size=self.batch_size,
+            flush_interval=self.flush_interval,
+        )
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+        if self.sink:
+            await asyncio.to_thread(self.sink.close)
+            self.sink = None
+
+    def submit(self, record: dict) -> None:
+        self._buffer.append(record)
+        self._trim()
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _trim(self) -> None:
+        excess = len(self._buffer) - self.max_buffered
+        if excess <= 0:
+            return
+        del self._buffer[:excess]
+        self.dropped += excess
+        logger.error(
+            "alerts_dropped",
+            count=excess,
+            dropped_total=self.dropped,
+            pending=len(self._buffer),
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    timeout=self.flush_interval,
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._buffer or not self.sink:
+                return
+
+            batch, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self.sink.write_batch, batch)
+                logger.debug("alerts_flushed", count=len(batch))
+            except Exception as e:
+                # Se reencolan para no perder alertas si el disco falla
+                # momentáneamente.
+                self._buffer[:0] = batch
+                self._trim()
+                logger.error(
+                    "alerts_flush_error",
+                    error=str(e),
+                    pending=len(self._buffer),
+                )
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._buffer),
+            "max_buffered": self.max_buffered,
+            "dropped": self.dropped,
+        }
+
+    async def ping(self) -> None:
+        if not self.sink:
+            raise RuntimeError("Almacén de alertas no iniciado")
+        # Alertas que no se pudieron persistir en varios intentos seguidos
+        if len(self._buffer) > 10 * self.batch_size:
+            raise RuntimeError(f"{len(self._buffer)} alertas sin persistir")
+        await asyncio.to_thread(self.sink.ping)
+
+    async def query(
+        self,
+        product_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        # Se vacía el buffer antes de consultar para que las alertas recién
+        # generadas también aparezcan.
+        await self.flush()
+        if not self.sink:
+            return []
+
+        return await asyncio.to_thread(
+            self.sink.query,
+            product_id,
+            to_utc_iso(since) if since else None,
+            to_utc_iso(until) if until else None,
+            limit,
+        )
+
+
+alert_writer = BufferedAlertWriter()
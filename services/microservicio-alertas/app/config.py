@@ -2,37 +2,67 @@ import os
 
 import structlog
 
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer(),
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    cache_logger_on_first_use=True,
+from .logging_setup import configure_logging
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
+# Fracción de eventos de éxito de alto volumen que se escriben
+# ("evento=fracción,..."); advertencias y errores se escriben siempre
+LOG_SAMPLE_RATES = os.getenv(
+    "LOG_SAMPLE_RATES",
+    "webhook_received=0.1,processing_stock_alert=0.1,"
+    "generating_alert_with_llm=0.1,fetching_supplier_price=0.1",
 )
+# Largo máximo de cada campo de texto en los logs
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "512"))
+# Líneas de log en cola como máximo; con la cola llena se descartan
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+configure_logging(LOG_LEVEL, LOG_SAMPLE_RATES, LOG_MAX_FIELD_CHARS, LOG_QUEUE_SIZE)
 
 logger = structlog.get_logger()
 
 PORT = int(os.getenv("PORT", "8002"))
-LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-mini-2025-08-07")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+# auto: Gemini si hay GOOGLE_API_KEY, si no OpenAI; fake: proveedor local
+# determinista para pruebas de carga sin costo
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "auto").lower()
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "0"))
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+# Palabras de cada alerta generada (0 = sólo la frase fija)
+FAKE_LLM_OUTPUT_WORDS = int(os.getenv("FAKE_LLM_OUTPUT_WORDS", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "42"))
 MOCK_PRICE_URL = os.getenv("MOCK_PRICE_URL", "https://dummyjson.com/products/1")
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "10"))
+ALERT_STORE_BACKEND = os.getenv("ALERT_STORE_BACKEND", "sqlite").lower()
+ALERT_STORE_PATH = os.getenv("ALERT_STORE_PATH", "data/alerts.db")
+ALERT_FLUSH_BATCH_SIZE = int(os.getenv("ALERT_FLUSH_BATCH_SIZE", "50"))
+ALERT_FLUSH_INTERVAL = float(os.getenv("ALERT_FLUSH_INTERVAL", "1.0"))
+# Alertas en memoria como máximo mientras el almacén no responde; las más
+# antiguas se descartan
+ALERT_BUFFER_MAX = int(os.getenv("ALERT_BUFFER_MAX", "10000"))
+# Digest de stock bajo (POST /webhook/stock-digest): alertas generadas a la
+# vez por digest
+ALERT_DIGEST_CONCURRENCY = int(os.getenv("ALERT_DIGEST_CONCURRENCY", "4"))
+# Estado compartido entre workers: sqlite:///ruta (por defecto en /dev/shm)
+# o redis://host:puerto/db
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+# Revisión de dependencias en segundo plano (GET /health, /health/ready); LLM
+# y API de precios se consultan cada HEALTH_LLM_PROBE_INTERVAL segundos
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "10"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+HEALTH_LLM_PROBE_INTERVAL = float(os.getenv("HEALTH_LLM_PROBE_INTERVAL", "60"))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "data/traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318")
 ALLOWED_ORIGINS = os.getenv(
     "ALLOWED_ORIGINS",
     "http://localhost:5173,http://localhost:8000,http://localhost:3000",
 ).split(",")
 
-if not OPENAI_API_KEY and not GOOGLE_API_KEY:
+if LLM_PROVIDER != "fake" and not OPENAI_API_KEY and not GOOGLE_API_KEY:
     logger.warning("no_api_keys_configured", message="Se recomienda configurar OPENAI_API_KEY o GOOGLE_API_KEY")
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import math
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+PHRASES = [
+    "Se recomienda reordenar de inmediato para evitar quiebre de stock.",
+    "Prioridad alta: coordinar reposición con el proveedor hoy.",
+    "Revisar la orden de compra pendiente y confirmar tiempos de entrega.",
+    "Reponer inventario antes del próximo ciclo de ventas.",
+]
+# Relleno para alcanzar `output_words`
+WORDS = (
+    "proveedor reposición inventario demanda urgente semana pedido margen "
+    "rotación bodega entrega prioridad"
+).split()
+
+
+class FakeLLMError(Exception):
+    pass
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text.split()) * 1.3))
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model local y determinista para pruebas de carga.
+
+    Responde según el hash del prompt, con latencia configurable (asíncrona en
+    `ainvoke`/`astream`, bloqueante en `invoke`/`stream`), largo de la
+    respuesta (`output_words`, 0 = sólo la frase), uso de tokens, streaming e
+    inyección de fallos. Mismos parámetros que el `FakeChatClient` de
+    microservicio-ia."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+    output_words: int = 0
+    seed: int = 42
+
+    _rng: Optional[random.Random] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "failure_rate": self.failure_rate,
+            "output_words": self.output_words,
+            "seed": self.seed,
+        }
+
+    def _draw(self) -> tuple[float, bool]:
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        failed = self._rng.random() < self.failure_rate
+        return max(0.0, self.latency_ms + jitter) / 1000, failed
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        content = (
+            f"⚠️ Stock bajo detectado (ref {digest[:8]}). "
+            f"{PHRASES[int(digest[8:10], 16) % len(PHRASES)]}"
+        )
+        missing = self.output_words - len(content.split())
+        if missing > 0:
+            rng = random.Random(digest)
+            content += " " + " ".join(rng.choice(WORDS) for _ in range(missing))
+        input_tokens = _estimate_tokens(prompt)
+        output_tokens = _estimate_tokens(content)
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay, failed = self._draw()
+        time.sleep(delay)
+        if failed:
+            raise FakeLLMError("Fallo simulado del proveedor fake")
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay, failed = self._draw()
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeLLMError("Fallo simulado del proveedor fake")
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _chunks(self, messages: List[BaseMessage]) -> List[AIMessageChunk]:
+        message = self._respond(messages)
+        words = message.content.split(" ")
+        return [
+            AIMessageChunk(
+                content=word if i == 0 else " " + word,
+                # El uso llega con el último chunk, como en los proveedores reales
+                usage_metadata=message.usage_metadata if i == len(words) - 1 else None,
+            )
+            for i, word in enumerate(words)
+        ]
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        delay, failed = self._draw()
+        chunks = self._chunks(messages)
+        for index, chunk in enumerate(chunks):
+            time.sleep(delay / len(chunks))
+            if failed and index == len(chunks) // 2:
+                raise FakeLLMError("Fallo simulado del proveedor fake durante streaming")
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        delay, failed = self._draw()
+        chunks = self._chunks(messages)
+        for index, chunk in enumerate(chunks):
+            await asyncio.sleep(delay / len(chunks))
+            if failed and index == len(chunks) // 2:
+                raise FakeLLMError("Fallo simulado del proveedor fake durante streaming")
+            yield ChatGenerationChunk(message=chunk)
@@ -1,28 +1,113 @@
+import asyncio
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional
+
 import httpx
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
 
+from .alert_store import alert_writer, build_alert_record
 from .config import (
+    ALERT_DIGEST_CONCURRENCY,
+    FAKE_LLM_FAILURE_RATE,
+    FAKE_LLM_JITTER_MS,
+    FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_OUTPUT_WORDS,
+    FAKE_LLM_SEED,
     GEMINI_MODEL,
     GOOGLE_API_KEY,
+    LLM_PROVIDER,
     MOCK_PRICE_URL,
     OPENAI_API_KEY,
+    OPENAI_BASE_URL,
     OPENAI_MODEL,
     REQUEST_TIMEOUT,
     logger,
 )
+from .models import StockAlertWebhook
+from .tracing import span
+
+if TYPE_CHECKING:
+    from langchain.chains import LLMChain
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+
+def sales_context(velocity_per_day: Optional[float],
+                  days_of_cover: Optional[float]) -> str:
+    if not velocity_per_day:
+        return "sin ventas recientes registradas"
+    context = f"{velocity_per_day:g} unidades por día"
+    if days_of_cover is not None:
+        context += f", el stock alcanza para {days_of_cover:g} días"
+    return context
 
 
 class StockAlertService:
     def __init__(self):
-        self.llm = self._get_llm()
-        self.alert_chain = self._create_alert_chain()
+        # LangChain y los SDKs de cada proveedor tardan en importarse; se
+        # cargan en `warmup()` o en el primer uso, no al importar el módulo.
+        self._llm: Optional["BaseChatModel"] = None
+        self._alert_chain: Optional["LLMChain"] = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @property
+    def llm(self) -> Optional["BaseChatModel"]:
+        self.warmup()
+        return self._llm
+
+    @property
+    def alert_chain(self) -> Optional["LLMChain"]:
+        self.warmup()
+        return self._alert_chain
+
+    def warmup(self) -> None:
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            try:
+                self._llm = self._get_llm()
+                self._alert_chain = self._create_alert_chain()
+            except Exception as e:
+                # Sin LLM las alertas usan el mensaje de respaldo
+                logger.error("llm_initialization_error", error=str(e))
+                self._llm = None
+                self._alert_chain = None
+            self._initialized = True
+
+    @staticmethod
+    def _provider() -> Optional[str]:
+        if LLM_PROVIDER == "fake":
+            return "fake"
+        if LLM_PROVIDER in ("auto", "google", "gemini") and GOOGLE_API_KEY:
+            return "google"
+        if LLM_PROVIDER in ("auto", "openai") and OPENAI_API_KEY:
+            return "openai"
+        return None
+
+    def _get_llm(self) -> Optional["BaseChatModel"]:
+        provider = self._provider()
+
+        if provider == "fake":
+            from .fake_llm import FakeChatModel
+
+            logger.info(
+                "initializing_llm",
+                provider="fake",
+                latency_ms=FAKE_LLM_LATENCY_MS,
+                failure_rate=FAKE_LLM_FAILURE_RATE,
+            )
+            return FakeChatModel(
+                latency_ms=FAKE_LLM_LATENCY_MS,
+                jitter_ms=FAKE_LLM_JITTER_MS,
+                failure_rate=FAKE_LLM_FAILURE_RATE,
+                output_words=FAKE_LLM_OUTPUT_WORDS,
+                seed=FAKE_LLM_SEED,
+            )
+        elif provider == "google":
+            from langchain_google_genai import ChatGoogleGenerativeAI
 
-    def _get_llm(self) -> BaseChatModel:
-        if GOOGLE_API_KEY:
             logger.info(
                 "initializing_llm",
                 provider="google",
@@ -34,7 +119,9 @@ class StockAlertService:
                 temperature=0.7,
                 max_tokens=150,
             )
-        elif OPENAI_API_KEY:
+        elif provider == "openai":
+            from langchain_openai import ChatOpenAI
+
             logger.info(
                 "initializing_llm",
                 provider="openai",
@@ -43,6 +130,7 @@ class StockAlertService:
             return ChatOpenAI(
                 model=OPENAI_MODEL,
                 openai_api_key=OPENAI_API_KEY,
+                openai_api_base=OPENAI_BASE_URL,
                 temperature=0.7,
                 max_tokens=150,
             )
@@ -53,10 +141,13 @@ class StockAlertService:
             )
             return None
 
-    def _create_alert_chain(self) -> LLMChain:
-        if not self.llm:
+    def _create_alert_chain(self) -> Optional["LLMChain"]:
+        if not self._llm:
             return None
 
+        from langchain.chains import LLMChain
+        from langchain.prompts import PromptTemplate
+
         prompt_template = """Eres un asistente de gestión de inventario profesional.
 
         Genera un mensaje de alerta de stock bajo que sea:
@@ -68,6 +159,7 @@ class StockAlertService:
         - Nombre: {product_name}
         - Stock actual: {current_stock} unidades
         - Precio de proveedor sugerido: ${supplier_price}
+        - Ritmo de venta: {sales_context}
         - ID del producto: {product_id}
 
         Genera solo el mensaje de alerta, sin explicaciones adicionales."""
@@ -78,18 +170,44 @@ class StockAlertService:
                 "product_name",
                 "current_stock",
                 "supplier_price",
+                "sales_context",
                 "product_id",
             ],
         )
 
-        return LLMChain(llm=self.llm, prompt=prompt)
+        return LLMChain(llm=self._llm, prompt=prompt)
+
+    async def check_llm(self) -> None:
+        """Consulta el modelo configurado en el proveedor, sin generar
+        tokens."""
+        provider = self._provider()
+        if provider is None:
+            raise RuntimeError("LLM no configurado, se usa el mensaje de respaldo")
+        if provider == "fake":
+            return
+        if provider == "google":
+            url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}"
+            headers = {"x-goog-api-key": GOOGLE_API_KEY}
+        else:
+            base_url = (OPENAI_BASE_URL or "https://api.openai.com/v1").rstrip("/")
+            url = f"{base_url}/models/{OPENAI_MODEL}"
+            headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+            response = await client.get(url, headers=headers)
+        response.raise_for_status()
+
+    async def check_price_api(self) -> None:
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+            response = await client.get(MOCK_PRICE_URL)
+        response.raise_for_status()
 
     async def fetch_supplier_price(self) -> float:
         try:
-            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-                logger.info("fetching_supplier_price", url=MOCK_PRICE_URL)
-                response = await client.get(MOCK_PRICE_URL)
-                response.raise_for_status()
+            with span("price.fetch", kind="client"):
+                async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+                    logger.info("fetching_supplier_price", url=MOCK_PRICE_URL)
+                    response = await client.get(MOCK_PRICE_URL)
+                    response.raise_for_status()
                 data = response.json()
                 price = data.get("price", 99.99)
                 logger.info("supplier_price_fetched", price=price)
@@ -108,6 +226,8 @@ class StockAlertService:
         product_id: str,
         current_stock: int,
         supplier_price: float,
+        velocity_per_day: Optional[float] = None,
+        days_of_cover: Optional[float] = None,
     ) -> str:
         if not self.alert_chain:
             # Fallback si no hay LLM configurado
@@ -116,6 +236,7 @@ class StockAlertService:
                 product_id,
                 current_stock,
                 supplier_price,
+                days_of_cover,
             )
 
         try:
@@ -125,12 +246,14 @@ class StockAlertService:
                 product_id=product_id,
             )
 
-            result = await self.alert_chain.ainvoke({
-                "product_name": product_name,
-                "product_id": product_id,
-                "current_stock": current_stock,
-                "supplier_price": f"{supplier_price:.2f}",
-            })
+            with span("llm", kind="client"):
+                result = await self.alert_chain.ainvoke({
+                    "product_name": product_name,
+                    "product_id": product_id,
+                    "current_stock": current_stock,
+                    "supplier_price": f"{supplier_price:.2f}",
+                    "sales_context": sales_context(velocity_per_day, days_of_cover),
+                })
 
             alert_message = result["text"].strip()
 
@@ -153,6 +276,7 @@ class StockAlertService:
                 product_id,
                 current_stock,
                 supplier_price,
+                days_of_cover,
             )
 
     def _generate_fallback_alert(
@@ -161,11 +285,16 @@ class StockAlertService:
         product_id: str,
         current_stock: int,
         supplier_price: float,
+        days_of_cover: Optional[float] = None,
     ) -> str:
+        cover = (
+            f" (alcanza para {days_of_cover:g} días al ritmo actual)"
+            if days_of_cover is not None else ""
+        )
         return (
             f"⚠️ ALERTA DE STOCK BAJO: El producto '{product_name}' "
             f"(ID: {product_id}) tiene solo {current_stock} unidades "
-            f"disponibles. Se recomienda reordenar inmediatamente. "
+            f"disponibles{cover}. Se recomienda reordenar inmediatamente. "
             f"Precio sugerido del proveedor: ${supplier_price:.2f}"
         )
 
@@ -174,37 +303,89 @@ class StockAlertService:
         product_name: str,
         product_id: str,
         current_stock: int,
+        velocity_per_day: Optional[float] = None,
+        days_of_cover: Optional[float] = None,
+        supplier_price: Optional[float] = None,
     ) -> tuple[str, float]:
         logger.info(
             "processing_stock_alert",
             product_id=product_id,
             product_name=product_name,
             current_stock=current_stock,
+            days_of_cover=days_of_cover,
         )
 
-        supplier_price = await self.fetch_supplier_price()
+        if supplier_price is None:
+            supplier_price = await self.fetch_supplier_price()
 
         alert_message = await self.generate_alert(
             product_name=product_name,
             product_id=product_id,
             current_stock=current_stock,
             supplier_price=supplier_price,
+            velocity_per_day=velocity_per_day,
+            days_of_cover=days_of_cover,
         )
 
+        # El texto completo queda en el almacén de alertas, no en los logs
         logger.info(
             "stock_alert_message",
             product_id=product_id,
-            alert=alert_message,
+            alert_chars=len(alert_message),
             supplier_price=supplier_price,
         )
 
-        print("\n" + "=" * 80)
-        print("📢 ALERTA DE STOCK BAJO")
-        print("=" * 80)
-        print(alert_message)
-        print("=" * 80 + "\n")
+        alert_writer.submit(
+            build_alert_record(
+                product_id=product_id,
+                product_name=product_name,
+                current_stock=current_stock,
+                supplier_price=supplier_price,
+                alert_text=alert_message,
+                velocity_per_day=velocity_per_day,
+                days_of_cover=days_of_cover,
+            )
+        )
 
         return alert_message, supplier_price
 
+    async def process_stock_digest(self, items: List[StockAlertWebhook]) -> int:
+        """Genera las alertas de un digest, como mucho
+        `ALERT_DIGEST_CONCURRENCY` a la vez; el precio del proveedor se
+        consulta una sola vez. Retorna cuántas fallaron."""
+        started = time.perf_counter()
+        supplier_price = await self.fetch_supplier_price()
+        semaphore = asyncio.Semaphore(ALERT_DIGEST_CONCURRENCY)
+
+        async def process(item: StockAlertWebhook) -> bool:
+            async with semaphore:
+                try:
+                    await self.process_stock_alert(
+                        product_name=item.product_name,
+                        product_id=item.product_id,
+                        current_stock=item.current_stock,
+                        velocity_per_day=item.velocity_per_day,
+                        days_of_cover=item.days_of_cover,
+                        supplier_price=supplier_price,
+                    )
+                    return True
+                except Exception as e:
+                    logger.error(
+                        "digest_item_error",
+                        product_id=item.product_id,
+                        error=str(e),
+                    )
+                    return False
+
+        results = await asyncio.gather(*(process(item) for item in items))
+        failed = results.count(False)
+        logger.info(
+            "stock_digest_processed",
+            items=len(items),
+            failed=failed,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        return failed
+
 
 alert_service = StockAlertService()
@@ -0,0 +1,224 @@
+import atexit
+import json
+import logging
+import random
+import sys
+import threading
+from queue import Empty, Full, Queue
+from typing import Dict, Optional
+
+import structlog
+
+# Campos que no se recortan: el nombre del evento y las trazas de excepción
+UNCAPPED_FIELDS = {"event", "exception"}
+
+_writer: Optional["LogWriter"] = None
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """`"product_sold=0.1,create_product_request=0.2"` -> {evento: fracción}."""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.strip().partition("=")
+        if name and rate:
+            rates[name] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def sample_events(rates: Dict[str, float]):
+    """Descarta una fracción de los eventos de éxito de alto volumen; los
+    que quedan llevan `sample_rate` para poder reconstruir el total.
+    Advertencias y errores nunca se muestrean."""
+
+    def processor(logger, method_name, event_dict):
+        rate = rates.get(event_dict.get("event"))
+        if rate is None or method_name not in ("debug", "info"):
+            return event_dict
+        if random.random() >= rate:
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = rate
+        return event_dict
+
+    return processor
+
+
+def cap_field_sizes(max_chars: int):
+    """Recorta los valores de texto largos (descripciones, respuestas de
+    APIs, mensajes de error) a `max_chars` caracteres."""
+
+    def processor(logger, method_name, event_dict):
+        for key, value in event_dict.items():
+            if isinstance(value, str) and len(value) > max_chars and key not in UNCAPPED_FIELDS:
+                event_dict[key] = f"{value[:max_chars]}…[+{len(value) - max_chars}]"
+        return event_dict
+
+    return processor
+
+
+class LogWriter:
+    """Hilo que escribe en stdout las líneas ya renderizadas. Toma todo lo
+    que haya en la cola y lo escribe de una vez, así una ráfaga de logs es
+    una sola escritura.
+
+    La cola tiene a lo sumo `maxsize` líneas (0 = sin límite): si stdout no
+    da abasto, las líneas nuevas se descartan en vez de acumular memoria o
+    bloquear el request. Los descartes se cuentan en `dropped` y se avisan
+    con un evento `log_events_dropped`."""
+
+    _STOP = None
+
+    def __init__(self, stream=sys.stdout, maxsize: int = 0):
+        self.queue: Queue = Queue(maxsize)
+        self.stream = stream
+        self.dropped = 0
+        self._reported = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, line: str) -> None:
+        if self._closed:
+            # Ya sin hilo (atexit): escribir directo
+            self.stream.write(line + "\n")
+            return
+        try:
+            self.queue.put_nowait(line)
+        except Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            lines = [self.queue.get()]
+            try:
+                while True:
+                    lines.append(self.queue.get_nowait())
+            except Empty:
+                pass
+            stop = self._STOP in lines
+            text = "\n".join(line for line in lines if line is not self._STOP)
+            if self.dropped > self._reported:
+                text += ("\n" if text else "") + self._dropped_line()
+            if text:
+                self.stream.write(text + "\n")
+                self.stream.flush()
+            if stop:
+                return
+
+    def _dropped_line(self) -> str:
+        dropped, self._reported = self.dropped - self._reported, self.dropped
+        return json.dumps({
+            "dropped": dropped,
+            "dropped_total": self.dropped,
+            "event": "log_events_dropped",
+            "level": "warning",
+        })
+
+    def flush(self) -> None:
+        """Escribe lo pendiente y detiene el hilo (al apagar el servicio o
+        al salir del proceso)."""
+        if self._thread.is_alive():
+            # Bloqueante: el hilo sigue vaciando la cola, así que hay lugar
+            self.queue.put(self._STOP)
+            self._thread.join()
+            self._closed = True
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "dropped": self.dropped,
+        }
+
+
+class QueueLogger:
+    """Logger de structlog que encola la línea JSON en vez de escribirla."""
+
+    def __init__(self, writer: LogWriter):
+        self._put = writer.put
+
+    def msg(self, message: str) -> None:
+        self._put(message)
+
+    debug = info = warning = warn = error = critical = exception = fatal = log = msg
+
+
+class QueueLoggerFactory:
+    def __init__(self, writer: LogWriter):
+        self._logger = QueueLogger(writer)
+
+    def __call__(self, *args) -> QueueLogger:
+        return self._logger
+
+
+class QueueLineHandler(logging.Handler):
+    """Handler de la librería estándar (uvicorn, SQLAlchemy, httpx) que
+    formatea el registro y lo encola en el mismo `LogWriter`."""
+
+    def __init__(self, writer: LogWriter):
+        super().__init__()
+        self._put = writer.put
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._put(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+def configure_logging(
+    level: str,
+    sample_rates: str = "",
+    max_field_chars: int = 512,
+    queue_size: int = 0,
+) -> None:
+    """Logs JSON de structlog y de la librería estándar por una cola de a lo
+    sumo `queue_size` líneas: el request sólo renderiza la línea y la
+    encola; un hilo aparte la escribe en stdout."""
+    global _writer
+    numeric_level = getattr(logging, level.upper(), logging.INFO)
+
+    # Datos de LogRecord que ningún formato usa
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    if _writer is None:
+        _writer = LogWriter(maxsize=queue_size)
+        # Escribir lo que quede en la cola al salir
+        atexit.register(_writer.flush)
+        handler = QueueLineHandler(_writer)
+        handler.setFormatter(logging.Formatter("%(levelname)s %(name)s %(message)s"))
+        logging.getLogger().handlers = [handler]
+    logging.getLogger().setLevel(numeric_level)
+    # Una línea por cada llamada HTTP saliente; los eventos propios ya la
+    # describen
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(max(numeric_level, logging.WARNING))
+
+    structlog.configure(
+        processors=[
+            structlog.processors.add_log_level,
+            sample_events(parse_sample_rates(sample_rates)),
+            structlog.processors.format_exc_info,
+            cap_field_sizes(max_field_chars),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.JSONRenderer(),
+        ],
+        # Los niveles filtrados se descartan antes de armar el evento
+        wrapper_class=structlog.make_filtering_bound_logger(numeric_level),
+        logger_factory=QueueLoggerFactory(_writer),
+        cache_logger_on_first_use=True,
+    )
+
+
+def flush_logs() -> None:
+    """Escribe los logs pendientes; se llama al apagar el servicio."""
+    if _writer is not None:
+        _writer.flush()
+
+
+def logging_stats() -> dict:
+    """Líneas en cola y descartadas por cola llena, para `/metrics`."""
+    return _writer.stats() if _writer is not None else {}
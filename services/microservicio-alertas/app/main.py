@@ -1,10 +1,16 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .alert_store import alert_writer
 from .config import ALLOWED_ORIGINS, PORT, logger
+from .health import health_monitor
+from .langchain_service import alert_service
+from .logging_setup import flush_logs
 from .routes import router
+from .tracing import TracingMiddleware
 
 
 @asynccontextmanager
@@ -14,8 +20,16 @@ async def lifespan(app: FastAPI):
         service="microservicio-alertas",
         port=PORT,
     )
+    await alert_writer.start()
+    # El LLM se inicializa en segundo plano para no retrasar el arranque.
+    warmup_task = asyncio.create_task(asyncio.to_thread(alert_service.warmup))
+    health_monitor.start()
     yield
+    await health_monitor.stop()
+    await warmup_task
+    await alert_writer.stop()
     logger.info("service_shutdown", service="microservicio-alertas")
+    flush_logs()
 
 
 app = FastAPI(
@@ -31,7 +45,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "traceparent"],
 )
+app.add_middleware(TracingMiddleware)
 
 app.include_router(router, prefix="", tags=["alertas"])
 
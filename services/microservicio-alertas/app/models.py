@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -8,6 +8,25 @@ class StockAlertWebhook(BaseModel):
     product_id: str = Field(..., description="ID del producto")
     product_name: str = Field(..., description="Nombre del producto")
     current_stock: int = Field(..., ge=0, description="Stock actual del producto")
+    velocity_per_day: Optional[float] = Field(
+        None, ge=0, description="Unidades vendidas por día (promedio móvil)"
+    )
+    days_of_cover: Optional[float] = Field(
+        None, ge=0, description="Días que dura el stock a esa velocidad"
+    )
+
+
+class StockDigestWebhook(BaseModel):
+    items: List[StockAlertWebhook] = Field(
+        ..., min_length=1, description="Productos que entraron en stock bajo"
+    )
+
+
+class StockDigestResponse(BaseModel):
+    success: bool
+    message: str
+    accepted: int
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
 class AlertResponse(BaseModel):
@@ -18,7 +37,20 @@ class AlertResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
+class AlertRecord(BaseModel):
+    id: str
+    product_id: str
+    product_name: str
+    current_stock: int
+    supplier_price: Optional[float] = None
+    velocity_per_day: Optional[float] = None
+    days_of_cover: Optional[float] = None
+    alert_text: str
+    created_at: datetime
+
+
 class HealthResponse(BaseModel):
     status: str
     service: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    dependencies: Dict[str, dict] = Field(default_factory=dict)
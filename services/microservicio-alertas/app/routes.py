@@ -1,8 +1,23 @@
-from fastapi import APIRouter, HTTPException, status
+import os
+from datetime import datetime
+from typing import List, Optional
 
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, status
+from fastapi.responses import JSONResponse
+
+from .alert_store import alert_writer
 from .config import logger
+from .health import health_monitor
 from .langchain_service import alert_service
-from .models import AlertResponse, HealthResponse, StockAlertWebhook
+from .logging_setup import logging_stats
+from .models import (
+    AlertRecord,
+    AlertResponse,
+    HealthResponse,
+    StockAlertWebhook,
+    StockDigestResponse,
+    StockDigestWebhook,
+)
 
 router = APIRouter()
 
@@ -10,11 +25,42 @@ router = APIRouter()
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     return HealthResponse(
-        status="healthy",
+        status=health_monitor.status,
         service="microservicio-alertas",
+        dependencies=health_monitor.snapshot(),
     )
 
 
+@router.get("/health/live")
+async def liveness():
+    """El proceso responde; no revisa dependencias."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Listo para recibir tráfico: el almacén de alertas respondió en la
+    última revisión en segundo plano."""
+    return JSONResponse(
+        status_code=200 if health_monitor.ready else 503,
+        content={
+            "status": "ready" if health_monitor.ready else "not_ready",
+            "dependencies": health_monitor.snapshot(),
+        },
+    )
+
+
+@router.get("/metrics")
+async def metrics():
+    """Contadores de este worker."""
+    return {
+        "service": "microservicio-alertas",
+        "worker_pid": os.getpid(),
+        "alert_writer": alert_writer.stats(),
+        "logging": logging_stats(),
+    }
+
+
 @router.post("/webhook/stock-alert", response_model=AlertResponse)
 async def stock_alert_webhook(webhook_data: StockAlertWebhook):
     try:
@@ -30,6 +76,8 @@ async def stock_alert_webhook(webhook_data: StockAlertWebhook):
             product_name=webhook_data.product_name,
             product_id=webhook_data.product_id,
             current_stock=webhook_data.current_stock,
+            velocity_per_day=webhook_data.velocity_per_day,
+            days_of_cover=webhook_data.days_of_cover,
         )
 
         return AlertResponse(
@@ -49,3 +97,37 @@ async def stock_alert_webhook(webhook_data: StockAlertWebhook):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error procesando alerta: {str(e)}",
         )
+
+
+@router.post(
+    "/webhook/stock-digest",
+    response_model=StockDigestResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def stock_digest_webhook(digest: StockDigestWebhook,
+                               background_tasks: BackgroundTasks):
+    """Digest del barrido de stock bajo de backend-principal: se acepta de
+    inmediato y las alertas se generan después de responder, con
+    concurrencia acotada."""
+    logger.info("stock_digest_received", items=len(digest.items))
+    background_tasks.add_task(alert_service.process_stock_digest, digest.items)
+    return StockDigestResponse(
+        success=True,
+        message="Digest aceptado, alertas en proceso",
+        accepted=len(digest.items),
+    )
+
+
+@router.get("/alerts", response_model=List[AlertRecord])
+async def list_alerts(
+    product_id: Optional[str] = Query(None, description="Filtrar por producto"),
+    since: Optional[datetime] = Query(None, description="Desde (inclusive)"),
+    until: Optional[datetime] = Query(None, description="Hasta (inclusive)"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    return await alert_writer.query(
+        product_id=product_id,
+        since=since,
+        until=until,
+        limit=limit,
+    )
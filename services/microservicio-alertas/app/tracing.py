@@ -0,0 +1,306 @@
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import httpx
+from starlette.datastructures import MutableHeaders
+
+from .config import (
+    TRACE_EXPORTER,
+    TRACE_FILE_PATH,
+    TRACE_OTLP_ENDPOINT,
+    logger,
+)
+
+SERVICE_NAME = "microservicio-alertas"
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span_id: ContextVar[Optional[str]] = ContextVar("current_span_id", default=None)
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple[str, str]]:
+    if not header:
+        return None
+    match = TRACEPARENT_RE.match(header.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Optional[dict] = None, kind: str = "internal"):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def end(self, end_perf: Optional[float] = None) -> None:
+        self.duration_ms = ((end_perf or time.perf_counter()) - self._start_perf) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "service": SERVICE_NAME,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """Spans de un request en este servicio. Los spans que terminan después
+    de exportar el trace (p. ej. tareas en segundo plano) se exportan solos."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: list[Span] = []
+        self.exported = False
+
+    def add(self, span: Span) -> None:
+        if self.exported:
+            exporter().export([span])
+        else:
+            self.spans.append(span)
+
+    def server_timing(self, root: Span) -> str:
+        totals: dict[str, list] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, [0.0, 0])
+            entry[0] += span.duration_ms or 0.0
+            entry[1] += 1
+
+        metrics = [
+            f'{name};dur={duration:.1f};desc="{count}x"'
+            for name, (duration, count) in totals.items()
+        ]
+        metrics.append(f"total;dur={(time.perf_counter() - root._start_perf) * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def finish(self, root: Span) -> None:
+        self.exported = True
+        exporter().export([root, *self.spans])
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    current = Span(name, trace.trace_id, _current_span_id.get(), attributes, kind)
+    token = _current_span_id.set(current.span_id)
+    try:
+        yield current
+    except Exception as e:
+        current.attributes["error"] = str(e)
+        raise
+    finally:
+        _current_span_id.reset(token)
+        current.end()
+        trace.add(current)
+
+
+def record_span(name: str, start_perf: float, end_perf: float, **attributes) -> None:
+    """Registra un span ya medido (p. ej. desde eventos de SQLAlchemy)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+
+    recorded = Span(name, trace.trace_id, _current_span_id.get(), attributes)
+    recorded.start_time = time.time() - (time.perf_counter() - start_perf)
+    recorded._start_perf = start_perf
+    recorded.end(end_perf)
+    trace.add(recorded)
+
+
+def traceparent_headers() -> dict:
+    trace = _current_trace.get()
+    span_id = _current_span_id.get()
+    if trace is None or span_id is None:
+        return {}
+    return {"traceparent": f"00-{trace.trace_id}-{span_id}-01"}
+
+
+class SpanExporter:
+    """Exporta spans desde un hilo aparte para no hacer I/O en el request."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        if self.kind == "none" or not spans:
+            return
+        self._queue.put([s.to_dict() for s in spans])
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run,
+                        name="span-exporter",
+                        daemon=True,
+                    )
+                    self._thread.start()
+
+    def _drain(self, first: list) -> list:
+        batch = list(first)
+        while len(batch) < 512:
+            try:
+                batch.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        client = httpx.Client(timeout=5) if self.kind == "otlp" else None
+        while True:
+            batch = self._drain(self._queue.get())
+            try:
+                if self.kind == "file":
+                    self._write_file(batch)
+                elif self.kind == "otlp":
+                    client.post(
+                        f"{TRACE_OTLP_ENDPOINT.rstrip('/')}/v1/traces",
+                        json=to_otlp(batch),
+                    )
+            except Exception as e:
+                logger.warning("trace_export_error", exporter=self.kind, error=str(e))
+
+    def _write_file(self, batch: list) -> None:
+        directory = os.path.dirname(TRACE_FILE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(TRACE_FILE_PATH, "a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(s, default=str) + "\n" for s in batch))
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+OTLP_SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def to_otlp(spans: list[dict]) -> dict:
+    """Convierte spans al formato OTLP/HTTP JSON."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "gestor-ia.tracing"},
+                "spans": [{
+                    "traceId": s["trace_id"],
+                    "spanId": s["span_id"],
+                    "parentSpanId": s["parent_id"] or "",
+                    "name": s["name"],
+                    "kind": OTLP_SPAN_KINDS.get(s["kind"], 1),
+                    "startTimeUnixNano": str(int(s["start_time"] * 1e9)),
+                    "endTimeUnixNano": str(int((s["start_time"] + s["duration_ms"] / 1000) * 1e9)),
+                    "attributes": [
+                        {"key": key, "value": _otlp_value(value)}
+                        for key, value in s["attributes"].items()
+                    ],
+                } for s in spans],
+            }],
+        }],
+    }
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def exporter() -> SpanExporter:
+    global _exporter
+    if _exporter is None:
+        _exporter = SpanExporter(TRACE_EXPORTER)
+    return _exporter
+
+
+class TracingMiddleware:
+    """Middleware ASGI: continúa el trace del header `traceparent` (W3C) o
+    inicia uno nuevo, y agrega `Server-Timing` con el tiempo por etapa."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        raw_parent = headers.get(b"traceparent")
+        parent = parse_traceparent(raw_parent.decode("latin-1") if raw_parent else None)
+
+        trace = Trace(parent[0] if parent else new_trace_id())
+        root = Span(
+            f"{scope['method']} {scope['path']}",
+            trace.trace_id,
+            parent[1] if parent else None,
+            kind="server",
+        )
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span_id.set(root.span_id)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append("Server-Timing", trace.server_timing(root))
+                response_headers.append("traceparent", f"00-{trace.trace_id}-{root.span_id}-01")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # Nombre por plantilla de ruta para no crear un span por cada id
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                root.name = f"{scope['method']} {route.path}"
+            root.end()
+            trace.finish(root)
+            _current_span_id.reset(span_token)
+            _current_trace.reset(trace_token)
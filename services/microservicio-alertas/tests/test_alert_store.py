@@ -0,0 +1,26 @@
+import asyncio
+
+from app.alert_store import AlertSink, BufferedAlertWriter
+
+
+class DownSink(AlertSink):
+    def write_batch(self, records):
+        raise OSError("disco lleno")
+
+    def query(self, product_id=None, since=None, until=None, limit=100):
+        return []
+
+
+def test_buffer_is_capped_while_sink_is_down():
+    async def run():
+        writer = BufferedAlertWriter(batch_size=10, flush_interval=60, max_buffered=25)
+        writer.sink = DownSink()
+        for index in range(40):
+            writer.submit({"id": index})
+            await writer.flush()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.stats() == {"pending": 25, "max_buffered": 25, "dropped": 15}
+    # Se conservan las más recientes
+    assert writer._buffer[-1] == {"id": 39}
@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+
+from app.fake_llm import FakeChatModel
+
+MESSAGES = [HumanMessage(content="Alerta: Audífonos, stock 3")]
+
+
+def test_stream_matches_invoke_and_reports_usage():
+    model = FakeChatModel(output_words=25)
+    message = model.invoke(MESSAGES)
+    chunks = list(model.stream(MESSAGES))
+
+    assert "".join(chunk.content for chunk in chunks) == message.content
+    assert len(message.content.split()) == 25
+    assert chunks[-1].usage_metadata["output_tokens"] == message.usage_metadata["output_tokens"]
+
+
+def test_output_words_zero_keeps_the_phrase():
+    content = FakeChatModel().invoke(MESSAGES).content
+    assert content.startswith("⚠️ Stock bajo detectado")
+    assert len(content.split()) < 25
+
+
+def test_async_stream_does_not_block_the_loop():
+    model = FakeChatModel(latency_ms=200)
+
+    async def consume():
+        return [chunk async for chunk in model.astream(MESSAGES)]
+
+    async def both():
+        started = time.perf_counter()
+        results = await asyncio.gather(consume(), consume())
+        return results, time.perf_counter() - started
+
+    (first, second), elapsed = asyncio.run(both())
+    assert first and len(first) == len(second)
+    assert elapsed < 0.35
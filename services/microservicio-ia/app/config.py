@@ -1,23 +1,59 @@
-import logging
 import os
 
 import structlog
+from logging_setup import configure_logging
 
-structlog.configure(
-    processors=[
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.JSONRenderer()
-    ]
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
+# Fracción de eventos de éxito de alto volumen que se escriben
+# ("evento=fracción,..."); advertencias y errores se escriben siempre
+LOG_SAMPLE_RATES = os.getenv(
+    "LOG_SAMPLE_RATES",
+    "generate_description_request=0.1,generate_description_success=0.1,"
+    "generate_category_request=0.1,generate_category_success=0.1"
 )
+# Largo máximo de cada campo de texto en los logs
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", 512))
+# Líneas de log en cola como máximo; con la cola llena se descartan
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+configure_logging(LOG_LEVEL, LOG_SAMPLE_RATES, LOG_MAX_FIELD_CHARS, LOG_QUEUE_SIZE)
 
 logger = structlog.get_logger()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-mini-2025-08-07")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# auto: OpenAI si hay OPENAI_API_KEY, si no Gemini; fake: proveedor local
+# determinista para pruebas de carga sin costo
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "auto").lower()
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 0))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", 0))
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", 0))
+FAKE_LLM_OUTPUT_WORDS = int(os.getenv("FAKE_LLM_OUTPUT_WORDS", 60))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", 42))
 PORT = int(os.getenv("PORT", 8001))
-LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
 TIMEOUT_LLM = int(os.getenv("TIMEOUT_LLM", 30))
+# Presupuesto de tokens de salida visibles por endpoint: una descripción de
+# 50-100 palabras y una ruta de categoría corta.
+DESCRIPTION_MAX_TOKENS = int(os.getenv("DESCRIPTION_MAX_TOKENS", 300))
+CATEGORY_MAX_TOKENS = int(os.getenv("CATEGORY_MAX_TOKENS", 40))
+# Con modelos de razonamiento (gpt-5, o1/o3/o4, Gemini 2.5) los tokens de
+# razonamiento cuentan contra el mismo límite: se suma este margen
+REASONING_HEADROOM_TOKENS = int(os.getenv("REASONING_HEADROOM_TOKENS", 2048))
+# Estado compartido entre workers (health, caché de generaciones):
+# sqlite:///ruta (por defecto en /dev/shm) o redis://host:puerto/db
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+# Respuestas generadas que se reusan ante el mismo prompt, en segundos
+# (0 = sin caché). Desactivado por defecto: con temperatura 0.7 cada
+# generación es distinta y la caché repite la misma durante el TTL
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", 0))
+# Revisión de dependencias en segundo plano (GET /health, /health/ready); el
+# proveedor LLM se consulta cada HEALTH_LLM_PROBE_INTERVAL segundos
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 10))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", 5))
+HEALTH_LLM_PROBE_INTERVAL = float(os.getenv("HEALTH_LLM_PROBE_INTERVAL", 60))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "data/traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318")
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:8000").split(",")
-
-logging.basicConfig(level=getattr(logging, LOG_LEVEL))
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+CATEGORIES = [
+    "Electrónica > Audio > Audífonos",
+    "Ropa > Hombre > Camisetas",
+    "Hogar > Cocina > Utensilios",
+    "Deportes > Fitness > Accesorios",
+    "Salud y Belleza > Cuidado Personal > Cremas",
+    "Juguetes > Educativos > Bloques",
+    "Libros > Ficción > Novelas",
+    "Mascotas > Perros > Accesorios",
+]
+
+WORDS = (
+    "calidad diseño duradero cómodo práctico moderno ideal resistente ligero "
+    "elegante versátil confiable innovador eficiente premium funcional"
+).split()
+
+
+class FakeLLMError(Exception):
+    pass
+
+
+def fake_completion(prompt: str, output_words: int) -> str:
+    digest = hashlib.sha256(prompt.encode()).digest()
+    if "categor" in prompt.lower() and ">" in prompt:
+        return CATEGORIES[digest[0] % len(CATEGORIES)]
+
+    rng = random.Random(digest)
+    words = [rng.choice(WORDS) for _ in range(output_words)]
+    return " ".join(words).capitalize() + "."
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text.split()) * 1.3))
+
+
+class _FakeCompletions:
+    def __init__(self, client: "FakeChatClient"):
+        self._client = client
+
+    def create(self, model: str, messages: list,
+               max_tokens: int | None = None, stream: bool = False,
+               stream_options: dict | None = None, **kwargs):
+        if stream:
+            return self._client.stream(model, messages, max_tokens, stream_options)
+        return self._client.complete(model, messages, max_tokens)
+
+
+class _AsyncFakeCompletions(_FakeCompletions):
+    async def create(self, model: str, messages: list,
+                     max_tokens: int | None = None, stream: bool = False,
+                     stream_options: dict | None = None, **kwargs):
+        if stream:
+            return self._client.astream(model, messages, max_tokens, stream_options)
+        return await self._client.acomplete(model, messages, max_tokens)
+
+
+class FakeChatClient:
+    """Cliente con la misma interfaz que `openai.OpenAI` para
+    `chat.completions.create` (con y sin `stream=True`), con respuestas
+    deterministas por prompt.
+
+    La latencia se simula con `time.sleep`, igual que una llamada bloqueante
+    del SDK real, para que las pruebas de carga recorran la misma ruta.
+    `AsyncFakeChatClient` imita `openai.AsyncOpenAI` y espera con
+    `asyncio.sleep`."""
+
+    _completions = _FakeCompletions
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        output_words: int = 60,
+        seed: int = 42,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.output_words = output_words
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=self._completions(self))
+
+    def _draw(self) -> tuple[float, bool]:
+        with self._rng_lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self._rng.random() < self.failure_rate
+        return max(0.0, self.latency_ms + jitter) / 1000, failed
+
+    def _respond(self, messages: list, max_tokens: int | None):
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        content = fake_completion(prompt, self.output_words)
+        finish_reason = "stop"
+        if max_tokens and estimate_tokens(content) > max_tokens:
+            # Igual que el proveedor real: la respuesta se corta en el límite
+            content = " ".join(content.split()[:max(1, int(max_tokens / 1.3))])
+            finish_reason = "length"
+        usage = SimpleNamespace(
+            prompt_tokens=estimate_tokens(prompt),
+            completion_tokens=estimate_tokens(content),
+        )
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+        return content, finish_reason, usage
+
+    def _completion(self, model: str, content: str, finish_reason: str, usage):
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(
+                index=0,
+                message=SimpleNamespace(role="assistant", content=content),
+                finish_reason=finish_reason,
+            )],
+            usage=usage,
+        )
+
+    def _chunks(self, model: str, content: str, finish_reason: str, usage,
+                stream_options: dict | None) -> list:
+        words = content.split(" ")
+        chunks = [
+            SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(
+                    index=0,
+                    delta=SimpleNamespace(content=word if index == 0 else " " + word),
+                    finish_reason=finish_reason if index == len(words) - 1 else None,
+                )],
+                usage=None,
+            )
+            for index, word in enumerate(words)
+        ]
+        if stream_options and stream_options.get("include_usage"):
+            # Como la API real: un último chunk sin choices con el uso
+            chunks.append(SimpleNamespace(model=model, choices=[], usage=usage))
+        return chunks
+
+    def complete(self, model: str, messages: list,
+                 max_tokens: int | None = None):
+        delay, failed = self._draw()
+        content, finish_reason, usage = self._respond(messages, max_tokens)
+        time.sleep(delay)
+        if failed:
+            raise FakeLLMError("Fallo simulado del proveedor fake")
+        return self._completion(model, content, finish_reason, usage)
+
+    def stream(self, model: str, messages: list, max_tokens: int | None = None,
+               stream_options: dict | None = None):
+        delay, failed = self._draw()
+        chunks = self._chunks(model, *self._respond(messages, max_tokens), stream_options)
+        for index, chunk in enumerate(chunks):
+            time.sleep(delay / len(chunks))
+            if failed and index == len(chunks) // 2:
+                raise FakeLLMError("Fallo simulado del proveedor fake durante streaming")
+            yield chunk
+
+
+class AsyncFakeChatClient(FakeChatClient):
+    """Como `FakeChatClient`, con la interfaz de `openai.AsyncOpenAI`."""
+
+    _completions = _AsyncFakeCompletions
+
+    async def acomplete(self, model: str, messages: list,
+                        max_tokens: int | None = None):
+        delay, failed = self._draw()
+        content, finish_reason, usage = self._respond(messages, max_tokens)
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeLLMError("Fallo simulado del proveedor fake")
+        return self._completion(model, content, finish_reason, usage)
+
+    async def astream(self, model: str, messages: list, max_tokens: int | None = None,
+                      stream_options: dict | None = None):
+        delay, failed = self._draw()
+        chunks = self._chunks(model, *self._respond(messages, max_tokens), stream_options)
+        for index, chunk in enumerate(chunks):
+            await asyncio.sleep(delay / len(chunks))
+            if failed and index == len(chunks) // 2:
+                raise FakeLLMError("Fallo simulado del proveedor fake durante streaming")
+            yield chunk
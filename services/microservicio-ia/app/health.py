@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import (HEALTH_LLM_PROBE_INTERVAL, HEALTH_PROBE_INTERVAL,
+                    HEALTH_PROBE_TIMEOUT, logger)
+from llm_service import llm_service
+from shared_state import shared_state
+
+
+class Probe:
+    def __init__(self, name: str, check: Callable[[], Awaitable[None]],
+                 critical: bool, interval: float, shared: bool):
+        self.name = name
+        self.check = check
+        self.critical = critical
+        self.interval = interval
+        self.shared = shared
+        self.result: dict = {"status": "unknown", "critical": critical}
+
+
+class HealthMonitor:
+    """Revisa las dependencias en segundo plano cada `interval` segundos y
+    guarda el último resultado; los endpoints de health sólo leen ese
+    resultado, sin tocar la base de datos ni la red.
+
+    Una dependencia `critical` caída deja el servicio no listo (`/health/ready`
+    responde 503); las demás sólo lo marcan `degraded`.
+
+    Con varios workers, las dependencias externas (`shared=True`) las revisa
+    en cada intervalo sólo el que toma el turno en el estado compartido; el
+    resto usa su resultado. Los recursos de cada proceso (pool de conexiones,
+    almacén local) los revisa cada worker: un pool agotado en un worker no se
+    ve desde otro."""
+
+    def __init__(self):
+        self.probes: List[Probe] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, check: Callable[[], Awaitable[None]],
+                 critical: bool = True,
+                 interval: float = HEALTH_PROBE_INTERVAL,
+                 shared: bool = False) -> None:
+        self.probes.append(Probe(name, check, critical, interval, shared))
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run(probe)) for probe in self.probes]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, probe: Probe) -> None:
+        while True:
+            await self.refresh(probe)
+            await asyncio.sleep(probe.interval)
+
+    async def refresh(self, probe: Probe) -> None:
+        if not probe.shared:
+            await self.check(probe)
+            return
+        key = f"health:{probe.name}"
+        try:
+            turn = await asyncio.to_thread(
+                shared_state.set, f"{key}:lease", str(os.getpid()), probe.interval, True
+            )
+            cached = None if turn else await asyncio.to_thread(shared_state.get, key)
+        except Exception as e:
+            logger.warning("shared_state_error", error=str(e))
+            turn, cached = True, None
+
+        if cached is not None:
+            self._update(probe, json.loads(cached))
+            return
+        # Sin resultado compartido todavía (arranque): se revisa localmente
+        await self.check(probe)
+        if turn:
+            try:
+                await asyncio.to_thread(
+                    shared_state.set, key, json.dumps(probe.result), probe.interval * 3
+                )
+            except Exception as e:
+                logger.warning("shared_state_error", error=str(e))
+
+    async def check(self, probe: Probe) -> None:
+        start = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            await asyncio.wait_for(probe.check(), HEALTH_PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            error = f"Sin respuesta en {HEALTH_PROBE_TIMEOUT}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        result = {
+            "status": "fail" if error else "ok",
+            "critical": probe.critical,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if error:
+            result["error"] = error
+        self._update(probe, result)
+
+    def _update(self, probe: Probe, result: dict) -> None:
+        if result["status"] != probe.result["status"]:
+            log = logger.warning if result.get("error") else logger.info
+            log("dependency_health_changed", dependency=probe.name,
+                status=result["status"], error=result.get("error"))
+        probe.result = result
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {probe.name: probe.result for probe in self.probes}
+
+    @property
+    def ready(self) -> bool:
+        return all(p.result["status"] == "ok" for p in self.probes if p.critical)
+
+    @property
+    def status(self) -> str:
+        if not self.ready:
+            return "unhealthy"
+        if any(p.result["status"] != "ok" for p in self.probes):
+            return "degraded"
+        return "healthy"
+
+
+async def check_llm() -> None:
+    await asyncio.to_thread(llm_service.check)
+
+
+async def check_shared_state() -> None:
+    await asyncio.to_thread(shared_state.ping)
+
+
+health_monitor = HealthMonitor()
+# El proveedor se consulta con menos frecuencia: es una llamada externa. Sin
+# proveedor configurado el servicio queda listo igual (las generaciones
+# responden 503 y el backend usa sus valores de respaldo); si no, el
+# contenedor nunca pasa su healthcheck y bloquea a los que dependen de él
+health_monitor.register(
+    "llm",
+    check_llm,
+    critical=llm_service.is_configured(),
+    interval=HEALTH_LLM_PROBE_INTERVAL,
+    shared=True,
+)
+# Cada worker tiene su propia conexión al estado compartido
+health_monitor.register("shared_state", check_shared_state, critical=False)
@@ -1,70 +1,294 @@
-from config import (GOOGLE_API_KEY, OPENAI_API_KEY, OPENAI_MODEL, TIMEOUT_LLM,
+import hashlib
+import json
+import threading
+
+from config import (FAKE_LLM_FAILURE_RATE, FAKE_LLM_JITTER_MS,
+                    FAKE_LLM_LATENCY_MS, FAKE_LLM_OUTPUT_WORDS, FAKE_LLM_SEED,
+                    GENERATION_CACHE_TTL, GOOGLE_API_KEY, LLM_PROVIDER,
+                    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL, TIMEOUT_LLM,
                     logger)
 from fastapi import HTTPException, status
-from openai import OpenAI
+from prompts import PromptTemplate, is_reasoning_model
+from shared_state import shared_state
+from tracing import span
+
+GEMINI_MODEL = "gemini-flash-latest"
+# Reintento de una respuesta truncada que no puede devolverse a medias
+TRUNCATION_RETRY_FACTOR = 4
+
+
+def resolve_provider() -> str | None:
+    if LLM_PROVIDER == "fake":
+        return "fake"
+    if LLM_PROVIDER == "openai":
+        return "openai" if OPENAI_API_KEY else None
+    # Mismos valores que microservicio-alertas: "google" y "gemini"
+    if LLM_PROVIDER in ("google", "gemini"):
+        return "gemini" if GOOGLE_API_KEY else None
+    if OPENAI_API_KEY:
+        return "openai"
+    if GOOGLE_API_KEY:
+        return "gemini"
+    return None
+
+
+class TokenUsage:
+    """Tokens acumulados por template. `cached_tokens` es la parte del prompt
+    que el proveedor sirvió desde su caché de prefijos; `truncated` cuenta
+    las respuestas cortadas por el presupuesto de salida."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates: dict[str, dict] = {}
+
+    def record(self, template: str, prompt_tokens: int, cached_tokens: int,
+               completion_tokens: int, truncated: bool) -> None:
+        if truncated:
+            logger.warning("llm_output_truncated", template=template,
+                           completion_tokens=completion_tokens)
+        with self._lock:
+            totals = self._templates.setdefault(template, {
+                "requests": 0,
+                "prompt_tokens": 0,
+                "cached_tokens": 0,
+                "completion_tokens": 0,
+                "truncated": 0,
+            })
+            totals["requests"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["truncated"] += int(truncated)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    **totals,
+                    "cached_ratio": round(
+                        totals["cached_tokens"] / totals["prompt_tokens"]
+                        if totals["prompt_tokens"] else 0.0, 3
+                    ),
+                }
+                for name, totals in self._templates.items()
+            }
 
 
 class LLMService:
     def __init__(self):
-        self.use_gemini = bool(GOOGLE_API_KEY and not OPENAI_API_KEY)
-        self.client = self._initialize_client()
-        self.model = OPENAI_MODEL
+        self.provider = resolve_provider()
+        self.use_gemini = self.provider == "gemini"
+        self.model = "fake" if self.provider == "fake" else OPENAI_MODEL
+        # El SDK del proveedor se importa y crea en el primer uso (o en
+        # `warmup()` durante el arranque), no al importar el módulo.
+        self._client = None
+        self._init_lock = threading.Lock()
+        self.usage = TokenUsage()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        if not self.is_configured():
+            logger.warning("llm_not_configured")
+
+    @property
+    def client(self):
+        if self._client is None and self.is_configured():
+            with self._init_lock:
+                if self._client is None:
+                    self._client = self._initialize_client()
+        return self._client
+
+    def warmup(self) -> None:
+        try:
+            self.client
+        except Exception as e:
+            logger.error("llm_initialization_error", error=str(e))
 
     def _initialize_client(self):
+        if self.provider == "fake":
+            from fake_llm import FakeChatClient
+
+            logger.info(
+                "llm_configured",
+                provider="fake",
+                latency_ms=FAKE_LLM_LATENCY_MS,
+                failure_rate=FAKE_LLM_FAILURE_RATE
+            )
+            return FakeChatClient(
+                latency_ms=FAKE_LLM_LATENCY_MS,
+                jitter_ms=FAKE_LLM_JITTER_MS,
+                failure_rate=FAKE_LLM_FAILURE_RATE,
+                output_words=FAKE_LLM_OUTPUT_WORDS,
+                seed=FAKE_LLM_SEED
+            )
         if self.use_gemini:
             import google.generativeai as genai
             genai.configure(api_key=GOOGLE_API_KEY)
-            client = genai.GenerativeModel('gemini-flash-latest')
+            client = genai.GenerativeModel(GEMINI_MODEL)
             logger.info("llm_configured", provider="gemini")
             return client
-        elif OPENAI_API_KEY:
-            logger.info("llm_configured", provider="openai")
-            return OpenAI(api_key=OPENAI_API_KEY, timeout=TIMEOUT_LLM)
+        from openai import OpenAI
 
-        logger.warning("llm_not_configured")
-        return None
+        logger.info("llm_configured", provider="openai")
+        return OpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            timeout=TIMEOUT_LLM
+        )
 
-    def generate(self, prompt: str, system_message: str = None) -> tuple[str, int]:
+    def generate(self, template: PromptTemplate, **fields) -> tuple[str, int]:
         if not self.client:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="LLM API key not configured"
             )
 
+        key = self._cache_key(template, fields)
+        cached = self._cache_get(key)
+        if cached is not None:
+            # Ya generado (por este u otro worker): no consume tokens
+            return cached, 0
+
+        content, tokens, truncated = self._call(template, fields, template.max_output_tokens)
+        if truncated and not template.allow_truncated:
+            # Una vez con más presupuesto; si vuelve cortada no se devuelve
+            budget = template.max_output_tokens * TRUNCATION_RETRY_FACTOR
+            content, retry_tokens, truncated = self._call(template, fields, budget)
+            tokens += retry_tokens
+            if truncated:
+                logger.error("llm_output_truncated_after_retry",
+                             template=template.name, budget=budget)
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail="Respuesta del LLM truncada por el límite de tokens"
+                )
+
+        if not truncated:
+            self._cache_set(key, content)
+        return content, tokens
+
+    def _call(self, template: PromptTemplate, fields: dict,
+              budget: int) -> tuple[str, int, bool]:
         try:
-            if self.use_gemini:
-                return self._generate_gemini(prompt)
-            return self._generate_openai(prompt, system_message)
+            with span("llm", kind="client", provider=self.provider, template=template.name):
+                if self.use_gemini:
+                    return self._generate_gemini(template, fields, budget)
+                return self._generate_openai(template, fields, budget)
         except Exception as e:
-            logger.error("llm_error", error=str(e), provider="gemini" if self.use_gemini else "openai")
+            logger.error("llm_error", error=str(e), provider=self.provider)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error en LLM API: {str(e)}"
             )
 
-    def _generate_gemini(self, prompt: str) -> tuple[str, int]:
-        response = self.client.generate_content(prompt)
+    def token_limit(self, template: PromptTemplate) -> int:
+        model = GEMINI_MODEL if self.use_gemini else self.model
+        return template.token_limit(model)
+
+    def _cache_key(self, template: PromptTemplate, fields: dict) -> str:
+        payload = json.dumps([self.model, template.messages(**fields)], sort_keys=True)
+        return f"generation:{template.name}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def _cache_get(self, key: str) -> str | None:
+        if not GENERATION_CACHE_TTL:
+            return None
+        try:
+            content = shared_state.get(key)
+        except Exception as e:
+            logger.warning("shared_state_error", error=str(e))
+            return None
+        if content is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return content
+
+    def _cache_set(self, key: str, content: str) -> None:
+        if not GENERATION_CACHE_TTL:
+            return
+        try:
+            shared_state.set(key, content, ex=GENERATION_CACHE_TTL)
+        except Exception as e:
+            logger.warning("shared_state_error", error=str(e))
+
+    def cache_stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "ttl_seconds": GENERATION_CACHE_TTL,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _generate_gemini(self, template: PromptTemplate, fields: dict,
+                         budget: int) -> tuple[str, int, bool]:
+        response = self.client.generate_content(
+            template.text(**fields),
+            generation_config={
+                "max_output_tokens": template.token_limit(GEMINI_MODEL, budget)
+            }
+        )
         content = response.text
-        tokens = len(content.split()) * 2
-        return content, tokens
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is None:
+            tokens = len(content.split()) * 2
+            self.usage.record(template.name, 0, 0, tokens, truncated=False)
+            return content, tokens, False
 
-    def _generate_openai(self, prompt: str, system_message: str) -> tuple[str, int]:
-        messages = [{"role": "user", "content": prompt}]
-        if system_message:
-            messages.insert(0, {"role": "system", "content": system_message})
+        candidate = response.candidates[0] if response.candidates else None
+        finish_reason = getattr(getattr(candidate, "finish_reason", None), "name", "")
+        truncated = finish_reason == "MAX_TOKENS"
+        self.usage.record(
+            template.name,
+            metadata.prompt_token_count,
+            getattr(metadata, "cached_content_token_count", 0) or 0,
+            metadata.candidates_token_count,
+            truncated=truncated
+        )
+        return content, metadata.total_token_count, truncated
 
+    def _generate_openai(self, template: PromptTemplate, fields: dict,
+                         budget: int) -> tuple[str, int, bool]:
+        limit = template.token_limit(self.model, budget)
+        if is_reasoning_model(self.model):
+            # Los modelos de razonamiento no aceptan `max_tokens` ni otra
+            # temperatura que la por defecto
+            options = {"max_completion_tokens": limit}
+        else:
+            options = {"temperature": 0.7, "max_tokens": limit}
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
+            messages=template.messages(**fields),
+            **options
         )
-        content = response.choices[0].message.content
-        tokens = response.usage.total_tokens
-        return content, tokens
+        choice = response.choices[0]
+        usage = response.usage
+        # `prompt_tokens_details` sólo viene en modelos con caché de prefijos
+        details = getattr(usage, "prompt_tokens_details", None)
+        truncated = choice.finish_reason == "length"
+        self.usage.record(
+            template.name,
+            usage.prompt_tokens,
+            getattr(details, "cached_tokens", 0) or 0,
+            usage.completion_tokens,
+            truncated=truncated
+        )
+        return choice.message.content, usage.total_tokens, truncated
+
+    def check(self) -> None:
+        """Verifica que el proveedor responda consultando el modelo, sin
+        generar tokens."""
+        if not self.client:
+            raise RuntimeError("LLM API key not configured")
+        if self.provider == "fake":
+            return
+        if self.use_gemini:
+            import google.generativeai as genai
+            genai.get_model(f"models/{GEMINI_MODEL}")
+            return
+        self.client.models.retrieve(self.model)
 
     def is_configured(self) -> bool:
-        return self.client is not None
+        return self.provider is not None
 
 
 llm_service = LLMService()
@@ -1,8 +1,13 @@
-from config import ALLOWED_ORIGINS, LOG_LEVEL, OPENAI_MODEL, PORT, logger
+import asyncio
+
+from config import ALLOWED_ORIGINS, LOG_LEVEL, PORT, logger
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from health import health_monitor
 from llm_service import llm_service
+from logging_setup import flush_logs
 from routes import router
+from tracing import TracingMiddleware
 
 app = FastAPI(
     title="Microservicio IA",
@@ -18,7 +23,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "traceparent"],
 )
+app.add_middleware(TracingMiddleware)
 
 app.include_router(router)
 
@@ -39,14 +46,19 @@ async def startup_event():
         "service_starting",
         service="microservicio-ia",
         port=PORT,
-        model=OPENAI_MODEL,
+        model=llm_service.model,
         llm_configured=llm_service.is_configured()
     )
+    # Importar el SDK del proveedor en segundo plano acelera el arranque
+    asyncio.get_running_loop().run_in_executor(None, llm_service.warmup)
+    health_monitor.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await health_monitor.stop()
     logger.info("service_shutdown", service="microservicio-ia")
+    flush_logs()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 from pydantic import BaseModel, Field, validator
 
@@ -40,3 +40,4 @@ class HealthResponse(BaseModel):
     timestamp: str
     llm_configured: bool
     model: str
+    dependencies: Dict[str, dict] = {}
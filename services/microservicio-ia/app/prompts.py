@@ -1,9 +1,53 @@
-def build_description_prompt(product_name: str, keywords: list[str]) -> str:
-    keywords_str = ", ".join(keywords)
-    return f"""Eres un copywriter experto en e-commerce. Genera una descripción atractiva y persuasiva para el siguiente producto:
+from dataclasses import dataclass
+from typing import Callable
 
-Nombre del Producto: {product_name}
-Características Clave: {keywords_str}
+from config import (CATEGORY_MAX_TOKENS, DESCRIPTION_MAX_TOKENS,
+                    REASONING_HEADROOM_TOKENS)
+
+REASONING_MODEL_PREFIXES = ("gpt-5", "o1", "o3", "o4", "gemini-2.5",
+                            "gemini-flash-latest", "gemini-pro-latest")
+
+
+def is_reasoning_model(model: str) -> bool:
+    return model.lower().startswith(REASONING_MODEL_PREFIXES)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Prompt separado en un prefijo estático y los campos del producto.
+
+    Las instrucciones van primero y son idénticas en cada request, así el
+    proveedor puede reusar el prefijo en caché; los campos variables van al
+    final, en el mensaje del usuario. `max_output_tokens` es el presupuesto
+    de salida visible del endpoint; con `allow_truncated=False` una respuesta
+    cortada por el límite no se devuelve."""
+
+    name: str
+    instructions: str
+    render: Callable[..., str]
+    max_output_tokens: int
+    allow_truncated: bool = True
+
+    def token_limit(self, model: str, budget: int | None = None) -> int:
+        """Límite a enviar al proveedor: el presupuesto visible más el margen
+        de razonamiento si el modelo razona."""
+        budget = budget or self.max_output_tokens
+        if is_reasoning_model(model):
+            return budget + REASONING_HEADROOM_TOKENS
+        return budget
+
+    def messages(self, **fields) -> list[dict]:
+        return [
+            {"role": "system", "content": self.instructions},
+            {"role": "user", "content": self.render(**fields)},
+        ]
+
+    def text(self, **fields) -> str:
+        # Para proveedores sin mensajes separados: mismo orden, prefijo primero
+        return f"{self.instructions}\n\n{self.render(**fields)}"
+
+
+DESCRIPTION_INSTRUCTIONS = """Eres un experto en e-commerce y copywriting persuasivo. Genera una descripción atractiva y persuasiva para el producto indicado al final.
 
 La descripción debe:
 - Tener entre 50-100 palabras
@@ -16,11 +60,7 @@ La descripción debe:
 Genera SOLO la descripción del producto, sin título ni etiquetas adicionales."""
 
 
-def build_category_prompt(product_name: str, description: str) -> str:
-    return f"""Eres un experto en clasificación de productos de e-commerce. Clasifica el siguiente producto en una categoría jerárquica.
-
-Nombre del Producto: {product_name}
-Descripción: {description}
+CATEGORY_INSTRUCTIONS = """Eres un experto en clasificación de productos de e-commerce. Clasifica el producto indicado al final en una categoría jerárquica.
 
 Debes responder con una categoría en formato jerárquico usando el símbolo " > " (espacio, mayor que, espacio).
 
@@ -47,4 +87,30 @@ Categorías principales disponibles:
 Responde SOLO con la categoría en el formato indicado, sin explicaciones adicionales."""
 
 
-DESCRIPTION_SYSTEM_MESSAGE = "Eres un experto en e-commerce y copywriting persuasivo."
+def render_description(product_name: str, keywords: list[str]) -> str:
+    return f"""Nombre del Producto: {product_name}
+Características Clave: {", ".join(keywords)}"""
+
+
+def render_category(product_name: str, description: str) -> str:
+    return f"""Nombre del Producto: {product_name}
+Descripción: {description}"""
+
+
+DESCRIPTION_PROMPT = PromptTemplate(
+    name="description",
+    instructions=DESCRIPTION_INSTRUCTIONS,
+    render=render_description,
+    max_output_tokens=DESCRIPTION_MAX_TOKENS,
+)
+
+CATEGORY_PROMPT = PromptTemplate(
+    name="category",
+    instructions=CATEGORY_INSTRUCTIONS,
+    render=render_category,
+    max_output_tokens=CATEGORY_MAX_TOKENS,
+    # "Electrónica > Au" no es una categoría: se reintenta o falla
+    allow_truncated=False,
+)
+
+TEMPLATES = {template.name: template for template in (DESCRIPTION_PROMPT, CATEGORY_PROMPT)}
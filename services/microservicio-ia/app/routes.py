@@ -1,14 +1,17 @@
+import os
 import time
 from datetime import datetime
 
-from config import OPENAI_MODEL, logger
+from config import logger
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import JSONResponse
+from health import health_monitor
 from llm_service import llm_service
+from logging_setup import logging_stats
 from models import (GenerateCategoryRequest, GenerateCategoryResponse,
                     GenerateDescriptionRequest, GenerateDescriptionResponse,
                     HealthResponse)
-from prompts import (DESCRIPTION_SYSTEM_MESSAGE, build_category_prompt,
-                     build_description_prompt)
+from prompts import CATEGORY_PROMPT, DESCRIPTION_PROMPT, TEMPLATES
 
 router = APIRouter()
 
@@ -22,6 +25,9 @@ async def root():
         "endpoints": {
             "docs": "/docs",
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
+            "metrics": "/metrics",
             "generate_description": "POST /generate/description",
             "generate_category": "POST /generate/category"
         }
@@ -31,15 +37,56 @@ async def root():
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     return HealthResponse(
-        status="healthy" if llm_service.is_configured() else "degraded",
+        status=health_monitor.status,
         service="microservicio-ia",
         version="1.0.0",
         timestamp=datetime.utcnow().isoformat() + "Z",
         llm_configured=llm_service.is_configured(),
-        model=OPENAI_MODEL if llm_service.is_configured() else "not_configured"
+        model=llm_service.model if llm_service.is_configured() else "not_configured",
+        dependencies=health_monitor.snapshot()
     )
 
 
+@router.get("/health/live")
+async def liveness():
+    """El proceso responde; no revisa dependencias."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Listo para recibir tráfico: el proveedor LLM respondió en la última
+    revisión en segundo plano."""
+    return JSONResponse(
+        status_code=200 if health_monitor.ready else 503,
+        content={
+            "status": "ready" if health_monitor.ready else "not_ready",
+            "dependencies": health_monitor.snapshot()
+        }
+    )
+
+
+@router.get("/metrics")
+async def metrics():
+    """Tokens por template desde el arranque de este worker, incluidos los
+    servidos desde la caché de prefijos del proveedor."""
+    return {
+        "worker_pid": os.getpid(),
+        "provider": llm_service.provider,
+        "model": llm_service.model,
+        "output_budgets": {
+            name: {
+                "visible": template.max_output_tokens,
+                "sent": llm_service.token_limit(template),
+            }
+            for name, template in TEMPLATES.items()
+        },
+        "token_usage": llm_service.usage.stats(),
+        "generation_cache": llm_service.cache_stats(),
+        "logging": logging_stats()
+    }
+
+
 @router.post("/generate/description", response_model=GenerateDescriptionResponse)
 async def generate_description(request: GenerateDescriptionRequest):
     start_time = time.time()
@@ -51,8 +98,11 @@ async def generate_description(request: GenerateDescriptionRequest):
     )
 
     try:
-        prompt = build_description_prompt(request.name, request.keywords)
-        description, tokens = llm_service.generate(prompt, DESCRIPTION_SYSTEM_MESSAGE)
+        description, tokens = llm_service.generate(
+            DESCRIPTION_PROMPT,
+            product_name=request.name,
+            keywords=request.keywords
+        )
 
         processing_time = time.time() - start_time
 
@@ -66,7 +116,7 @@ async def generate_description(request: GenerateDescriptionRequest):
         return GenerateDescriptionResponse(
             generated_description=description.strip(),
             processing_time=round(processing_time, 2),
-            model_used=OPENAI_MODEL,
+            model_used=llm_service.model,
             tokens_used=tokens
         )
 
@@ -87,8 +137,11 @@ async def generate_category(request: GenerateCategoryRequest):
     logger.info("generate_category_request", product_name=request.product_name)
 
     try:
-        prompt = build_category_prompt(request.product_name, request.description)
-        category, tokens = llm_service.generate(prompt)
+        category, tokens = llm_service.generate(
+            CATEGORY_PROMPT,
+            product_name=request.product_name,
+            description=request.description
+        )
 
         processing_time = time.time() - start_time
         category = category.strip()
@@ -108,7 +161,7 @@ async def generate_category(request: GenerateCategoryRequest):
             suggested_category=category,
             confidence=round(confidence, 2),
             processing_time=round(processing_time, 2),
-            model_used=OPENAI_MODEL
+            model_used=llm_service.model
         )
 
     except HTTPException:
@@ -0,0 +1,21 @@
+"""Perfil de producción: gunicorn con workers de uvicorn.
+
+WEB_CONCURRENCY fija la cantidad de workers; por defecto 2, no uno por
+núcleo: cada worker abre su propio pool de conexiones (hasta 15 a Postgres en
+backend-principal) y en un host grande eso supera `max_connections`. El
+estado que deben ver todos los workers va en SHARED_STATE_URL.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv("WEB_CONCURRENCY") or 2)
+worker_class = "uvicorn.workers.UvicornWorker"
+# Un worker que no responde en este tiempo se reinicia
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Los logs de la aplicación ya son JSON por stdout
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
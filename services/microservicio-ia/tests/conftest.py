@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# microservicio-ia importa sus módulos sin paquete, desde app/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from fake_llm import AsyncFakeChatClient, FakeChatClient, FakeLLMError
+
+MESSAGES = [{"role": "user", "content": "Describe: Audífonos inalámbricos"}]
+
+
+def test_stream_matches_completion_and_reports_usage():
+    client = FakeChatClient(output_words=12)
+    response = client.chat.completions.create(model="fake", messages=MESSAGES)
+    chunks = list(client.chat.completions.create(
+        model="fake", messages=MESSAGES, stream=True,
+        stream_options={"include_usage": True},
+    ))
+
+    text = "".join(c.choices[0].delta.content for c in chunks if c.choices)
+    assert text == response.choices[0].message.content
+    assert len(text.split()) == 12
+    assert chunks[-2].choices[0].finish_reason == "stop"
+    assert chunks[-1].usage.completion_tokens == response.usage.completion_tokens
+
+
+def test_stream_truncates_at_max_tokens():
+    client = FakeChatClient(output_words=60)
+    chunks = list(client.chat.completions.create(
+        model="fake", messages=MESSAGES, max_tokens=13, stream=True,
+    ))
+    assert len(chunks) == 10
+    assert chunks[-1].choices[0].finish_reason == "length"
+
+
+def test_async_stream_does_not_block_the_loop():
+    client = AsyncFakeChatClient(latency_ms=200, output_words=10)
+
+    async def consume():
+        stream = await client.chat.completions.create(
+            model="fake", messages=MESSAGES, stream=True,
+        )
+        return [chunk async for chunk in stream]
+
+    async def both():
+        started = time.perf_counter()
+        results = await asyncio.gather(consume(), consume())
+        return results, time.perf_counter() - started
+
+    (first, second), elapsed = asyncio.run(both())
+    assert len(first) == len(second) == 10
+    # En paralelo: ~200 ms, no 400
+    assert elapsed < 0.35
+
+
+def test_stream_failure_is_raised_mid_stream():
+    client = FakeChatClient(failure_rate=1.0, output_words=10)
+    received = []
+    with pytest.raises(FakeLLMError):
+        for chunk in client.chat.completions.create(
+            model="fake", messages=MESSAGES, stream=True,
+        ):
+            received.append(chunk)
+    assert len(received) == 5